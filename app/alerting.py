@@ -1,66 +1,242 @@
-from mysql.connector import Error
-from config import TEMP_THRESHOLD, ALERT_CONSECUTIVE_THRESHOLD
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from app.metrics import timed
+from config import (TEMP_THRESHOLD, ALERT_CONSECUTIVE_THRESHOLD, LOW_TEMP_THRESHOLD,
+                    RATE_OF_CHANGE_THRESHOLD, ALERT_HYSTERESIS, ALERT_COOLDOWN)
 
-# Dictionary to track consecutive alert breaches for each city
-consecutive_alerts = {}
+# Alert rule kinds evaluated by the AlertEngine (column order of its cooldown state)
+ALERT_KINDS = ('high', 'low', 'rate')
 
-# Function to check if the current temperature exceeds the defined threshold
-# and trigger an alert if the condition is met for consecutive updates
-def check_temperature_alert(connection, city, current_temp):
+class AlertEngine:
     """
-    Checks if the temperature in a specific city exceeds the predefined threshold 
-    for a consecutive number of updates. If the threshold is exceeded for 
-    consecutive times, an alert is triggered.
+    Evaluates a whole cycle of temperature readings against the alert rules in one
+    vectorized pass.
 
-    Args:
-        connection (object): MySQL connection object for database operations.
-        city (str): Name of the city for which temperature is being checked.
-        current_temp (float): The latest temperature reading for the city.
+    Rules:
+        high: temperature above the city's high threshold for `consecutive` readings.
+        low:  temperature below the city's low threshold for `consecutive` readings.
+        rate: temperature changed by at least `rate_threshold` since the previous reading.
+
+    A streak only resets once the temperature is `hysteresis` degrees back on the
+    safe side of its threshold, but readings inside that band never fire; each rule fires at most once per `cooldown`
+    seconds per city. Streaks, last readings and cooldowns are kept in NumPy arrays
+    indexed by city and can be saved to and restored from disk.
 
-    Returns:
-        None
+    Args:
+        high_threshold (float): Default high temperature threshold.
+        low_threshold (float): Default low temperature threshold.
+        rate_threshold (float): Temperature change between readings that triggers an alert.
+        consecutive (int): Readings a threshold must be breached for before alerting.
+        hysteresis (float): Degrees past the threshold needed to reset a streak.
+        cooldown (float): Minimum seconds between alerts of one kind for one city.
+        high_thresholds (dict, optional): Per-city overrides of the high threshold.
+        low_thresholds (dict, optional): Per-city overrides of the low threshold.
     """
-    
-    # Initialize the alert counter for the city if it's not already tracked
-    if city not in consecutive_alerts:
-        consecutive_alerts[city] = 0
-
-    # Check if the current temperature exceeds the threshold
-    if current_temp > TEMP_THRESHOLD:
-        consecutive_alerts[city] += 1  # Increment the consecutive alert counter
-
-        # Trigger an alert if the threshold is breached for consecutive updates
-        if consecutive_alerts[city] >= ALERT_CONSECUTIVE_THRESHOLD:
-            print(f"ALERT: Temperature in {city} has exceeded the threshold of {TEMP_THRESHOLD}°C "
-                  f"for {ALERT_CONSECUTIVE_THRESHOLD} consecutive updates!")
-            insert_alert(connection, city, current_temp)  # Insert the alert into the database
-    else:
-        # Reset the counter if the temperature is below the threshold
-        consecutive_alerts[city] = 0
-
-# Function to insert triggered alerts into the 'weather_alerts' table in the database
-def insert_alert(connection, city, current_temp):
+
+    def __init__(self, high_threshold=TEMP_THRESHOLD, low_threshold=LOW_TEMP_THRESHOLD,
+                 rate_threshold=RATE_OF_CHANGE_THRESHOLD, consecutive=ALERT_CONSECUTIVE_THRESHOLD,
+                 hysteresis=ALERT_HYSTERESIS, cooldown=ALERT_COOLDOWN,
+                 high_thresholds=None, low_thresholds=None):
+        self.high_threshold = high_threshold
+        self.low_threshold = low_threshold
+        self.rate_threshold = rate_threshold
+        self.consecutive = consecutive
+        self.hysteresis = hysteresis
+        self.cooldown = cooldown
+        self.high_overrides = dict(high_thresholds or {})
+        self.low_overrides = dict(low_thresholds or {})
+
+        # Per-city state, one row per city in `self.cities`
+        self.cities = []
+        self.index = {}
+        self.high_limits = np.empty(0)
+        self.low_limits = np.empty(0)
+        self.high_streaks = np.zeros(0, dtype=np.int32)
+        self.low_streaks = np.zeros(0, dtype=np.int32)
+        self.last_temps = np.empty(0)
+        self.last_alerts = np.empty((0, len(ALERT_KINDS)))
+
+    @timed('alert')
+    def evaluate(self, cities, temperatures, now=None):
+        """
+        Updates the alert state with one cycle of readings and returns the alerts triggered.
+
+        Args:
+            cities (list of str): The names of the cities, one per reading.
+            temperatures (array-like of float): The latest temperature reading for each city.
+            now (float, optional): The cycle time as a Unix timestamp; defaults to the current time.
+
+        Returns:
+            list of tuple: (city, temperature, kind, alert_time) for every alert triggered,
+                           where alert_time is formatted as 'YYYY-MM-DD HH:MM:SS'.
+        """
+        if now is None:
+            now = time.time()
+        self._register(cities)
+        rows = np.fromiter((self.index[city] for city in cities), dtype=np.intp, count=len(cities))
+        temps = np.asarray(temperatures, dtype=np.float64)
+
+        high = self.high_limits[rows]
+        low = self.low_limits[rows]
+
+        # Streaks grow while breached, hold inside the hysteresis band and reset once clear
+        high_streaks = self.high_streaks[rows]
+        high_streaks = np.where(temps > high, high_streaks + 1,
+                                np.where(temps <= high - self.hysteresis, 0, high_streaks))
+        low_streaks = self.low_streaks[rows]
+        low_streaks = np.where(temps < low, low_streaks + 1,
+                               np.where(temps >= low + self.hysteresis, 0, low_streaks))
+
+        previous = self.last_temps[rows]
+        with np.errstate(invalid='ignore'):
+            rate = np.abs(temps - previous) >= self.rate_threshold  # NaN (first reading) never fires
+
+        # The hysteresis band only holds a streak; an alert needs the threshold breached by this reading
+        triggered = np.column_stack(((temps > high) & (high_streaks >= self.consecutive),
+                                     (temps < low) & (low_streaks >= self.consecutive),
+                                     rate))
+        triggered &= (now - self.last_alerts[rows]) >= self.cooldown
+
+        # Write back the new state
+        self.high_streaks[rows] = high_streaks
+        self.low_streaks[rows] = low_streaks
+        self.last_temps[rows] = temps
+        hit_rows, hit_kinds = np.nonzero(triggered)
+        self.last_alerts[rows[hit_rows], hit_kinds] = now
+
+        alert_time = datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S')
+        return [(cities[i], float(temps[i]), ALERT_KINDS[kind], alert_time)
+                for i, kind in zip(hit_rows.tolist(), hit_kinds.tolist())]
+
+    def export_state(self):
+        """
+        Returns the per-city alert state as arrays (see `import_state`).
+
+        Returns:
+            dict: 'cities' (list of str) plus 'high_streaks', 'low_streaks',
+                  'last_temps' and 'last_alerts' arrays, one row per city.
+        """
+        return {'cities': list(self.cities), 'high_streaks': self.high_streaks.copy(),
+                'low_streaks': self.low_streaks.copy(), 'last_temps': self.last_temps.copy(),
+                'last_alerts': self.last_alerts.copy()}
+
+    def import_state(self, state):
+        """
+        Restores per-city alert state returned by `export_state`. Thresholds are
+        taken from the current configuration.
+
+        Args:
+            state (dict): The exported state.
+        """
+        cities = [str(city) for city in state['cities']]
+        self._register(cities)
+        rows = np.fromiter((self.index[city] for city in cities), dtype=np.intp, count=len(cities))
+        self.high_streaks[rows] = state['high_streaks']
+        self.low_streaks[rows] = state['low_streaks']
+        self.last_temps[rows] = state['last_temps']
+        self.last_alerts[rows] = state['last_alerts']
+
+    def save_state(self, path):
+        """
+        Atomically saves the per-city alert state to a NumPy `.npz` file.
+
+        Args:
+            path (str): The path of the state file.
+        """
+        state = self.export_state()
+        state['cities'] = np.array(state['cities'], dtype=str)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **state)
+        os.replace(tmp_path, path)
+
+    def load_state(self, path):
+        """
+        Restores per-city alert state saved by `save_state`, so streaks and cooldowns
+        survive restarts. Thresholds are taken from the current configuration.
+
+        Args:
+            path (str): The path of the state file.
+
+        Returns:
+            bool: True if the state was loaded, False if the file is missing or unreadable.
+        """
+        try:
+            with np.load(path) as state:
+                self.import_state({name: state[name] for name in state.files})
+            return True
+        except FileNotFoundError:
+            return False
+        except (ValueError, KeyError, OSError) as e:
+            print(f"Ignoring unreadable alert state '{path}': {e}")
+            return False
+
+    def _register(self, cities):
+        new_cities = [city for city in dict.fromkeys(cities) if city not in self.index]
+        if not new_cities:
+            return
+
+        for city in new_cities:
+            self.index[city] = len(self.cities)
+            self.cities.append(city)
+
+        count = len(new_cities)
+        self.high_limits = np.concatenate((self.high_limits, [self.high_overrides.get(city, self.high_threshold)
+                                                              for city in new_cities]))
+        self.low_limits = np.concatenate((self.low_limits, [self.low_overrides.get(city, self.low_threshold)
+                                                            for city in new_cities]))
+        self.high_streaks = np.concatenate((self.high_streaks, np.zeros(count, dtype=np.int32)))
+        self.low_streaks = np.concatenate((self.low_streaks, np.zeros(count, dtype=np.int32)))
+        self.last_temps = np.concatenate((self.last_temps, np.full(count, np.nan)))
+        self.last_alerts = np.concatenate((self.last_alerts, np.full((count, len(ALERT_KINDS)), -np.inf)))
+
+class AlertWriter:
     """
-    Inserts a weather alert into the 'weather_alerts' table in the database.
+    Writes alerts from a background thread so the ingest loop never blocks on the database.
 
-    Args:
-        connection (object): MySQL connection object for database operations.
-        city (str): Name of the city for which the alert is triggered.
-        current_temp (float): The temperature that triggered the alert.
+    Alerts are queued with `submit`; if the queue is full the alert is dropped and
+    counted rather than blocking the caller.
 
-    Returns:
-        None
+    Args:
+        write (callable): Called with (city, temperature, alert_time, kind) for each alert,
+                          e.g. `WriteBuffer.add_alert`.
+        maxsize (int): The maximum number of queued alerts.
     """
-    try:
-        cursor = connection.cursor()
-        insert_query = """
-        INSERT INTO weather_alerts (city, temperature, alert_time)
-        VALUES (%s, %s, NOW())
+
+    def __init__(self, write, maxsize=10000):
+        self.write = write
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def submit(self, city, temperature, alert_time, kind='high'):
         """
-        cursor.execute(insert_query, (city, current_temp))
-        connection.commit()
-        print(f"Alert for {city} inserted successfully.")
-    except Error as e:
-        print(f"Error inserting alert: {e}")
-    finally:
-        cursor.close()  # Ensure the cursor is closed to prevent memory leaks
+        Queues an alert for writing without blocking.
+        """
+        try:
+            self.queue.put_nowait((city, temperature, alert_time, kind))
+        except queue.Full:
+            self.dropped += 1
+            print(f"Alert queue full, dropped alert for {city}.")
+
+    def close(self):
+        """
+        Waits for all queued alerts to be written and stops the writer thread.
+        """
+        self.queue.put(None)
+        self._thread.join()
+
+    def _drain(self):
+        while True:
+            alert = self.queue.get()
+            if alert is None:
+                break
+            try:
+                self.write(*alert)
+            except Exception as e:
+                print(f"Error writing alert for {alert[0]}: {e}")
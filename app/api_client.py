@@ -1,13 +1,58 @@
+import json
+import os
+import time
 import requests
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from app.metrics import timed
+
+# Base URL of the OpenWeatherMap API (overridable for local stub servers)
+BASE_URL = "http://api.openweathermap.org/data/2.5"
+
+# Default per-request deadline in seconds (connect and read)
+DEFAULT_TIMEOUT = 10
+
+# Maximum number of city IDs the group endpoint accepts per request
+GROUP_CHUNK_SIZE = 20
+
+# Function to create a pooled HTTP session with keep-alive connections
+def create_session(pool_size=10):
+    """
+    Creates a requests session that keeps connections alive and pools them,
+    so that repeated requests to the API reuse the same TCP connections.
+
+    Args:
+        pool_size (int): The maximum number of pooled connections to keep per host.
+
+    Returns:
+        requests.Session: The configured session object.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def _fallback(client, city):
+    # Serve the city's last known payload (marked stale) when a reliability layer is in use
+    return client.with_fallback(city, None) if client is not None else None
 
 # Function to fetch current weather data from OpenWeatherMap API using city name
-def fetch_weather_data(city, api_key):
+@timed('fetch')
+def fetch_weather_data(city, api_key, session=None, timeout=DEFAULT_TIMEOUT, base_url=BASE_URL, client=None):
     """
     Fetches current weather data from OpenWeatherMap API for a given city.
-    
+
     Args:
         city (str): The name of the city for which weather data is being requested.
         api_key (str): The API key for authenticating the OpenWeatherMap API request.
+        session (requests.Session, optional): A pooled session to reuse connections.
+        timeout (float): The per-request deadline in seconds.
+        base_url (str): The base URL of the weather API.
+        client (ResilientClient, optional): Rate limits, retries and circuit-breaks the
+                                            request, and supplies the last known payload
+                                            (marked stale) if it fails.
 
     Returns:
         dict: The weather data in JSON format if the request is successful.
@@ -15,23 +60,389 @@ def fetch_weather_data(city, api_key):
     """
     try:
         # Construct the API URL with the city name, API key, and metric units (Celsius)
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
-        
-        # Make a GET request to the API
-        response = requests.get(url)
-        
+        url = f"{base_url}/weather?q={city}&appid={api_key}&units=metric"
+
+        # Make a GET request to the API, reusing pooled connections when available
+        http = session if session is not None else requests
+        if client is not None:
+            response = client.get(http, 'weather', url, timeout)
+            if response is None:
+                print(f"Failed to fetch weather data for {city}: no response after retries")
+                return _fallback(client, city)
+        else:
+            response = http.get(url, timeout=timeout)
+
         # Check if the response status is successful (HTTP status code 200)
         if response.status_code == 200:
-            return response.json()  # Return the weather data in JSON format
+            data = response.json()  # Return the weather data in JSON format
+            return client.with_fallback(city, data) if client is not None else data
         else:
             # Log the status code and response message if the request fails
             print(f"Failed to fetch weather data for {city}: {response.status_code} - {response.text}")
-            return None
+            return _fallback(client, city)
     except requests.RequestException as e:
         # Catch any network-related errors such as timeouts, DNS failures, etc.
         print(f"Network error occurred while fetching weather data for {city}: {e}")
-        return None
+        return _fallback(client, city)
     except Exception as e:
         # Catch any other unforeseen errors
         print(f"An unexpected error occurred while fetching weather data for {city}: {e}")
+        return _fallback(client, city)
+
+# Function to fetch weather data for many cities concurrently
+def fetch_all_weather_data(cities, api_key, max_workers=10, timeout=DEFAULT_TIMEOUT,
+                           base_url=BASE_URL, session=None, client=None):
+    """
+    Fetches weather data for all given cities using a bounded thread pool and
+    yields each result as soon as it completes, so processing can start early.
+
+    At most `max_workers` requests are in flight at once, all sharing one pooled
+    keep-alive session. Each request is bounded by `timeout`, so a single hung
+    city cannot stall the rest of the cycle.
+
+    Args:
+        cities (list of str): The names of the cities to fetch.
+        api_key (str): The API key for authenticating the OpenWeatherMap API request.
+        max_workers (int): The maximum number of concurrent requests.
+        timeout (float): The per-request deadline in seconds.
+        base_url (str): The base URL of the weather API.
+        session (requests.Session, optional): A pooled session to reuse; one is
+                                              created (and closed) if not given.
+        client (ResilientClient, optional): Reliability layer shared by all requests.
+
+    Yields:
+        tuple: (city, data) where data is the weather data dict, or None on failure.
+    """
+    owns_session = session is None
+    if owns_session:
+        session = create_session(pool_size=max_workers)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(fetch_weather_data, city, api_key, session, timeout, base_url, client): city
+                for city in cities
+            }
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            finally:
+                # Drop any requests that have not started if the consumer stops early
+                for future in futures:
+                    future.cancel()
+    finally:
+        if owns_session:
+            session.close()
+
+# Function to load the cached city name to OpenWeatherMap ID mapping from disk
+def load_city_ids(path):
+    """
+    Loads the city name to numeric OpenWeatherMap ID mapping from a JSON file.
+
+    Args:
+        path (str): The path of the JSON cache file.
+
+    Returns:
+        dict: The mapping of city names to IDs (empty if the file is missing or unreadable).
+    """
+    try:
+        with open(path) as f:
+            return {city: int(city_id) for city, city_id in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+    except (ValueError, OSError) as e:
+        print(f"Ignoring unreadable city ID cache '{path}': {e}")
+        return {}
+
+# Function to save the city name to OpenWeatherMap ID mapping to disk
+def save_city_ids(city_ids, path):
+    """
+    Atomically writes the city name to numeric OpenWeatherMap ID mapping to a JSON file.
+
+    Args:
+        city_ids (dict): The mapping of city names to IDs.
+        path (str): The path of the JSON cache file.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(city_ids, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)  # Replace in one step so a crash never leaves a partial file
+
+# Function to fetch current weather data for several cities in one request
+@timed('fetch')
+def fetch_weather_group(city_ids, api_key, session=None, timeout=DEFAULT_TIMEOUT, base_url=BASE_URL,
+                        client=None):
+    """
+    Fetches current weather data for several cities at once using the
+    OpenWeatherMap multi-ID group endpoint.
+
+    Args:
+        city_ids (list of int): The numeric OpenWeatherMap IDs of the cities (at most 20).
+        api_key (str): The API key for authenticating the OpenWeatherMap API request.
+        session (requests.Session, optional): A pooled session to reuse connections.
+        timeout (float): The per-request deadline in seconds.
+        base_url (str): The base URL of the weather API.
+        client (ResilientClient, optional): Rate limits, retries and circuit-breaks the request.
+
+    Returns:
+        list of dict: One weather payload per city, in the same shape as `fetch_weather_data`.
+        None: If the request fails or encounters an error.
+    """
+    ids = ','.join(str(city_id) for city_id in city_ids)
+    try:
+        url = f"{base_url}/group?id={ids}&appid={api_key}&units=metric"
+        http = session if session is not None else requests
+        if client is not None:
+            response = client.get(http, 'group', url, timeout)
+            if response is None:
+                print(f"Failed to fetch weather data for city IDs {ids}: no response after retries")
+                return None
+        else:
+            response = http.get(url, timeout=timeout)
+
+        if response.status_code == 200:
+            return response.json().get('list', [])  # Split the combined response into per-city payloads
+        else:
+            print(f"Failed to fetch weather data for city IDs {ids}: {response.status_code} - {response.text}")
+            return None
+    except requests.RequestException as e:
+        print(f"Network error occurred while fetching weather data for city IDs {ids}: {e}")
         return None
+    except Exception as e:
+        print(f"An unexpected error occurred while fetching weather data for city IDs {ids}: {e}")
+        return None
+
+# Function to fetch weather data for many cities in batches through the group endpoint
+def fetch_all_weather_data_batched(cities, api_key, cache_path, chunk_size=GROUP_CHUNK_SIZE,
+                                   max_workers=10, timeout=DEFAULT_TIMEOUT, base_url=BASE_URL,
+                                   session=None, client=None):
+    """
+    Fetches weather data for all given cities using as few HTTP requests as possible.
+
+    Cities are resolved to numeric IDs once by name; the mapping is cached on disk
+    at `cache_path` so later cycles skip resolution entirely. Resolved cities are
+    then fetched in chunks through the group endpoint, with chunks run concurrently.
+    A cached ID missing from a successful group response is dropped, so the city
+    is resolved by name again on the next call.
+
+    Args:
+        cities (list of str): The names of the cities to fetch.
+        api_key (str): The API key for authenticating the OpenWeatherMap API request.
+        cache_path (str): The path of the JSON file caching city IDs.
+        chunk_size (int): The number of city IDs per group request.
+        max_workers (int): The maximum number of concurrent requests.
+        timeout (float): The per-request deadline in seconds.
+        base_url (str): The base URL of the weather API.
+        session (requests.Session, optional): A pooled session to reuse; one is
+                                              created (and closed) if not given.
+        client (ResilientClient, optional): Reliability layer shared by all requests; cities
+                                            of failed chunks get their last known payload.
+
+    Yields:
+        tuple: (city, data) where data is the weather data dict, or None on failure.
+    """
+    owns_session = session is None
+    if owns_session:
+        session = create_session(pool_size=max_workers)
+
+    try:
+        city_ids = load_city_ids(cache_path)
+
+        # Resolve uncached cities by name; the payloads fetched doing so are yielded directly
+        unresolved = [city for city in cities if city not in city_ids]
+        unresolved_set = set(unresolved)
+        if unresolved:
+            for city, data in fetch_all_weather_data(unresolved, api_key, max_workers, timeout,
+                                                     base_url, session, client):
+                if data and 'id' in data and not data.get('stale'):
+                    city_ids[city] = data['id']
+                yield city, data
+            try:
+                save_city_ids(city_ids, cache_path)
+            except OSError as e:
+                print(f"Error saving city ID cache '{cache_path}': {e}")
+
+        # Fetch resolved cities in chunks through the group endpoint
+        resolved = [city for city in cities if city in city_ids and city not in unresolved_set]
+        chunks = [resolved[i:i + chunk_size] for i in range(0, len(resolved), chunk_size)]
+        stale_ids = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(fetch_weather_group, [city_ids[city] for city in chunk],
+                                api_key, session, timeout, base_url, client): chunk
+                for chunk in chunks
+            }
+            try:
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    payloads = future.result()
+
+                    # Map payloads back to the requested city names by ID
+                    by_id = {payload.get('id'): payload for payload in payloads or []}
+                    for city in chunk:
+                        data = by_id.get(city_ids[city])
+                        if data is None and payloads is not None:
+                            stale_ids.append(city)  # The API no longer knows this ID
+                        yield city, client.with_fallback(city, data) if client is not None else data
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        if stale_ids:
+            for city in stale_ids:
+                del city_ids[city]
+            try:
+                save_city_ids(city_ids, cache_path)
+            except OSError as e:
+                print(f"Error saving city ID cache '{cache_path}': {e}")
+    finally:
+        if owns_session:
+            session.close()
+
+class ResponseCache:
+    """
+    TTL and LRU cache of weather payloads keyed by city, with optional on-disk backing.
+
+    Besides caching responses, the cache remembers the observation time (`dt`) of
+    the last reading processed for each city, so the pipeline can skip cities
+    whose data has not advanced since the previous cycle.
+
+    Args:
+        ttl (float): Seconds a cached payload stays fresh.
+        max_entries (int): The maximum number of cached payloads; least recently used are evicted.
+        path (str, optional): JSON file the cache is loaded from and saved to.
+    """
+
+    def __init__(self, ttl=600, max_entries=10000, path=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()  # city -> (fetched_at, payload), least recently used first
+        self.last_dt = {}  # city -> observation time of the last processed reading
+        self.hits = 0
+        self.misses = 0
+        self.unchanged = 0
+        if path:
+            self.load()
+
+    def get(self, city):
+        """
+        Returns the cached payload for a city if it is still fresh.
+
+        Args:
+            city (str): The name of the city.
+
+        Returns:
+            dict: The cached weather payload.
+            None: If the city is not cached or its entry has expired.
+        """
+        entry = self.entries.get(city)
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            self.entries.move_to_end(city)
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            del self.entries[city]  # Expired
+        self.misses += 1
+        return None
+
+    def put(self, city, payload):
+        """
+        Caches a freshly fetched payload for a city, evicting the least recently used entry if full.
+        """
+        self.entries[city] = (time.time(), payload)
+        self.entries.move_to_end(city)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def is_new_reading(self, city, payload):
+        """
+        Checks whether a payload's observation time has advanced since the last
+        reading processed for the city, and records it if so.
+
+        Args:
+            city (str): The name of the city.
+            payload (dict): The weather payload, with the API's `dt` observation time.
+
+        Returns:
+            bool: True if the reading is new (or has no `dt`), False if it was already processed.
+        """
+        dt = payload.get('dt')
+        if dt is None:
+            return True
+        if dt <= self.last_dt.get(city, float('-inf')):
+            self.unchanged += 1
+            return False
+        self.last_dt[city] = dt
+        return True
+
+    def stats(self):
+        """
+        Returns the cache hit, miss and unchanged-reading counters.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'unchanged': self.unchanged,
+                'entries': len(self.entries)}
+
+    def load(self):
+        """
+        Loads cached payloads and last observation times from `path`, dropping expired entries.
+        """
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (ValueError, OSError) as e:
+            print(f"Ignoring unreadable response cache '{self.path}': {e}")
+            return
+
+        now = time.time()
+        for city, (fetched_at, payload) in state.get('entries', {}).items():
+            if now - fetched_at < self.ttl:
+                self.entries[city] = (fetched_at, payload)
+        self.last_dt.update(state.get('last_dt', {}))
+
+    def save(self):
+        """
+        Atomically writes the cache to `path` so it survives restarts.
+        """
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'entries': self.entries, 'last_dt': self.last_dt}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving response cache '{self.path}': {e}")
+
+# Function to serve fresh cities from the response cache and fetch only the rest
+def fetch_with_cache(cities, cache, fetch, refresh=()):
+    """
+    Yields cached payloads for cities with fresh cache entries and fetches the
+    remaining cities with `fetch`, caching what comes back.
+
+    Args:
+        cities (list of str): The names of the cities to fetch.
+        cache (ResponseCache): The response cache.
+        fetch (callable): Called with the list of uncached cities; returns an
+                          iterable of (city, data) like `fetch_all_weather_data`.
+        refresh (set of str): Cities fetched even if cached, e.g. those polled more
+                              often than the cache TTL.
+
+    Yields:
+        tuple: (city, data) where data is the weather data dict, or None on failure.
+    """
+    uncached = []
+    for city in cities:
+        payload = cache.get(city) if city not in refresh else None
+        if payload is not None:
+            yield city, payload
+        else:
+            uncached.append(city)
+
+    if uncached:
+        for city, data in fetch(uncached):
+            if data and not data.get('stale'):  # Never cache a stale fallback as a fresh response
+                cache.put(city, data)
+            yield city, data
@@ -0,0 +1,573 @@
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+from app.alerting import ALERT_KINDS
+from app.database import INSERT_ALERT_QUERY
+from app.timeseries import _sql
+
+# Raw readings of one date partition; they are ordered in NumPy, which is much faster than ORDER BY
+SELECT_READINGS_QUERY = """
+SELECT city, recorded_at, temperature, weather_condition FROM weather_readings
+WHERE recorded_at >= %s AND recorded_at < %s
+"""
+
+# Recomputed daily summaries replace whatever was stored for the same city and day
+UPSERT_DAILY_SUMMARY_QUERIES = {
+    'mysql': """
+INSERT INTO weather_daily_summary (city, day, readings, avg_temperature, min_temperature, max_temperature,
+                                   temperature_variance, dominant_condition)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    readings = VALUES(readings), avg_temperature = VALUES(avg_temperature),
+    min_temperature = VALUES(min_temperature), max_temperature = VALUES(max_temperature),
+    temperature_variance = VALUES(temperature_variance), dominant_condition = VALUES(dominant_condition)
+""",
+    'sqlite': """
+INSERT INTO weather_daily_summary (city, day, readings, avg_temperature, min_temperature, max_temperature,
+                                   temperature_variance, dominant_condition)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+ON CONFLICT (city, day) DO UPDATE SET
+    readings = excluded.readings, avg_temperature = excluded.avg_temperature,
+    min_temperature = excluded.min_temperature, max_temperature = excluded.max_temperature,
+    temperature_variance = excluded.temperature_variance, dominant_condition = excluded.dominant_condition
+""",
+}
+
+# Only the backfilled cities' alerts are replaced; {cities} is a list of placeholders
+DELETE_ALERTS_QUERY = "DELETE FROM weather_alerts WHERE alert_time >= %s AND alert_time < %s AND city IN ({cities})"
+
+# Table for SQLite (MySQL uses scripts/setup.sql)
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS weather_daily_summary (
+    city TEXT NOT NULL, day TEXT NOT NULL, readings INTEGER, avg_temperature REAL, min_temperature REAL,
+    max_temperature REAL, temperature_variance REAL, dominant_condition TEXT, PRIMARY KEY (city, day)
+);
+"""
+
+# Row layout of readings spilled from archived files into per-partition files
+SPILL_DTYPE = np.dtype([('city', '<i4'), ('time', '<i8'), ('temperature', '<f8'), ('condition', '<i2')])
+
+WRITE_BATCH_SIZE = 10000  # Rows per executemany call
+DELETE_BATCH_SIZE = 500  # Cities per DELETE, below SQLite's limit on bound parameters
+
+def _partitions(start, end, partition_days):
+    # Date partitions as (index, start, end) with dates formatted 'YYYY-MM-DD HH:MM:SS'
+    partitions = []
+    current = start
+    while current < end:
+        following = min(current + timedelta(days=partition_days), end)
+        partitions.append((len(partitions), current.strftime('%Y-%m-%d %H:%M:%S'),
+                           following.strftime('%Y-%m-%d %H:%M:%S')))
+        current = following
+    return partitions
+
+def _format_times(seconds):
+    # Seconds since the epoch (local wall-clock time, as stored) to 'YYYY-MM-DD HH:MM:SS'
+    return [value.replace('T', ' ') for value in np.datetime_as_string(seconds.astype('datetime64[s]'))]
+
+def _local_seconds(timestamps):
+    # Unix timestamps to local wall-clock seconds, the time base readings are stored in;
+    # the UTC offset is looked up once per distinct hour, which also handles DST changes
+    hours, inverse = np.unique(np.floor_divide(timestamps, 3600).astype(np.int64), return_inverse=True)
+    offsets = np.array([datetime.fromtimestamp(hour * 3600).astimezone().utcoffset().total_seconds()
+                        for hour in hours.tolist()], dtype=np.int64)
+    return timestamps.astype(np.int64) + offsets[inverse]
+
+def read_partition(connection, start, end, dialect='mysql', chunk_size=100000):
+    """
+    Streams one date partition of raw readings from the database in chunks and
+    converts them to NumPy columns.
+
+    Args:
+        connection (object): A DB-API connection.
+        start (str): The start of the partition (inclusive).
+        end (str): The end of the partition (exclusive).
+        dialect (str): 'mysql' or 'sqlite'.
+        chunk_size (int): Rows fetched at a time.
+
+    Returns:
+        dict: 'cities' and 'conditions' (lists of names) and the columns 'city' and
+              'condition' (codes into those lists), 'time' (local seconds since the
+              epoch) and 'temperature', in database order (see `_sort_partition`).
+    """
+    city_codes = {}
+    condition_codes = {}
+    columns = {'city': [], 'time': [], 'temperature': [], 'condition': []}
+    cursor = connection.cursor()
+    try:
+        cursor.execute(_sql(SELECT_READINGS_QUERY, dialect), (start, end))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            cities, times, temperatures, conditions = zip(*rows)
+            for codes, names in ((city_codes, cities), (condition_codes, conditions)):
+                for name in set(names).difference(codes):
+                    codes[name] = len(codes)
+            columns['city'].append(np.fromiter(map(city_codes.__getitem__, cities), dtype=np.int32, count=len(rows)))
+            columns['time'].append(np.array(times, dtype='datetime64[s]').astype(np.int64))
+            columns['temperature'].append(np.array(temperatures, dtype=np.float64))
+            columns['condition'].append(np.fromiter(map(condition_codes.__getitem__, conditions), dtype=np.int16,
+                                                    count=len(rows)))
+    finally:
+        cursor.close()
+
+    partition = {name: np.concatenate(values) if values else np.empty(0, dtype=dtype)
+                 for (name, values), dtype in zip(columns.items(), (np.int32, np.int64, np.float64, np.int16))}
+    partition['cities'] = list(city_codes)
+    partition['conditions'] = list(condition_codes)
+    return partition
+
+def _sort_partition(partition):
+    # Order by city then time and drop repeated (city, time) readings, keeping the first
+    order = np.lexsort((partition['time'], partition['city']))
+    city = partition['city'][order]
+    time_values = partition['time'][order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (city[1:] != city[:-1]) | (time_values[1:] != time_values[:-1])
+    for name in ('city', 'time', 'temperature', 'condition'):
+        partition[name] = partition[name][order][keep]
+    return partition
+
+def compute_daily_summaries(partition):
+    """
+    Computes the daily summary of every city and day in a partition with vectorized
+    group-by operations. Results match the live DailyAggregate, including the
+    dominant condition's tie-break (the condition that reached the top count first).
+
+    Args:
+        partition (dict): Columns as returned by `read_partition`, ordered by city and time.
+
+    Returns:
+        list of tuple: (city, day, readings, avg, min, max, variance, dominant condition) rows.
+    """
+    count = len(partition['time'])
+    if not count:
+        return []
+    city = partition['city'].astype(np.int64)
+    temperature = partition['temperature']
+    days = partition['time'] // 86400
+    first_day = days.min()
+    day_count = int(days.max() - first_day + 1)
+
+    # One group per (city, day); rows are ordered by city then time, so groups are contiguous
+    group_keys = city * day_count + (days - first_day)
+    starts = np.flatnonzero(np.concatenate(([True], group_keys[1:] != group_keys[:-1])))
+    sizes = np.diff(np.append(starts, count))
+    group_ids = np.repeat(np.arange(len(starts)), sizes)
+    totals = np.add.reduceat(temperature, starts)
+    means = totals / sizes
+    variances = np.add.reduceat((temperature - means[group_ids]) ** 2, starts) / sizes
+    minimums = np.minimum.reduceat(temperature, starts)
+    maximums = np.maximum.reduceat(temperature, starts)
+
+    # Dominant condition: the most frequent; on a tie, the one whose last counted occurrence came first
+    condition_count = len(partition['conditions']) or 1
+    condition = partition['condition'].astype(np.int64)
+    pair_keys = group_ids * condition_count + condition
+    order = np.argsort(pair_keys, kind='stable')  # Keeps time order within each (group, condition)
+    sorted_keys = pair_keys[order]
+    pair_starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+    pair_sizes = np.diff(np.append(pair_starts, count))
+    pair_groups = sorted_keys[pair_starts] // condition_count
+    top = np.maximum.reduceat(pair_sizes, np.flatnonzero(np.concatenate(([True], pair_groups[1:] != pair_groups[:-1]))))
+    group_of_pair = np.cumsum(np.concatenate(([False], pair_groups[1:] != pair_groups[:-1])))
+    reaching = pair_sizes == top[group_of_pair]
+    reached_at = np.where(reaching, order[pair_starts + pair_sizes - 1], count)  # Row of each pair's last occurrence
+    pair_order = np.lexsort((reached_at, pair_groups))
+    first_pairs = pair_order[np.concatenate(([True], pair_groups[pair_order][1:] != pair_groups[pair_order][:-1]))]
+    dominant = (sorted_keys[pair_starts] % condition_count)[first_pairs]
+
+    cities = partition['cities']
+    conditions = partition['conditions']
+    day_strings = _format_times((days[starts]) * 86400)
+    return [(cities[city_code], day[:10], size, round(total / size, 2), round(low, 2), round(high, 2),
+             round(variance, 2), conditions[condition_code] if conditions else None)
+            for city_code, day, size, total, low, high, variance, condition_code in zip(
+                city[starts].tolist(), day_strings, sizes.tolist(), totals.tolist(), minimums.tolist(),
+                maximums.tolist(), variances.tolist(), dominant.tolist())]
+
+def _streaks(breach, clear, city_starts):
+    # Vectorized streak counter: +1 on a breach, hold inside the hysteresis band, reset on a clear.
+    # Each city starts from 0; returns the streak after every row and whether each row comes
+    # before the city's first clear in the partition (where a carried-in streak still counts).
+    breaches = np.cumsum(breach)
+    reset = clear | city_starts
+    base = np.where(clear, breaches, breaches - breach)
+    last_reset = np.maximum.accumulate(np.where(reset, np.arange(len(breach)), 0))
+    streaks = breaches - base[last_reset]
+    clears = np.cumsum(clear)
+    clears_before_city = (clears - clear)[np.maximum.accumulate(np.where(city_starts, np.arange(len(breach)), 0))]
+    return streaks, clears == clears_before_city
+
+def compute_alert_inputs(partition, rules):
+    """
+    Evaluates the alert rules over a partition in vectorized passes, independently
+    of earlier partitions. Streaks are computed as if each city started at 0; rows
+    whose outcome depends on the streak carried in from earlier partitions are kept
+    as candidates, along with each city's end-of-partition streak, for
+    `resolve_alerts` to finish in partition order.
+
+    Args:
+        partition (dict): Columns as returned by `read_partition`, ordered by city and time.
+        rules (AlertEngine): Supplies the thresholds, consecutive count and hysteresis.
+
+    Returns:
+        dict: Arrays describing the partition's alert candidates.
+    """
+    cities = partition['cities']
+    city = partition['city']
+    temperature = partition['temperature']
+    time_values = partition['time']
+    count = len(city)
+    city_starts = np.concatenate(([True], city[1:] != city[:-1])) if count else np.zeros(0, dtype=bool)
+    city_ends = np.flatnonzero(np.append(city_starts[1:], True)) if count else np.zeros(0, dtype=np.intp)
+    present = city[city_starts]
+
+    inputs = {'cities': np.array(cities, dtype=str), 'present': present,
+              'first_time': time_values[city_starts], 'first_temp': temperature[city_starts],
+              'last_temp': temperature[city_ends]}
+
+    high_limits = np.array([rules.high_overrides.get(name, rules.high_threshold) for name in cities])[city]
+    low_limits = np.array([rules.low_overrides.get(name, rules.low_threshold) for name in cities])[city]
+    for kind, breach, clear in (
+            ('high', temperature > high_limits, temperature <= high_limits - rules.hysteresis),
+            ('low', temperature < low_limits, temperature >= low_limits + rules.hysteresis)):
+        streaks, before_clear = _streaks(breach, clear, city_starts)
+        # Only breaching rows fire: before the first clear given enough carried-in streak, later on their own
+        candidates = breach & (before_clear | (streaks >= rules.consecutive))
+        inputs[f'{kind}_rows'] = np.flatnonzero(candidates)
+        inputs[f'{kind}_streak'] = streaks[candidates]
+        inputs[f'{kind}_carried'] = before_clear[candidates]
+        inputs[f'{kind}_end'] = streaks[city_ends]
+        inputs[f'{kind}_cleared'] = ~before_clear[city_ends]
+
+    # Rate of change within the partition; the first reading of each city is compared in `resolve_alerts`
+    rate = np.zeros(count, dtype=bool)
+    rate[1:] = (np.abs(np.diff(temperature)) >= rules.rate_threshold) & ~city_starts[1:]
+    inputs['rate_rows'] = np.flatnonzero(rate)
+
+    rows = np.unique(np.concatenate([inputs[f'{kind}_rows'] for kind in ALERT_KINDS]))
+    inputs['row_city'] = city[rows]
+    inputs['row_time'] = time_values[rows]
+    inputs['row_temp'] = temperature[rows]
+    for kind in ALERT_KINDS:
+        inputs[f'{kind}_rows'] = np.searchsorted(rows, inputs[f'{kind}_rows'])  # Into the row_* arrays
+    return inputs
+
+def resolve_alerts(partition_inputs, rules):
+    """
+    Finishes alert evaluation across partitions in time order: adds carried-in
+    streaks, compares each city's first reading with its last reading of the
+    previous partition, and applies the per-city, per-rule cooldown.
+
+    Args:
+        partition_inputs (list of dict): `compute_alert_inputs` results in partition order.
+        rules (AlertEngine): Supplies the consecutive count, rate threshold and cooldown.
+
+    Returns:
+        tuple: (alerts, state) where alerts is a list of (city, temperature, kind, alert_time)
+               in time order and state holds the final streaks, last temperatures and
+               last alert times per city, as accepted by `AlertEngine.import_state`.
+    """
+    index = {}
+    carries = {'high': np.zeros(0, dtype=np.int64), 'low': np.zeros(0, dtype=np.int64)}
+    last_temps = np.empty(0)
+    last_alerts = np.empty((0, len(ALERT_KINDS)))
+    alerts = []
+
+    for inputs in partition_inputs:
+        names = inputs['cities'].tolist()
+        for name in names:
+            index.setdefault(name, len(index))
+        grow = len(index) - len(last_temps)
+        if grow:
+            carries = {kind: np.concatenate((values, np.zeros(grow, dtype=np.int64))) for kind, values in carries.items()}
+            last_temps = np.concatenate((last_temps, np.full(grow, np.nan)))
+            last_alerts = np.concatenate((last_alerts, np.full((grow, len(ALERT_KINDS)), -np.inf)))
+        to_global = np.array([index[name] for name in names], dtype=np.intp)
+        present = to_global[inputs['present']]
+        row_city = to_global[inputs['row_city']] if len(inputs['row_city']) else np.zeros(0, dtype=np.intp)
+
+        # Candidates of this partition as (time, city, kind, temperature) columns
+        times, candidate_cities, kinds, temps = [], [], [], []
+        for kind_index, kind in enumerate(ALERT_KINDS):
+            rows = inputs[f'{kind}_rows']
+            if kind == 'rate':
+                fire = np.ones(len(rows), dtype=bool)
+            else:
+                streaks = inputs[f'{kind}_streak'] + np.where(inputs[f'{kind}_carried'], carries[kind][row_city[rows]], 0)
+                fire = streaks >= rules.consecutive
+            rows = rows[fire]
+            times.append(inputs['row_time'][rows])
+            candidate_cities.append(row_city[rows])
+            kinds.append(np.full(len(rows), kind_index))
+            temps.append(inputs['row_temp'][rows])
+
+        # The first reading of each city against its last reading in the previous partition
+        with np.errstate(invalid='ignore'):
+            boundary = np.abs(inputs['first_temp'] - last_temps[present]) >= rules.rate_threshold
+        times.append(inputs['first_time'][boundary])
+        candidate_cities.append(present[boundary])
+        kinds.append(np.full(int(boundary.sum()), ALERT_KINDS.index('rate')))
+        temps.append(inputs['first_temp'][boundary])
+
+        # Carry streaks and last readings into the next partition
+        for kind in ('high', 'low'):
+            carries[kind][present] = np.where(inputs[f'{kind}_cleared'], inputs[f'{kind}_end'],
+                                              carries[kind][present] + inputs[f'{kind}_end'])
+        last_temps[present] = inputs['last_temp']
+
+        # Cooldown: greedily keep candidates at least `cooldown` seconds after the last kept alert
+        times = np.concatenate(times)
+        candidate_cities = np.concatenate(candidate_cities)
+        kinds = np.concatenate(kinds)
+        temps = np.concatenate(temps)
+        order = np.lexsort((kinds, candidate_cities, times))
+        names_by_index = list(index)
+        kept_times, kept_cities, kept_kinds, kept_temps = [], [], [], []
+        cooldown = rules.cooldown
+        for time_value, city, kind, temp in zip(times[order].tolist(), candidate_cities[order].tolist(),
+                                                kinds[order].tolist(), temps[order].tolist()):
+            if time_value - last_alerts[city, kind] >= cooldown:
+                last_alerts[city, kind] = time_value
+                kept_times.append(time_value)
+                kept_cities.append(names_by_index[city])
+                kept_kinds.append(ALERT_KINDS[kind])
+                kept_temps.append(temp)
+        alerts.extend(zip(kept_cities, kept_temps, kept_kinds, _format_times(np.array(kept_times, dtype=np.int64))))
+
+    state = {'cities': list(index), 'high_streaks': carries['high'].astype(np.int32),
+             'low_streaks': carries['low'].astype(np.int32), 'last_temps': last_temps, 'last_alerts': last_alerts}
+    return alerts, state
+
+def write_daily_summaries(connection, summaries, dialect='mysql'):
+    """
+    Upserts recomputed daily summaries in batches and commits.
+    """
+    cursor = connection.cursor()
+    try:
+        query = _sql(UPSERT_DAILY_SUMMARY_QUERIES[dialect], dialect)
+        for i in range(0, len(summaries), WRITE_BATCH_SIZE):
+            cursor.executemany(query, summaries[i:i + WRITE_BATCH_SIZE])
+        connection.commit()
+    finally:
+        cursor.close()
+
+def write_alerts(connection, alerts, start, end, cities, dialect='mysql'):
+    """
+    Replaces the alerts stored for a time range and the given cities with recomputed
+    ones in one transaction. Alerts of other cities in the range are kept.
+    """
+    cursor = connection.cursor()
+    try:
+        for i in range(0, len(cities), DELETE_BATCH_SIZE):
+            batch = cities[i:i + DELETE_BATCH_SIZE]
+            query = DELETE_ALERTS_QUERY.format(cities=', '.join(['%s'] * len(batch)))
+            cursor.execute(_sql(query, dialect), (start, end, *batch))
+        rows = [(city, temperature, alert_time, kind) for city, temperature, kind, alert_time in alerts]
+        for i in range(0, len(rows), WRITE_BATCH_SIZE):
+            cursor.executemany(_sql(INSERT_ALERT_QUERY, dialect), rows[i:i + WRITE_BATCH_SIZE])
+        connection.commit()
+    finally:
+        cursor.close()
+
+def run_partition(task):
+    """
+    Recomputes one date partition: reads its readings (from the database or a spill
+    file), upserts its daily summaries, and checkpoints its alert inputs to disk.
+    Runs in a worker process.
+
+    Args:
+        task (dict): 'start', 'end', 'connect', 'dialect', 'rules', 'checkpoint' (the
+                     .npz file to write) and, for archived files, 'spill' and 'vocabulary'.
+
+    Returns:
+        dict: The partition's start and the readings and daily summaries processed.
+    """
+    connection = task['connect']()
+    if connection is None:
+        raise ConnectionError(f"Could not connect to the database to recompute the partition from {task['start']}")
+    try:
+        if task.get('spill'):
+            rows = np.fromfile(task['spill'], dtype=SPILL_DTYPE)
+            with open(task['vocabulary']) as f:
+                vocabulary = json.load(f)
+            partition = {name: rows[name] for name in SPILL_DTYPE.names}
+            partition.update(vocabulary)
+        else:
+            partition = read_partition(connection, task['start'], task['end'], task['dialect'])
+        partition = _sort_partition(partition)
+
+        summaries = compute_daily_summaries(partition)
+        write_daily_summaries(connection, summaries, task['dialect'])
+        inputs = compute_alert_inputs(partition, task['rules'])
+    finally:
+        connection.close()
+
+    # Written last and atomically: a partition with a checkpoint never needs redoing
+    tmp_path = f"{task['checkpoint']}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **inputs)
+    os.replace(tmp_path, task['checkpoint'])
+    return {'start': task['start'], 'readings': len(partition['time']), 'daily_summaries': len(summaries)}
+
+def spill_files(pattern, partitions, checkpoint_dir, start, end, partition_days):
+    """
+    Streams archived NDJSON/CSV files once and appends each reading, in compact binary
+    form, to the spill file of its date partition, so partitions can then be
+    recomputed in parallel whatever order the files are in. Memory use is constant.
+
+    Args:
+        pattern (str): A glob pattern of NDJSON/CSV files (see `FileSource`).
+        partitions (list of tuple): The (index, start, end) partitions to spill.
+        checkpoint_dir (str): The directory the spill files are written to.
+        start (datetime): The start of the whole range.
+        end (datetime): The end of the whole range.
+        partition_days (int): Days per partition.
+
+    Returns:
+        tuple: (spill paths by partition index, vocabulary file path, readings spilled)
+    """
+    from app.sources import FileSource
+
+    city_codes = {}
+    condition_codes = {}
+    paths = {index: os.path.join(checkpoint_dir, f"spill-{index:05d}.bin") for index, _, _ in partitions}
+    for path in paths.values():
+        if os.path.exists(path):
+            os.remove(path)  # Left over from an interrupted run
+    handles = {}
+    start_seconds = int(np.datetime64(start, 's').astype(np.int64))
+    end_seconds = int(np.datetime64(end, 's').astype(np.int64))
+    spilled = 0
+    try:
+        for chunk in FileSource(pattern, 'archive', interleave=False).chunks(100000):  # Spilled in any order
+            rows = np.empty(len(chunk), dtype=SPILL_DTYPE)
+            rows['city'] = [city_codes.setdefault(reading.city, len(city_codes)) for reading in chunk]
+            rows['time'] = _local_seconds(np.array([reading.timestamp for reading in chunk]))
+            rows['temperature'] = [reading.temperature for reading in chunk]
+            rows['condition'] = [condition_codes.setdefault(reading.condition, len(condition_codes))
+                                 for reading in chunk]
+            rows = rows[(rows['time'] >= start_seconds) & (rows['time'] < end_seconds)]
+            partition_index = (rows['time'] - start_seconds) // (partition_days * 86400)
+            for index in np.unique(partition_index).tolist():
+                if index not in paths:
+                    continue  # Already recomputed before a resume
+                if index not in handles:
+                    handles[index] = open(paths[index], 'ab')
+                selected = rows[partition_index == index]
+                selected.tofile(handles[index])
+                spilled += len(selected)
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    vocabulary_path = os.path.join(checkpoint_dir, 'vocabulary.json')
+    with open(vocabulary_path, 'w') as f:
+        json.dump({'cities': list(city_codes), 'conditions': list(condition_codes)}, f)
+    return {index: path for index, path in paths.items() if index in handles}, vocabulary_path, spilled
+
+def backfill(start, end, connect, rules, dialect='mysql', files=None, partition_days=7, workers=1,
+             checkpoint_dir='backfill_checkpoints', progress=None):
+    """
+    Recomputes daily summaries and alerts for a date range from raw readings in the
+    database (weather_readings) or from archived NDJSON/CSV files.
+
+    The range is split into date partitions that are recomputed in parallel worker
+    processes; each one upserts its daily summaries and checkpoints its alert inputs.
+    Alerts are then resolved across partitions in time order and replace the stored
+    alerts of the backfilled cities for the range. An interrupted run resumes from its checkpoints if it is
+    restarted with the same arguments.
+
+    Args:
+        start (datetime): The start of the range (inclusive).
+        end (datetime): The end of the range (exclusive).
+        connect (callable): Returns a new DB-API connection; must be picklable for workers > 1.
+        rules (AlertEngine): The alert rules to apply (thresholds, consecutive count, ...).
+        dialect (str): 'mysql' or 'sqlite'.
+        files (str, optional): A glob pattern of archived files to read instead of the database.
+        partition_days (int): Days per partition.
+        workers (int): Worker processes (1 runs every partition in this process).
+        checkpoint_dir (str): Directory of the checkpoints (removed after a successful run).
+        progress (callable, optional): Called with each finished partition's result.
+
+    Returns:
+        dict: Readings, daily summaries and alerts written, partitions computed and
+              resumed, the final alert state and the seconds taken.
+
+    Raises:
+        ConnectionError: If `connect` returns None (the connection failed).
+    """
+    began = datetime.now()
+    partitions = _partitions(start, end, partition_days)
+    manifest = {'start': str(start), 'end': str(end), 'files': files, 'partition_days': partition_days,
+                'rules': {name: value for name, value in vars(rules).items() if name in (
+                    'high_threshold', 'low_threshold', 'rate_threshold', 'consecutive', 'hysteresis', 'cooldown',
+                    'high_overrides', 'low_overrides')}}
+
+    # Checkpoints are only reused by a run with the same range, input and rules
+    manifest_path = os.path.join(checkpoint_dir, 'manifest.json')
+    try:
+        with open(manifest_path) as f:
+            if json.load(f) != manifest:
+                shutil.rmtree(checkpoint_dir)
+    except (FileNotFoundError, ValueError):
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+
+    checkpoints = {index: os.path.join(checkpoint_dir, f"partition-{index:05d}.npz") for index, _, _ in partitions}
+    pending = [partition for partition in partitions if not os.path.exists(checkpoints[partition[0]])]
+    resumed = len(partitions) - len(pending)
+
+    spills = {}
+    vocabulary = None
+    if files and pending:
+        spills, vocabulary, _ = spill_files(files, pending, checkpoint_dir, start, end, partition_days)
+
+    tasks = [{'start': partition_start, 'end': partition_end, 'connect': connect, 'dialect': dialect, 'rules': rules,
+              'checkpoint': checkpoints[index], 'spill': spills.get(index) if files else None,
+              'vocabulary': vocabulary}
+             for index, partition_start, partition_end in pending if not files or index in spills]
+    readings = summaries = 0
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(run_partition, tasks)
+            for result in results:
+                readings += result['readings']
+                summaries += result['daily_summaries']
+                if progress is not None:
+                    progress(result)
+    else:
+        for task in tasks:
+            result = run_partition(task)
+            readings += result['readings']
+            summaries += result['daily_summaries']
+            if progress is not None:
+                progress(result)
+
+    # Alerts depend on earlier partitions, so they are resolved in order once every partition is done
+    partition_inputs = []
+    for index, _, _ in partitions:
+        if os.path.exists(checkpoints[index]):
+            with np.load(checkpoints[index]) as inputs:
+                partition_inputs.append({name: inputs[name] for name in inputs.files})
+    alerts, state = resolve_alerts(partition_inputs, rules)
+    connection = connect()
+    if connection is None:
+        raise ConnectionError("Could not connect to the database to write the recomputed alerts")
+    try:
+        write_alerts(connection, alerts, start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S'),
+                     state['cities'], dialect)
+    finally:
+        connection.close()
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
+    return {'readings': readings, 'daily_summaries': summaries, 'alerts': len(alerts),
+            'partitions': len(tasks), 'resumed_partitions': resumed, 'state': state,
+            'seconds': round((datetime.now() - began).total_seconds(), 2)}
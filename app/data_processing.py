@@ -1,29 +1,123 @@
-from collections import defaultdict
 from datetime import datetime
 import logging
+from app.metrics import timed
 
-# A dictionary to store weather data for daily rollups
-daily_weather_data = defaultdict(lambda: {'temps': [], 'conditions': []})
+# Callable that receives the summary of each finished day (set with set_daily_summary_sink)
+daily_summary_sink = None
+
+class DailyAggregate:
+    """
+    Running aggregate of one city's readings for a single day.
+
+    Keeps only count, sum, min, max, Welford mean/variance and per-condition
+    counts, so memory stays constant however many readings arrive, and both
+    updates and summaries are O(1).
+    """
+    __slots__ = ('day', 'count', 'total', 'min_temp', 'max_temp', 'mean', 'm2',
+                 'condition_counts', 'dominant_condition', 'track_variance')
+
+    def __init__(self, day, track_variance=True):
+        self.day = day
+        self.count = 0
+        self.total = 0.0
+        self.min_temp = float('inf')
+        self.max_temp = float('-inf')
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.condition_counts = {}
+        self.dominant_condition = None
+        self.track_variance = track_variance
+
+    def update(self, temperature, condition):
+        """
+        Adds one reading to the aggregate.
+
+        Args:
+            temperature (float): The temperature reading.
+            condition (str): The weather condition description.
+        """
+        self.count += 1
+        self.total += temperature
+        if temperature < self.min_temp:
+            self.min_temp = temperature
+        if temperature > self.max_temp:
+            self.max_temp = temperature
+
+        # Welford's online algorithm for a numerically stable running variance
+        if self.track_variance:
+            delta = temperature - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (temperature - self.mean)
+
+        # Keep the dominant condition current so summaries never rescan the counts
+        counts = self.condition_counts
+        counts[condition] = counts.get(condition, 0) + 1
+        if self.dominant_condition is None or counts[condition] > counts[self.dominant_condition]:
+            self.dominant_condition = condition
+
+    def summary(self, city):
+        """
+        Returns the summary of the readings aggregated so far.
+
+        Args:
+            city (str): The name of the city.
+
+        Returns:
+            dict: The summary data containing the date, reading count, average, min, and max
+                  temperatures, dominant weather condition and (if tracked) temperature variance.
+        """
+        summary = {
+            'city': city,
+            'date': self.day,
+            'readings': self.count,
+            'avg_temperature': round(self.total / self.count, 2),
+            'max_temperature': round(self.max_temp, 2),
+            'min_temperature': round(self.min_temp, 2),
+            'dominant_condition': self.dominant_condition
+        }
+        if self.track_variance:
+            summary['temperature_variance'] = round(self.m2 / self.count, 2)
+        return summary
+
+# A dictionary mapping each city to the running aggregate of its current day
+daily_weather_data = {}
+
+def set_daily_summary_sink(sink):
+    """
+    Registers a callable that receives the final summary of each city's day
+    when a reading for a later day rolls it over.
+
+    Args:
+        sink (callable): Called with the summary dict of each finished day, or None to disable.
+    """
+    global daily_summary_sink
+    daily_summary_sink = sink
 
 def add_to_daily_summary(city, processed_data):
     """
     Adds the processed weather data to the daily rollup for the specified city.
-    
+    A reading dated after the current rollup's day finishes that day, emits its
+    summary to the registered sink and starts a fresh rollup.
+
     Args:
         city (str): The name of the city.
-        processed_data (dict): The processed weather data, including temperature and condition.
+        processed_data (dict): The processed weather data, including temperature, condition and date.
     """
-    global daily_weather_data  # Access the global dictionary
-    daily_data = daily_weather_data[city]
+    day = processed_data['date'][:10]  # 'YYYY-MM-DD' part of the timestamp
+    daily_data = daily_weather_data.get(city)
+
+    if daily_data is None or daily_data.day != day:
+        # Emit the finished day before starting a new one
+        if daily_data is not None and daily_summary_sink is not None:
+            daily_summary_sink(daily_data.summary(city))
+        daily_data = daily_weather_data[city] = DailyAggregate(day)
 
-    # Append the temperature and weather condition to the city's rollup
-    daily_data['temps'].append(processed_data['temperature'])
-    daily_data['conditions'].append(processed_data['weather_condition'])
+    daily_data.update(processed_data['temperature'], processed_data['weather_condition'])
 
 def get_daily_summaries(city):
     """
     Retrieve the daily summary of weather data for a specific city.
-    
+
     Args:
         city (str): The name of the city.
 
@@ -31,31 +125,12 @@ def get_daily_summaries(city):
         dict: The summary data containing average, min, and max temperatures, and dominant weather condition.
         None: If no data exists for the specified city.
     """
-    global daily_weather_data  # Access the global variable
-    if city in daily_weather_data:
-        data = daily_weather_data[city]
-        
-        if data['temps']:  # Ensure there's data to summarize
-            avg_temp = sum(data['temps']) / len(data['temps'])
-            max_temp = max(data['temps'])
-            min_temp = min(data['temps'])
-
-            # Calculate the most frequent weather condition (dominant condition)
-            weather_count = defaultdict(int)
-            for condition in data['conditions']:
-                weather_count[condition] += 1
-            dominant_condition = max(weather_count, key=weather_count.get)
-
-            # Return the summary data
-            return {
-                'city': city,
-                'avg_temperature': round(avg_temp, 2),
-                'max_temperature': round(max_temp, 2),
-                'min_temperature': round(min_temp, 2),
-                'dominant_condition': dominant_condition
-            }
+    daily_data = daily_weather_data.get(city)
+    if daily_data is not None and daily_data.count:
+        return daily_data.summary(city)
     return None  # Return None if no data exists for the city
 
+@timed('process')
 def process_weather_data(data):
     """
     Processes raw weather data fetched from the API into a more usable format.
@@ -77,8 +152,9 @@ def process_weather_data(data):
         min_temperature_celsius = data['main']['temp_min']
         max_temperature_celsius = data['main']['temp_max']
 
-        # Log raw temperature details
-        logging.info(f"Raw temperatures (C) for {city}: Temp: {temperature_celsius}, Min: {min_temperature_celsius}, Max: {max_temperature_celsius}")
+        # Log raw temperature details (debug level, formatted only when enabled)
+        logging.debug("Raw temperatures (C) for %s: Temp: %s, Min: %s, Max: %s",
+                      city, temperature_celsius, min_temperature_celsius, max_temperature_celsius)
 
         # Create the processed data dictionary
         processed_data = {
@@ -97,3 +173,85 @@ def process_weather_data(data):
         logging.error(f"Error processing weather data for {data.get('name', 'Unknown')}: {e}")
         return None
 
+
+@timed('process')
+def process_weather_batch(payloads, threshold=None, timestamp=None):
+    """
+    Processes a whole cycle of raw weather payloads into NumPy columns in one pass.
+
+    Field extraction is a single pass that type-checks each payload before any
+    conversion (NumPy would silently turn '31' or True into a number); rounding and
+    the threshold check run vectorized, and every reading shares one cycle timestamp.
+    Malformed payloads are skipped and logged once with a count.
+
+    Args:
+        payloads (list of dict): The raw weather data from the API, one payload per city.
+        threshold (float, optional): Temperature above which a reading is flagged.
+        timestamp (str, optional): The shared cycle timestamp ('YYYY-MM-DD HH:MM:SS');
+                                   defaults to the current time.
+
+    Returns:
+        dict: Columns 'city' (list of str), 'city_id' (int64), 'temperature',
+              'min_temperature', 'max_temperature' (float64), 'condition_code' (int16),
+              plus 'conditions' mapping condition codes to descriptions, the shared 'date',
+              and 'above_threshold' (bool) when a threshold is given.
+    """
+    if timestamp is None:
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    batch, skipped = _extract_columns(payloads)
+    if skipped:
+        logging.error(f"Skipped {skipped} malformed weather payloads")
+
+    batch['date'] = timestamp
+    if threshold is not None:
+        batch['above_threshold'] = batch['temperature'] > threshold
+    return batch
+
+# Range of the int16 condition_code column
+CONDITION_CODE_RANGE = (-2 ** 15, 2 ** 15 - 1)
+
+# Exact types of JSON numbers; type() rather than isinstance() also rejects bool, a subclass of int
+NUMBER_TYPES = (int, float)
+
+def _extract_columns(payloads):
+    # One pass that type-checks each payload before any conversion and collects the valid ones' fields
+    import numpy as np  # Only the batch path needs NumPy; keep it off the per-reading import path
+
+    names, city_ids, temps, min_temps, max_temps, codes = [], [], [], [], [], []
+    conditions = {}
+    low_code, high_code = CONDITION_CODE_RANGE
+    for payload in payloads:
+        try:
+            main = payload['main']
+            weather = payload['weather'][0]
+            name = payload['name']
+            city_id = payload.get('id', -1)
+            temp, min_temp, max_temp = main['temp'], main['temp_min'], main['temp_max']
+            code = weather.get('id', 0)
+            description = weather['description']
+        except (KeyError, IndexError, TypeError, AttributeError):
+            continue
+        if (type(name) is not str or description is None
+                or type(temp) not in NUMBER_TYPES or type(min_temp) not in NUMBER_TYPES
+                or type(max_temp) not in NUMBER_TYPES
+                or type(city_id) is not int or not -2 ** 63 <= city_id < 2 ** 63
+                or type(code) is not int or not low_code <= code <= high_code):
+            continue
+        names.append(name)
+        city_ids.append(city_id)
+        temps.append(temp)
+        min_temps.append(min_temp)
+        max_temps.append(max_temp)
+        codes.append(code)
+        conditions[code] = description
+
+    return {
+        'city': names,
+        'city_id': np.array(city_ids, dtype=np.int64),
+        'temperature': np.round(np.array(temps, dtype=np.float64), 2),
+        'min_temperature': np.round(np.array(min_temps, dtype=np.float64), 2),
+        'max_temperature': np.round(np.array(max_temps, dtype=np.float64), 2),
+        'condition_code': np.array(codes, dtype=np.int16),
+        'conditions': conditions,
+    }, len(payloads) - len(names)
@@ -1,5 +1,39 @@
-import mysql.connector
-from mysql.connector import Error
+import threading
+import time
+from app.timeseries import write_readings
+from app.local_store import LocalStore
+from app.metrics import timed
+
+# Connection settings shared by single connections and the connection pool
+DB_CONFIG = {
+    'host': 'localhost',             # Database host
+    'database': 'weather_monitoring',  # Name of the database
+    'user': 'admin',                 # Replace with your MySQL username
+    'password': 'password'           # Replace with your MySQL password
+}
+
+# SQL statements used for batched writes
+INSERT_SUMMARY_QUERY = """
+INSERT INTO weather_summary (city, date, avg_temperature, max_temperature, min_temperature, weather_condition)
+VALUES (%s, %s, %s, %s, %s, %s)
+"""
+INSERT_ALERT_QUERY = """
+INSERT INTO weather_alerts (city, temperature, alert_time, kind)
+VALUES (%s, %s, %s, %s)
+"""
+
+# Embedded store that single-row writes fall back to when MySQL is unavailable
+fallback_store = None
+
+def set_fallback_store(store):
+    """
+    Sets the LocalStore that `insert_weather_summary` writes to when MySQL is unavailable.
+
+    Args:
+        store (LocalStore): The embedded store, or None to disable the fallback.
+    """
+    global fallback_store
+    fallback_store = store
 
 def create_connection():
     """
@@ -9,14 +43,13 @@ def create_connection():
         connection (mysql.connector.connection.MySQLConnection): The connection object if successful.
         None: If the connection fails.
     """
+    # The MySQL driver is imported on first use, so importing this module stays cheap
+    import mysql.connector
+    from mysql.connector import Error
+
     try:
         # Create a MySQL connection using the provided credentials
-        connection = mysql.connector.connect(
-            host='localhost',         # Database host
-            database='weather_monitoring',  # Name of the database
-            user='admin',             # Replace with your MySQL username
-            password='password'       # Replace with your MySQL password
-        )
+        connection = mysql.connector.connect(**DB_CONFIG)
         
         # Check if the connection is successful
         if connection.is_connected():
@@ -28,6 +61,327 @@ def create_connection():
         print(f"Error while connecting to MySQL: {e}")
         return None
 
+def create_connection_pool(pool_size=5):
+    """
+    Creates a pool of reusable connections to the MySQL database.
+
+    Args:
+        pool_size (int): The number of connections kept in the pool.
+
+    Returns:
+        pool (mysql.connector.pooling.MySQLConnectionPool): The pool object if successful.
+        None: If the pool cannot be created.
+    """
+    from mysql.connector import Error, pooling
+
+    try:
+        return pooling.MySQLConnectionPool(pool_name='weather_pool', pool_size=pool_size, **DB_CONFIG)
+    except Error as e:
+        print(f"Error while creating MySQL connection pool: {e}")
+        return None
+
+def get_pooled_connection(pool):
+    """
+    Takes a live connection from the pool, reconnecting it if the server dropped it.
+    Falls back to a single connection when no pool is available.
+
+    Args:
+        pool (mysql.connector.pooling.MySQLConnectionPool): The pool object, or None.
+
+    Returns:
+        connection (mysql.connector.connection.MySQLConnection): The connection object if successful.
+        None: If no connection can be established.
+    """
+    if pool is None:
+        return create_connection()
+    from mysql.connector import Error
+
+    try:
+        connection = pool.get_connection()
+        connection.ping(reconnect=True, attempts=3, delay=1)  # Transparently revive stale connections
+        return connection
+    except Error as e:
+        print(f"Error while getting a pooled MySQL connection: {e}")
+        return None
+
+class WriteBuffer:
+    """
+    Buffers weather summaries and alerts and writes them in batches.
+
+    Each flush writes all buffered rows with `executemany` inside a single
+    transaction. Buffers are flushed when they reach `max_rows`, every
+    `flush_interval` seconds from a background thread, and on `close()`.
+    If a flush fails the connection is re-established and the flush retried
+    once; rows that still cannot be written stay buffered for the next flush
+    (at most `max_buffered_rows`, beyond which the oldest are dropped with a
+    warning), or are spilled to `local_store` if one is given. Spilled rows are
+    replayed into the database after the next successful flush.
+
+    If the database rejects the batch's data (an integrity or data error), the
+    batch is written again one row per transaction so valid rows still land,
+    and the rejected rows are dropped and counted. With `timeseries`, readings
+    already stored are skipped, so a summary is written once per reading.
+
+    Args:
+        connect (callable): Returns a new DB-API connection, or None on failure.
+                            If None, every flush writes to `local_store` only.
+        max_rows (int): The number of buffered rows that triggers a flush.
+        flush_interval (float): Seconds between timed flushes (0 disables the timer).
+        paramstyle (str): 'format' for MySQL (%s) or 'qmark' for SQLite (?).
+        timeseries (bool): Also write summaries to the raw readings table and its
+                           hourly/daily rollups (see app.timeseries).
+        local_store (LocalStore, optional): Embedded store used when the database is unavailable.
+        max_buffered_rows (int): Rows kept in memory across failed flushes when there is no `local_store`.
+    """
+
+    def __init__(self, connect, max_rows=500, flush_interval=5.0, paramstyle='format', timeseries=False,
+                 local_store=None, max_buffered_rows=100000):
+        self.connect = connect
+        self.timeseries = timeseries
+        self.local_store = local_store
+        self.max_buffered_rows = max_buffered_rows
+        self.rows_spilled = 0
+        self.rows_rejected = 0
+        self.rows_dropped = 0
+        self.rows_skipped = 0
+        self.dialect = 'sqlite' if paramstyle == 'qmark' else 'mysql'
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.connection = None
+        self.summaries = []
+        self.alerts = []
+
+        placeholder = '?' if paramstyle == 'qmark' else '%s'
+        self.summary_query = INSERT_SUMMARY_QUERY.replace('%s', placeholder)
+        self.alert_query = INSERT_ALERT_QUERY.replace('%s', placeholder)
+
+        # Write statistics
+        self.rows_written = 0
+        self.flush_count = 0
+        self.total_flush_seconds = 0.0
+        self.last_flush_seconds = 0.0
+
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._timer = None
+        if flush_interval:
+            self._timer = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._timer.start()
+
+    def add_summary(self, city, date, avg_temp, max_temp, min_temp, weather_condition):
+        """
+        Buffers a weather summary record for the weather_summary table.
+        Takes the same values as `insert_weather_summary`.
+        """
+        with self._lock:
+            self.summaries.append((city, date, avg_temp, max_temp, min_temp, weather_condition))
+            if len(self.summaries) + len(self.alerts) >= self.max_rows:
+                self.flush()
+
+    def add_alert(self, city, current_temp, alert_time, kind='high'):
+        """
+        Buffers a weather alert record for the weather_alerts table.
+
+        Args:
+            city (str): Name of the city for which the alert is triggered.
+            current_temp (float): The temperature that triggered the alert.
+            alert_time (str): When the alert was triggered ('YYYY-MM-DD HH:MM:SS').
+            kind (str): The alert rule that fired ('high', 'low' or 'rate').
+        """
+        with self._lock:
+            self.alerts.append((city, current_temp, alert_time, kind))
+            if len(self.summaries) + len(self.alerts) >= self.max_rows:
+                self.flush()
+
+    @timed('db_write')
+    def flush(self):
+        """
+        Writes all buffered rows in a single transaction.
+
+        Returns:
+            int: The number of rows the database accepted; rows spilled to the local
+                 store, rejected or skipped as already stored are not counted.
+        """
+        with self._lock:
+            if not self.summaries and not self.alerts:
+                return 0
+
+            start = time.perf_counter()
+            written = self.rows_written
+            if self.connect is None:
+                self._spill()  # Local-only mode
+            else:
+                for _ in range(2):
+                    if self._write_batch():
+                        self._replay_spilled()
+                        break
+                    self._reset_connection()  # Reconnect and retry once
+                else:
+                    if self.local_store is None:
+                        self._drop_oldest()
+                        return self.rows_written - written  # Rows written one at a time before the failure
+                    self._spill()
+
+            self.summaries = []
+            self.alerts = []
+
+            self.last_flush_seconds = time.perf_counter() - start
+            self.total_flush_seconds += self.last_flush_seconds
+            self.flush_count += 1
+            return self.rows_written - written
+
+    def stats(self):
+        """
+        Returns write throughput and latency statistics.
+
+        Returns:
+            dict: Rows written to the database, spilled to the local store, rejected,
+                  dropped and skipped as already stored, flush count, rows per second
+                  of flush time, and last/average flush latency in milliseconds.
+        """
+        with self._lock:
+            return {
+                'rows_written': self.rows_written,
+                'rows_spilled': self.rows_spilled,
+                'rows_rejected': self.rows_rejected,
+                'rows_dropped': self.rows_dropped,
+                'rows_skipped': self.rows_skipped,
+                'flushes': self.flush_count,
+                'rows_per_second': round(self.rows_written / self.total_flush_seconds, 2)
+                                   if self.total_flush_seconds else 0.0,
+                'last_flush_ms': round(self.last_flush_seconds * 1000, 2),
+                'avg_flush_ms': round(self.total_flush_seconds / self.flush_count * 1000, 2)
+                                if self.flush_count else 0.0,
+            }
+
+    def close(self):
+        """
+        Stops the flush timer, writes any remaining rows and closes the connection.
+        """
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.join()
+        with self._lock:
+            self.flush()
+            self._reset_connection()
+
+    def _write_batch(self):
+        if self.connection is None:
+            self.connection = self.connect()
+            if self.connection is None:
+                return False
+
+        try:
+            self._write_rows(self.summaries, self.alerts)
+            return True
+        except Exception as e:
+            print(f"Error flushing {len(self.summaries) + len(self.alerts)} buffered rows: {e}")
+            self._rollback()
+            if is_data_error(e):
+                return self._write_rows_individually()
+            return False
+
+    def _write_rows(self, summaries, alerts):
+        # Counts rows only once they are committed
+        buffered = len(summaries)
+        cursor = self.connection.cursor()
+        try:
+            if summaries:
+                if self.timeseries:
+                    summaries = write_readings(cursor, summaries, self.dialect)  # Skips stored readings
+                cursor.executemany(self.summary_query, summaries)
+            if alerts:
+                cursor.executemany(self.alert_query, alerts)
+            self.connection.commit()
+        finally:
+            cursor.close()
+        self.rows_written += len(summaries) + len(alerts)
+        self.rows_skipped += buffered - len(summaries)
+
+    def _write_rows_individually(self):
+        # One transaction per row, so rows the database rejects cannot hold back valid ones.
+        # Written and rejected rows leave the buffer as they go, so a dropped connection
+        # only leaves the remaining rows for the retry.
+        for rows, is_alert in ((self.summaries, False), (self.alerts, True)):
+            while rows:
+                row = rows[0]
+                try:
+                    if is_alert:
+                        self._write_rows([], [row])
+                    else:
+                        self._write_rows([row], [])
+                except Exception as e:
+                    self._rollback()
+                    if not is_data_error(e):
+                        print(f"Error writing buffered rows one at a time: {e}")
+                        return False
+                    print(f"Rejected {'alert' if is_alert else 'summary'} row {row}: {e}")
+                    self.rows_rejected += 1
+                rows.pop(0)
+        return True
+
+    def _rollback(self):
+        try:
+            self.connection.rollback()
+        except Exception:
+            pass  # The connection is likely gone; it is replaced by the caller
+
+    def _spill(self):
+        # Keep the rows durable in the embedded store until the database is back
+        self.local_store.append(self.summaries)
+        self.local_store.add_alerts(self.alerts)
+        self.rows_spilled += len(self.summaries) + len(self.alerts)
+
+    def _drop_oldest(self):
+        # Nowhere to spill: keep memory bounded during a long outage, dropping readings before alerts
+        excess = len(self.summaries) + len(self.alerts) - self.max_buffered_rows
+        if excess <= 0:
+            return
+        dropped_summaries = min(excess, len(self.summaries))
+        del self.summaries[:dropped_summaries]
+        del self.alerts[:excess - dropped_summaries]
+        self.rows_dropped += excess
+        print(f"Warning: database unavailable and no local store; dropped the {excess} oldest buffered rows "
+              f"({self.rows_dropped} in total)")
+
+    def _replay_spilled(self):
+        if self.local_store is None or not self.local_store.pending_rows():
+            return
+        try:
+            replayed = self.local_store.replay(self.connection, self.summary_query, self.alert_query,
+                                               self.timeseries, self.dialect)
+            print(f"Replayed {replayed} rows from the local store.")
+        except Exception as e:
+            print(f"Error replaying rows from the local store: {e}")
+            self._reset_connection()
+
+    def _reset_connection(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+def is_data_error(error):
+    """
+    Tells whether a database error was caused by the rows written (a DB-API
+    IntegrityError or DataError, from either MySQL or SQLite) rather than by the
+    connection, so retrying the same rows cannot succeed.
+
+    Args:
+        error (Exception): The error raised by the driver.
+
+    Returns:
+        bool: True for integrity and data errors.
+    """
+    return any(cls.__name__ in ('IntegrityError', 'DataError') for cls in type(error).__mro__)
+
+@timed('db_write')
 def insert_weather_summary(connection, city, date, avg_temp, max_temp, min_temp, weather_condition):
     """
     Inserts a weather summary record into the weather_summary table.
@@ -41,6 +395,19 @@ def insert_weather_summary(connection, city, date, avg_temp, max_temp, min_temp,
         min_temp (float): The minimum temperature recorded.
         weather_condition (str): The dominant weather condition for the day.
     """
+    row = (city, date, avg_temp, max_temp, min_temp, weather_condition)
+    if isinstance(connection, LocalStore):
+        connection.append([row])
+        return
+    if connection is None:
+        if fallback_store is not None:
+            fallback_store.append([row])  # No database connection; keep the row locally
+        else:
+            print("Error inserting weather summary: no database connection")
+        return
+    from mysql.connector import Error
+
+    cursor = None
     try:
         cursor = connection.cursor()
 
@@ -51,7 +418,7 @@ def insert_weather_summary(connection, city, date, avg_temp, max_temp, min_temp,
         """
 
         # Execute the insert operation with provided values
-        cursor.execute(insert_query, (city, date, avg_temp, max_temp, min_temp, weather_condition))
+        cursor.execute(insert_query, row)
         connection.commit()
 
         # Confirmation message after a successful insertion
@@ -60,9 +427,12 @@ def insert_weather_summary(connection, city, date, avg_temp, max_temp, min_temp,
     except Error as e:
         # Print an error message if something goes wrong during insertion
         print(f"Error inserting weather summary: {e}")
+        if fallback_store is not None:
+            fallback_store.append([row])
     
     finally:
-        cursor.close()  # Close the cursor to free up resources
+        if cursor is not None:
+            cursor.close()  # Close the cursor to free up resources
 
 def get_weather_summaries(connection, city):
     """
@@ -76,6 +446,10 @@ def get_weather_summaries(connection, city):
         rows (list of dict): A list of the most recent 10 weather summaries for the city.
         None: If an error occurs during the fetch.
     """
+    if isinstance(connection, LocalStore):
+        return connection.latest(city, limit=10)
+    from mysql.connector import Error
+
     try:
         cursor = connection.cursor(dictionary=True)  # Fetch data as a dictionary for better readability
 
@@ -105,6 +479,9 @@ def close_connection(connection):
     Args:
         connection (mysql.connector.connection.MySQLConnection): The connection object.
     """
+    if isinstance(connection, LocalStore):
+        connection.close()
+        return
     if connection.is_connected():
         connection.close()
         print("MySQL connection is closed")
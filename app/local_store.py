@@ -0,0 +1,429 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from functools import partial
+import numpy as np
+from app.timeseries import _sql, write_readings
+
+# Column layout of a reading segment: one append-only file per column
+SEGMENT_COLUMNS = {
+    'timestamp': np.int64,      # Unix seconds
+    'city_id': np.int32,
+    'temperature': np.float32,
+    'max_temperature': np.float32,
+    'min_temperature': np.float32,
+    'condition_id': np.int16,
+}
+
+METADATA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cities (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS conditions (id INTEGER PRIMARY KEY, description TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY, rows INTEGER NOT NULL DEFAULT 0, replayed_rows INTEGER NOT NULL DEFAULT 0,
+    start_ts INTEGER, end_ts INTEGER, attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY, city TEXT, temperature REAL, alert_time TEXT, replayed INTEGER NOT NULL DEFAULT 0,
+    kind TEXT NOT NULL DEFAULT 'high', attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS quarantine (
+    id INTEGER PRIMARY KEY, source TEXT NOT NULL, row TEXT NOT NULL, error TEXT, quarantined_at TEXT
+);
+"""
+
+# Columns added to the metadata tables after the first release: (table, column, definition)
+METADATA_MIGRATIONS = [
+    ('segments', 'attempts', "INTEGER NOT NULL DEFAULT 0"),
+    ('alerts', 'kind', "TEXT NOT NULL DEFAULT 'high'"),  # Older stores only held high-temperature alerts
+    ('alerts', 'attempts', "INTEGER NOT NULL DEFAULT 0"),
+]
+
+# Keys of the rows MySQL already holds in a time range, so a batch committed just
+# before a crash (but not yet marked as replayed) is not written twice
+STORED_KEY_QUERIES = {
+    'summary': "SELECT city, date FROM weather_summary WHERE date >= %s AND date <= %s AND city IN ({cities})",
+    'alert': "SELECT city, alert_time, kind FROM weather_alerts "
+             "WHERE alert_time >= %s AND alert_time <= %s AND city IN ({cities})",
+}
+
+class LocalStore:
+    """
+    Embedded storage for running without a database server.
+
+    Readings are appended to columnar segment files (one raw file per column,
+    see SEGMENT_COLUMNS) and scanned zero-copy through NumPy memmaps. City names,
+    conditions, segment row counts and alerts live in a SQLite metadata database
+    in WAL mode. A segment's row count in the metadata is only advanced after its
+    columns are written, so a crash mid-append is truncated away on the next open.
+
+    Rows can later be replayed into MySQL with `replay`, which tracks how far
+    each segment has been replayed so outages can be buffered and drained.
+    Replay is idempotent, and rows MySQL keeps rejecting are moved to a
+    quarantine table after `max_replay_attempts` so they cannot block the rest.
+
+    Args:
+        directory (str): The directory holding the metadata database and segments.
+        segment_rows (int): Rows per segment before a new one is started.
+        max_replay_attempts (int): Failed replays of a batch, on its data, before
+                                   its rejected rows are quarantined.
+    """
+
+    def __init__(self, directory, segment_rows=1_000_000, max_replay_attempts=3):
+        self.directory = directory
+        self.segment_rows = segment_rows
+        self.max_replay_attempts = max_replay_attempts
+        os.makedirs(os.path.join(directory, 'segments'), exist_ok=True)
+
+        self.metadata = sqlite3.connect(os.path.join(directory, 'metadata.db'), check_same_thread=False)
+        self.metadata.execute("PRAGMA journal_mode=WAL")
+        self.metadata.execute("PRAGMA synchronous=NORMAL")
+        self.metadata.executescript(METADATA_SCHEMA)
+        self._migrate()
+        self._lock = threading.RLock()
+
+        self.city_ids = dict(self.metadata.execute("SELECT name, id FROM cities"))
+        self.condition_ids = dict(self.metadata.execute("SELECT description, id FROM conditions"))
+        self._recover()
+
+    def append(self, rows):
+        """
+        Appends readings to the current segment.
+
+        Args:
+            rows (list of tuple): (city, date, avg_temp, max_temp, min_temp, weather_condition)
+                                  rows, as buffered by `WriteBuffer.add_summary`.
+        """
+        if not rows:
+            return
+        with self._lock:
+            columns = {
+                'timestamp': np.array([int(datetime.fromisoformat(str(row[1])).timestamp()) for row in rows],
+                                      dtype=np.int64),
+                'city_id': np.array([self._id_for(self.city_ids, 'cities', 'name', row[0]) for row in rows],
+                                    dtype=np.int32),
+                'temperature': np.array([row[2] for row in rows], dtype=np.float32),
+                'max_temperature': np.array([row[3] for row in rows], dtype=np.float32),
+                'min_temperature': np.array([row[4] for row in rows], dtype=np.float32),
+                'condition_id': np.array([self._id_for(self.condition_ids, 'conditions', 'description', row[5])
+                                          for row in rows], dtype=np.int16),
+            }
+
+            offset = 0
+            while offset < len(rows):
+                segment, segment_rows = self._current_segment()
+                count = min(len(rows) - offset, self.segment_rows - segment_rows)
+                for name, values in columns.items():
+                    with open(self._column_path(segment, name), 'ab') as f:
+                        f.write(values[offset:offset + count].tobytes())
+                timestamps = columns['timestamp'][offset:offset + count]
+                self.metadata.execute(
+                    "UPDATE segments SET rows = rows + ?, start_ts = MIN(COALESCE(start_ts, ?), ?), "
+                    "end_ts = MAX(COALESCE(end_ts, ?), ?) WHERE id = ?",
+                    (count, int(timestamps.min()), int(timestamps.min()),
+                     int(timestamps.max()), int(timestamps.max()), segment))
+                self.metadata.commit()
+                offset += count
+
+    def add_alerts(self, alerts):
+        """
+        Stores alerts until they can be replayed.
+
+        Args:
+            alerts (list of tuple): (city, temperature, alert_time, kind) rows.
+        """
+        if alerts:
+            with self._lock:
+                self.metadata.executemany(
+                    "INSERT INTO alerts (city, temperature, alert_time, kind) VALUES (?, ?, ?, ?)", alerts)
+                self.metadata.commit()
+
+    def scan(self, start=None, end=None, city=None):
+        """
+        Reads readings in a time range from all overlapping segments.
+
+        Segment columns are memory-mapped, so segments that lie entirely inside the
+        range and need no city filter are returned without copying.
+
+        Args:
+            start (datetime, optional): The start of the range (inclusive).
+            end (datetime, optional): The end of the range (exclusive).
+            city (str, optional): Only return readings for this city.
+
+        Returns:
+            list of dict: One dict of column arrays (see SEGMENT_COLUMNS) per segment.
+        """
+        start_ts = int(start.timestamp()) if start else None
+        end_ts = int(end.timestamp()) if end else None
+        city_id = self.city_ids.get(city) if city is not None else None
+        if city is not None and city_id is None:
+            return []
+
+        query = "SELECT id, rows, start_ts, end_ts FROM segments WHERE rows > 0"
+        params = []
+        if start_ts is not None:
+            query += " AND end_ts >= ?"
+            params.append(start_ts)
+        if end_ts is not None:
+            query += " AND start_ts < ?"
+            params.append(end_ts)
+
+        with self._lock:
+            segments = self.metadata.execute(query + " ORDER BY id", params).fetchall()
+
+        results = []
+        for segment, rows, seg_start, seg_end in segments:
+            columns = self._map_segment(segment, rows)
+            inside = (start_ts is None or seg_start >= start_ts) and (end_ts is None or seg_end < end_ts)
+            if inside and city_id is None:
+                results.append(columns)  # Zero-copy: the memmaps themselves
+                continue
+
+            mask = np.ones(rows, dtype=bool)
+            if start_ts is not None:
+                mask &= columns['timestamp'] >= start_ts
+            if end_ts is not None:
+                mask &= columns['timestamp'] < end_ts
+            if city_id is not None:
+                mask &= columns['city_id'] == city_id
+            results.append({name: values[mask] for name, values in columns.items()})
+        return results
+
+    def latest(self, city, limit=10):
+        """
+        Returns the most recent readings for a city, newest first, in the same
+        shape as `get_weather_summaries`.
+        """
+        city_names = {city_id: name for name, city_id in self.city_ids.items()}
+        condition_names = {condition_id: name for name, condition_id in self.condition_ids.items()}
+        rows = []
+        for columns in reversed(self.scan(city=city)):
+            for i in reversed(range(len(columns['timestamp']))):
+                rows.append({
+                    'city': city_names[int(columns['city_id'][i])],
+                    'date': datetime.fromtimestamp(int(columns['timestamp'][i])).strftime('%Y-%m-%d %H:%M:%S'),
+                    'avg_temperature': float(columns['temperature'][i]),
+                    'max_temperature': float(columns['max_temperature'][i]),
+                    'min_temperature': float(columns['min_temperature'][i]),
+                    'weather_condition': condition_names.get(int(columns['condition_id'][i])),
+                })
+                if len(rows) >= limit:
+                    return rows
+        return rows
+
+    def pending_rows(self):
+        """
+        Returns the number of readings and alerts not yet replayed into MySQL.
+        """
+        with self._lock:
+            readings = self.metadata.execute("SELECT COALESCE(SUM(rows - replayed_rows), 0) FROM segments").fetchone()[0]
+            alerts = self.metadata.execute("SELECT COUNT(*) FROM alerts WHERE replayed = 0").fetchone()[0]
+        return readings + alerts
+
+    def replay(self, connection, summary_query, alert_query, timeseries=False, dialect='mysql', batch_rows=10000):
+        """
+        Replays readings and alerts that have not yet reached MySQL, committing
+        and recording progress after every batch so an interrupted replay resumes
+        where it stopped. Rows MySQL already holds are skipped, so a batch that
+        was committed but not yet marked as replayed is not written twice.
+
+        A batch that fails on its data (an integrity or data error) is retried on
+        later replays; after `max_replay_attempts` failures it is written row by
+        row and the rows MySQL rejects are quarantined (see `quarantined`).
+
+        Args:
+            connection (object): A DB-API connection to the MySQL database.
+            summary_query (str): The INSERT statement for weather_summary rows.
+            alert_query (str): The INSERT statement for weather_alerts rows.
+            timeseries (bool): Also write the readings to the time-series tables.
+            dialect (str): 'mysql' or 'sqlite'.
+            batch_rows (int): Rows per transaction.
+
+        Returns:
+            int: The number of rows replayed.
+
+        Raises:
+            Exception: The driver's error if a batch cannot be written (it is retried next time).
+        """
+        from app.database import is_data_error  # Imported here, as app.database imports this module
+
+        city_names = {city_id: name for name, city_id in self.city_ids.items()}
+        condition_names = {condition_id: name for name, condition_id in self.condition_ids.items()}
+        replayed = 0
+
+        with self._lock:
+            segments = self.metadata.execute(
+                "SELECT id, rows, replayed_rows FROM segments WHERE replayed_rows < rows ORDER BY id").fetchall()
+            for segment, rows, done in segments:
+                columns = self._map_segment(segment, rows)
+                while done < rows:
+                    stop = min(rows, done + batch_rows)
+                    batch = [
+                        (city_names[city_id], datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S'),
+                         round(temp, 2), round(max_temp, 2), round(min_temp, 2), condition_names.get(condition_id))
+                        for ts, city_id, temp, max_temp, min_temp, condition_id in zip(
+                            columns['timestamp'][done:stop].tolist(), columns['city_id'][done:stop].tolist(),
+                            columns['temperature'][done:stop].tolist(), columns['max_temperature'][done:stop].tolist(),
+                            columns['min_temperature'][done:stop].tolist(), columns['condition_id'][done:stop].tolist())
+                    ]
+                    write = partial(self._write_summaries, connection, summary_query, timeseries, dialect)
+                    self._write_or_quarantine(write, batch, 'reading', 'segments', "id = ?", (segment,),
+                                              connection, is_data_error)
+                    self.metadata.execute("UPDATE segments SET replayed_rows = ?, attempts = 0 WHERE id = ?",
+                                          (stop, segment))
+                    self.metadata.commit()
+                    replayed += stop - done
+                    done = stop
+
+            alerts = self.metadata.execute(
+                "SELECT id, city, temperature, alert_time, kind FROM alerts WHERE replayed = 0 ORDER BY id").fetchall()
+            if alerts:
+                write = partial(self._write_alerts, connection, alert_query, dialect)
+                self._write_or_quarantine(write, [alert[1:] for alert in alerts], 'alert', 'alerts',
+                                          "replayed = 0 AND id <= ?", (alerts[-1][0],), connection, is_data_error)
+                self.metadata.execute("UPDATE alerts SET replayed = 1 WHERE id <= ?", (alerts[-1][0],))
+                self.metadata.commit()
+                replayed += len(alerts)
+        return replayed
+
+    def quarantined(self):
+        """
+        Returns the rows MySQL kept rejecting during replay.
+
+        Returns:
+            list of tuple: (source, row, error, quarantined_at) where source is 'reading'
+                           or 'alert' and row is the list of the row's values.
+        """
+        with self._lock:
+            rows = self.metadata.execute(
+                "SELECT source, row, error, quarantined_at FROM quarantine ORDER BY id").fetchall()
+        return [(source, json.loads(row), error, quarantined_at) for source, row, error, quarantined_at in rows]
+
+    def close(self):
+        """
+        Closes the metadata database.
+        """
+        with self._lock:
+            self.metadata.close()
+
+    def _write_or_quarantine(self, write, rows, source, table, where, params, connection, is_data_error):
+        # Write a replay batch; once it has failed on its data max_replay_attempts times, write it
+        # row by row and move the rows MySQL rejects to the quarantine table
+        try:
+            write(rows)
+            return
+        except Exception as e:
+            _rollback(connection)
+            if not is_data_error(e):
+                raise
+            # Failures are counted on the metadata rows of the batch (its segment or its alerts)
+            self.metadata.execute(f"UPDATE {table} SET attempts = attempts + 1 WHERE {where}", params)
+            self.metadata.commit()
+            attempts = self.metadata.execute(f"SELECT MAX(attempts) FROM {table} WHERE {where}", params).fetchone()[0]
+            if attempts < self.max_replay_attempts:
+                raise
+
+        for row in rows:
+            try:
+                write([row])
+            except Exception as e:
+                _rollback(connection)
+                if not is_data_error(e):
+                    raise
+                print(f"Quarantined {source} {row} after {self.max_replay_attempts} failed replays: {e}")
+                self.metadata.execute(
+                    "INSERT INTO quarantine (source, row, error, quarantined_at) VALUES (?, ?, ?, ?)",
+                    (source, json.dumps(row, default=str), str(e), datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+                self.metadata.commit()
+
+    @staticmethod
+    def _write_summaries(connection, summary_query, timeseries, dialect, batch):
+        cursor = connection.cursor()
+        try:
+            if timeseries:
+                batch = write_readings(cursor, batch, dialect)  # Skips readings already stored
+            else:
+                batch = _unstored(cursor, batch, 'summary', dialect)
+            cursor.executemany(summary_query, batch)
+            connection.commit()
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _write_alerts(connection, alert_query, dialect, alerts):
+        cursor = connection.cursor()
+        try:
+            cursor.executemany(alert_query, _unstored(cursor, alerts, 'alert', dialect))
+            connection.commit()
+        finally:
+            cursor.close()
+
+    def _id_for(self, cache, table, column, value):
+        # Dictionary-encode strings into small integer IDs kept in the metadata database
+        key = '' if value is None else str(value)
+        value_id = cache.get(key)
+        if value_id is None:
+            cursor = self.metadata.execute(f"INSERT INTO {table} ({column}) VALUES (?)", (key,))
+            value_id = cache[key] = cursor.lastrowid
+        return value_id
+
+    def _migrate(self):
+        for table, column, definition in METADATA_MIGRATIONS:
+            columns = [row[1] for row in self.metadata.execute(f"PRAGMA table_info({table})")]
+            if column not in columns:
+                self.metadata.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        self.metadata.commit()
+
+    def _current_segment(self):
+        row = self.metadata.execute("SELECT id, rows FROM segments ORDER BY id DESC LIMIT 1").fetchone()
+        if row is None or row[1] >= self.segment_rows:
+            cursor = self.metadata.execute("INSERT INTO segments (rows) VALUES (0)")
+            self.metadata.commit()
+            os.makedirs(self._segment_dir(cursor.lastrowid), exist_ok=True)
+            return cursor.lastrowid, 0
+        return row
+
+    def _map_segment(self, segment, rows):
+        return {name: np.memmap(self._column_path(segment, name), dtype=dtype, mode='r', shape=(rows,))
+                for name, dtype in SEGMENT_COLUMNS.items()}
+
+    def _recover(self):
+        # Drop bytes of appends that were interrupted before their row count was committed
+        for segment, rows in self.metadata.execute("SELECT id, rows FROM segments").fetchall():
+            os.makedirs(self._segment_dir(segment), exist_ok=True)
+            for name, dtype in SEGMENT_COLUMNS.items():
+                path = self._column_path(segment, name)
+                expected = rows * np.dtype(dtype).itemsize
+                if not os.path.exists(path):
+                    open(path, 'wb').close()
+                elif os.path.getsize(path) > expected:
+                    os.truncate(path, expected)
+
+    def _segment_dir(self, segment):
+        return os.path.join(self.directory, 'segments', f"{segment:06d}")
+
+    def _column_path(self, segment, name):
+        return os.path.join(self._segment_dir(segment), f"{name}.bin")
+
+def _rollback(connection):
+    try:
+        connection.rollback()
+    except Exception:
+        pass  # The connection is likely gone; the caller replaces it
+
+def _unstored(cursor, rows, kind, dialect):
+    # Rows whose key, (city, time) for summaries or (city, time, kind) for alerts, MySQL does not hold yet
+    if not rows:
+        return rows
+    time_index = 1 if kind == 'summary' else 2
+    keys = [(row[0], str(row[time_index])) + ((row[3],) if kind == 'alert' else ()) for row in rows]
+    times = [key[1] for key in keys]
+    cities = sorted({key[0] for key in keys})
+    stored = set()
+    for i in range(0, len(cities), 500):
+        chunk = cities[i:i + 500]
+        query = STORED_KEY_QUERIES[kind].format(cities=', '.join(['%s'] * len(chunk)))
+        cursor.execute(_sql(query, dialect), [min(times), max(times)] + chunk)
+        stored.update((city, str(time_value)) + tuple(rest) for city, time_value, *rest in cursor.fetchall())
+    return [row for row, key in zip(rows, keys) if key not in stored]
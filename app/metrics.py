@@ -0,0 +1,349 @@
+import bisect
+import collections
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+# Set to False (see `set_enabled`) to turn every timer and counter into a no-op
+enabled = True
+
+# Latency histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram in the Prometheus style.
+
+    Args:
+        buckets (tuple of float): The bucket upper bounds, ascending.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is the +Inf bucket
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """
+        Records one observation.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q, values=None):
+        """
+        Estimates a quantile as the upper bound of the bucket that contains it.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+            values (tuple, optional): (counts, sum, count) from `read`; read now if None.
+        """
+        counts, _, total = values or self.read()
+        target = q * total
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            running += count
+            if running >= target and total:
+                return bound
+        return 0.0
+
+    def read(self):
+        """
+        Returns a consistent copy of (counts, sum, count).
+        """
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def drain(self):
+        """
+        Returns (counts, sum, count) and resets the histogram (see `merge`).
+        """
+        with self._lock:
+            drained = (self.counts, self.sum, self.count)
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.sum = 0.0
+            self.count = 0
+        return drained
+
+    def merge(self, counts, total, count):
+        """
+        Adds observations drained from a histogram with the same buckets.
+        """
+        with self._lock:
+            self.counts = [own + other for own, other in zip(self.counts, counts)]
+            self.sum += total
+            self.count += count
+
+# Registry of all metrics, keyed by name; written by fetch threads and read by the exporters,
+# so histograms are created, and the registry copied for export, only under _lock
+histograms = {}
+counters = collections.defaultdict(float)
+gauges = {}
+_lock = threading.Lock()
+
+def set_enabled(value):
+    """
+    Enables or disables metric collection globally.
+    """
+    global enabled
+    enabled = value
+
+def _histogram(name):
+    # The named histogram, created on first use
+    histogram = histograms.get(name)
+    if histogram is None:
+        with _lock:
+            histogram = histograms.setdefault(name, Histogram())
+    return histogram
+
+def observe(name, seconds):
+    """
+    Records a latency observation in the named histogram.
+    """
+    if enabled:
+        _histogram(name).observe(seconds)
+
+def increment(name, value=1):
+    """
+    Increments the named counter.
+    """
+    if enabled:
+        with _lock:
+            counters[name] += value
+
+def set_gauge(name, value):
+    """
+    Sets the named gauge to a value.
+    """
+    if enabled:
+        with _lock:
+            gauges[name] = value
+
+def drain():
+    """
+    Returns the histograms and counters recorded since the last call and resets them,
+    so a child process can hand its metrics to the parent that exports them (see `merge`).
+
+    Returns:
+        dict: 'histograms' as {name: (counts, sum, count)} and 'counters' as {name: value}.
+    """
+    with _lock:
+        registered = list(histograms.items())
+        drained = {'counters': dict(counters)}
+        counters.clear()
+    drained['histograms'] = {name: values for name, values in
+                             ((name, histogram.drain()) for name, histogram in registered) if values[2]}
+    return drained
+
+def merge(drained):
+    """
+    Adds metrics returned by `drain` (usually in another process) to this registry.
+    """
+    if not enabled:
+        return
+    for name, (counts, total, count) in drained['histograms'].items():
+        _histogram(name).merge(counts, total, count)
+    for name, value in drained['counters'].items():
+        increment(name, value)
+
+def timed(stage):
+    """
+    Decorator that records the wall time of every call in the `stage_seconds`
+    histogram and counts calls in `stage_calls_total`. When metrics are disabled
+    the only overhead is one flag check per call.
+
+    Args:
+        stage (str): The pipeline stage name, e.g. 'fetch' or 'process'.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _histogram(f"{stage}_seconds").observe(time.perf_counter() - start)
+                increment(f"{stage}_calls_total")
+        return wrapper
+    return decorator
+
+def record_cycle(seconds, interval):
+    """
+    Records a monitoring cycle's duration and whether it overran its interval.
+
+    Args:
+        seconds (float): How long the cycle took.
+        interval (float): The time budget for one cycle (SLEEP_INTERVAL).
+    """
+    if not enabled:
+        return
+    _histogram('cycle_seconds').observe(seconds)
+    increment('cycles_total')
+    set_gauge('cycle_last_seconds', seconds)
+    if seconds > interval:
+        increment('cycle_overruns_total')
+        increment('cycle_overrun_seconds_total', seconds - interval)
+
+def _registry():
+    # Consistent copies of the counters and gauges, and each histogram with its (counts, sum, count)
+    with _lock:
+        current_counters, current_gauges = dict(counters), dict(gauges)
+        registered = list(histograms.items())
+    return current_counters, current_gauges, [(name, histogram, histogram.read()) for name, histogram in registered]
+
+def snapshot():
+    """
+    Returns all metrics as a JSON-serializable dict, with p50/p95/p99 estimates per histogram.
+    """
+    current_counters, current_gauges, current_histograms = _registry()
+    return {
+        'timestamp': time.time(),
+        'counters': current_counters,
+        'gauges': current_gauges,
+        'histograms': {
+            name: {'count': values[2], 'sum': round(values[1], 6),
+                   'p50': histogram.quantile(0.5, values), 'p95': histogram.quantile(0.95, values),
+                   'p99': histogram.quantile(0.99, values)}
+            for name, histogram, values in current_histograms
+        },
+    }
+
+def render_prometheus(prefix='weather_'):
+    """
+    Renders all metrics in the Prometheus text exposition format.
+    """
+    current_counters, current_gauges, current_histograms = _registry()
+    lines = []
+    for name, value in sorted(current_counters.items()):
+        lines += [f"# TYPE {prefix}{name} counter", f"{prefix}{name} {value}"]
+    for name, value in sorted(current_gauges.items()):
+        lines += [f"# TYPE {prefix}{name} gauge", f"{prefix}{name} {value}"]
+    for name, histogram, (counts, total, count) in sorted(current_histograms, key=lambda item: item[0]):
+        lines.append(f"# TYPE {prefix}{name} histogram")
+        running = 0
+        for bound, bucket_count in zip(histogram.buckets + (float('inf'),), counts):
+            running += bucket_count
+            label = '+Inf' if bound == float('inf') else bound
+            lines.append(f'{prefix}{name}_bucket{{le="{label}"}} {running}')
+        lines += [f"{prefix}{name}_sum {total}", f"{prefix}{name}_count {count}"]
+    return '\n'.join(lines) + '\n'
+
+def start_http_server(port, host='127.0.0.1'):
+    """
+    Serves `/metrics` (Prometheus text) and `/metrics.json` from a background thread.
+
+    Args:
+        port (int): The port to listen on.
+        host (str): The interface to bind to.
+
+    Returns:
+        ThreadingHTTPServer: The running server (call `shutdown()` to stop it).
+    """
+    # http.server is only imported when metrics are actually served
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] == '/metrics':
+                body, content_type = render_prometheus().encode(), 'text/plain; version=0.0.4'
+            elif self.path.split('?')[0] == '/metrics.json':
+                body, content_type = json.dumps(snapshot()).encode(), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes should not flood the application log
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def start_json_snapshots(path, interval=60):
+    """
+    Atomically writes a JSON snapshot of all metrics to `path` every `interval` seconds.
+
+    Returns:
+        threading.Event: Set it to stop writing snapshots.
+    """
+    stop = threading.Event()
+
+    def write_snapshots():
+        while not stop.wait(interval):
+            tmp_path = f"{path}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(snapshot(), f, indent=2)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Error writing metrics snapshot '{path}': {e}")
+
+    threading.Thread(target=write_snapshots, daemon=True).start()
+    return stop
+
+class CycleProfiler:
+    """
+    Sampling profiler for catching slow cycles.
+
+    While a cycle runs, a background thread samples the stack of the thread that
+    started it every `sample_interval` seconds. If the cycle takes longer than
+    `threshold` seconds, the most frequently sampled stacks are logged; otherwise
+    the samples are discarded.
+
+    Args:
+        threshold (float): Cycle duration in seconds above which samples are reported.
+        sample_interval (float): Seconds between stack samples.
+        top (int): Number of distinct stacks to report.
+    """
+
+    def __init__(self, threshold, sample_interval=0.01, top=5):
+        self.threshold = threshold
+        self.sample_interval = sample_interval
+        self.top = top
+
+    def __enter__(self):
+        self._samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread_id = threading.get_ident()
+        self._start = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._sampler.join()
+        duration = time.perf_counter() - self._start
+        if duration > self.threshold and self._samples:
+            total = sum(self._samples.values())
+            report = [f"Slow cycle: {duration:.2f}s (threshold {self.threshold:.2f}s), {total} samples"]
+            for stack, count in self._samples.most_common(self.top):
+                report.append(f"  {count / total:6.1%}  {stack}")
+            logging.warning('\n'.join(report))
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.sample_interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                # Innermost few frames, outermost first, as a compact call chain
+                stack = traceback.extract_stack(frame, limit=6)
+                self._samples[' > '.join(f"{os.path.basename(f.filename)}:{f.name}" for f in stack)] += 1
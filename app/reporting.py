@@ -0,0 +1,217 @@
+import multiprocessing
+import queue
+import time
+from app import metrics
+
+def render_outputs(renderer, daily_summaries=(), small_multiples_file=None, report_file=None):
+    """
+    Renders a TrendRenderer's plot if new readings arrived, then the small multiples
+    and the HTML report if they are configured.
+
+    Args:
+        renderer (TrendRenderer): The renderer holding the readings.
+        daily_summaries (list of dict): The daily summaries listed in the report.
+        small_multiples_file (str, optional): The file the per-city small multiples are written to.
+        report_file (str, optional): The HTML report to write.
+
+    Returns:
+        str: The trends plot written, or None if it was unchanged.
+    """
+    from app.visualization import figure_svg, write_html_report
+
+    plot_file = renderer.render()
+    small_multiples = None
+    if small_multiples_file and plot_file:
+        small_multiples = renderer.render_small_multiples(small_multiples_file)
+    if report_file:
+        figures = [("Temperature Trends", renderer.svg())]
+        if small_multiples is not None:
+            figures.append(("Cities", figure_svg(small_multiples)))
+        write_html_report(report_file, daily_summaries, figures)
+    return plot_file
+
+def run_render_worker(requests, stats, filename, keep, formats, small_multiples_file, report_file,
+                      timings=None, metrics_enabled=True, history_days=7):
+    """
+    Render process loop: applies plot requests to a TrendRenderer it owns and
+    re-renders the plot, the small multiples and the HTML report.
+
+    Requests that arrive while a render is in progress are coalesced: all of them
+    are applied (appending points is cheap) and then rendered once, with the newest
+    daily summaries replacing older ones. Malformed records are skipped and logged,
+    so they never stop the process or later renders.
+
+    Args:
+        requests (multiprocessing.Queue): (weather_summaries, daily_summaries) tuples, None to stop.
+        stats (multiprocessing.Array): Shared [requests, renders, last render seconds] counters.
+        filename (str): The PNG file the trends plot is written to.
+        keep (int): The number of previous renders to keep.
+        formats (tuple of str): Extra formats the trends plot is exported to, e.g. ('svg',).
+        small_multiples_file (str, optional): The file the per-city small multiples are written to.
+        report_file (str, optional): The HTML report written after each render.
+        timings (multiprocessing.Queue, optional): Where the 'plot' stage metrics recorded
+                                                   here are sent after each render (see `metrics.drain`).
+        metrics_enabled (bool): Whether metrics are collected (as in the parent process).
+        history_days (float, optional): Days of readings plotted per city (see `TrendRenderer`).
+    """
+    # Only this process imports matplotlib
+    from app.visualization import TrendRenderer
+
+    metrics.set_enabled(metrics_enabled)
+
+    renderer = TrendRenderer(filename=filename, keep=keep, formats=formats, history_days=history_days)
+    daily_summaries = {}
+    stopping = False
+    while not stopping:
+        report_changed = False
+        pending = [requests.get()]
+        while True:
+            try:
+                pending.append(requests.get_nowait())
+            except queue.Empty:
+                break
+
+        for request in pending:
+            if request is None:
+                stopping = True
+                continue
+            weather_summaries, summaries = request
+            try:
+                renderer.update(weather_summaries)
+            except Exception:
+                # Apply the records one by one so a malformed one does not drop the rest of the request
+                skipped = 0
+                for entry in weather_summaries:
+                    try:
+                        renderer.update([entry])
+                    except Exception:
+                        skipped += 1
+                print(f"Error while applying plot request: skipped {skipped} malformed records")
+            try:
+                daily_summaries.update((summary['city'], summary) for summary in summaries)
+                report_changed = report_changed or bool(summaries)
+            except (KeyError, TypeError) as e:
+                print(f"Error while applying daily summaries: {e}")
+        with stats.get_lock():
+            stats[0] += len(pending) - stopping
+
+        if not renderer.dirty and not (report_file and report_changed):
+            continue
+        start = time.perf_counter()
+        try:
+            render_outputs(renderer, list(daily_summaries.values()), small_multiples_file, report_file)
+        except Exception as e:
+            print(f"Error while rendering temperature trends: {e}")
+        with stats.get_lock():
+            stats[1] += 1
+            stats[2] = time.perf_counter() - start
+        if timings is not None and metrics_enabled:
+            timings.put(metrics.drain())
+
+class RenderWorker:
+    """
+    Drop-in replacement for TrendRenderer that renders in a separate process, so
+    matplotlib layout and image encoding never hold up the monitoring loop.
+
+    `update` only buffers records and `render` hands them, with a snapshot of the
+    cycle's daily summaries, to the render process and returns immediately. When
+    rendering falls behind, queued requests are merged into a single render of the
+    newest data rather than rendered one by one.
+
+    The render process is started with the 'spawn' method, so it never inherits the
+    caller's threads, locks or open database connections, whenever it is created.
+    The 'plot' stage metrics it records are sent back and merged into this process's
+    registry, so they are exported with the rest. If the render process dies, this
+    is logged once and later renders are dropped instead of queued.
+
+    Args:
+        filename (str): The PNG file the trends plot is written to.
+        keep (int): The number of previous renders to keep as rotated copies.
+        formats (tuple of str): Extra formats the trends plot is exported to, e.g. ('svg',).
+        small_multiples_file (str, optional): Also write one small chart per city to this file.
+        report_file (str, optional): Also write an HTML report with the charts and daily summaries.
+        history_days (float, optional): Days of readings plotted per city (see `TrendRenderer`).
+    """
+
+    def __init__(self, filename='temperature_trends.png', keep=0, formats=(), small_multiples_file=None,
+                 report_file=None, history_days=7):
+        context = multiprocessing.get_context('spawn')
+        self.pending = []
+        self.requests = context.Queue()
+        self.stats_values = context.Array('d', 3)
+        self.timings = context.Queue()
+        self.process = context.Process(
+            target=run_render_worker, name='weather-renderer',
+            args=(self.requests, self.stats_values, filename, keep, tuple(formats), small_multiples_file,
+                  report_file, self.timings, metrics.enabled, history_days),
+            daemon=True)
+        self.process.start()
+        self.submitted = 0
+        self.dead = False
+
+    def update(self, weather_summaries):
+        """
+        Buffers new readings for the next `render` (see `TrendRenderer.update`).
+        """
+        self.pending.extend(weather_summaries)
+
+    def render(self, daily_summaries=()):
+        """
+        Sends the buffered readings and the given daily summaries to the render process.
+
+        Args:
+            daily_summaries (list of dict): The latest daily summaries, for the HTML report.
+
+        Returns:
+            None: Files are written by the render process in the background.
+        """
+        self._merge_timings()
+        if not self.process.is_alive():
+            if not self.dead:
+                print(f"Error: render process exited with code {self.process.exitcode}; "
+                      "no further plots will be rendered")
+                self.dead = True
+            self.pending = []
+            return None
+        if not self.pending and not daily_summaries:
+            return None
+        # The queue pickles in its feeder thread, so this never waits for the render process
+        self.requests.put((self.pending, list(daily_summaries)))
+        self.pending = []
+        self.submitted += 1
+        return None
+
+    def stats(self):
+        """
+        Returns the render statistics.
+
+        Returns:
+            dict: Requests submitted and applied, renders done (fewer than requests
+                  when renders were coalesced) and the duration of the last render.
+        """
+        self._merge_timings()
+        with self.stats_values.get_lock():
+            applied, renders, last_seconds = self.stats_values[:]
+        return {'submitted': self.submitted, 'applied': int(applied), 'renders': int(renders),
+                'coalesced': int(applied - renders), 'last_render_seconds': round(last_seconds, 4)}
+
+    def close(self, timeout=30):
+        """
+        Sends any buffered readings, waits for the final render and stops the render process.
+        """
+        if self.pending:
+            self.render()
+        if self.process.is_alive():
+            self.requests.put(None)
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self._merge_timings()
+
+    def _merge_timings(self):
+        # Metrics the render process recorded since the last call
+        while True:
+            try:
+                metrics.merge(self.timings.get_nowait())
+            except queue.Empty:
+                return
@@ -0,0 +1,266 @@
+import random
+import threading
+import time
+import requests
+
+# Status codes worth retrying: throttling and transient server errors
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+class RateLimiter:
+    """
+    Thread-safe token bucket limiting outgoing API calls to the rate of the API plan.
+
+    Args:
+        rate (float): Sustained calls per second.
+        burst (float, optional): The bucket size, i.e. calls allowed back to back; defaults to `rate`.
+        clock (callable): Returns the current time in seconds (monotonic).
+        sleep (callable): Sleeps for a number of seconds.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.burst
+        self.refilled_at = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """
+        Takes one token, waiting for it if the bucket is empty.
+
+        Args:
+            deadline (float, optional): Clock time after which to give up instead of waiting.
+
+        Returns:
+            bool: True once a token is taken, False if none would be available before `deadline`.
+        """
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+                self.refilled_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = max((1 - self.tokens) / self.rate, 1e-6)
+            if deadline is not None and now + wait > deadline:
+                return False
+            self.sleep(wait)
+
+class CircuitBreaker:
+    """
+    Stops calling an endpoint that keeps failing.
+
+    After `failure_threshold` consecutive failures the breaker opens and calls are
+    refused for `reset_timeout` seconds. Then it half-opens and lets a single trial
+    call through: success closes it again, failure re-opens it for another timeout.
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the breaker.
+        reset_timeout (float): Seconds the breaker stays open before a trial call.
+        clock (callable): Returns the current time in seconds (monotonic).
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Returns whether a call may be made now.
+        """
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = 'half-open'
+                return True  # The single trial call
+            return False
+
+    def record_success(self):
+        """
+        Records a successful call, closing the breaker.
+        """
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        """
+        Records a failed call, opening the breaker if the threshold is reached or a trial call failed.
+        """
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half-open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                self.state = 'open'
+                self.opened_at = self.clock()
+                self.times_opened += 1
+
+class ResilientClient:
+    """
+    Reliability layer for API calls: a rate limiter shared by all calls, retries
+    with jittered exponential backoff, a circuit breaker per endpoint and a
+    last-known-value fallback.
+
+    Retries honor `Retry-After` on 429 responses and otherwise wait a random time
+    up to `backoff_base * 2 ** attempt` seconds (capped at `backoff_cap`), so
+    concurrent callers don't retry in lockstep. No call or backoff is started that
+    would end after the current cycle's deadline (see `start_cycle`). When a city
+    cannot be fetched, its last known payload is served instead, marked with
+    `'stale': True`.
+
+    Args:
+        rate (float): Sustained API calls per second allowed by the API plan.
+        burst (float, optional): Calls allowed back to back; defaults to `rate`.
+        max_retries (int): Retries per call after the first attempt.
+        backoff_base (float): Upper bound of the first backoff in seconds.
+        backoff_cap (float): Upper bound of any backoff in seconds.
+        failure_threshold (int): Consecutive failures that open an endpoint's breaker.
+        reset_timeout (float): Seconds an open breaker waits before a trial call.
+        clock (callable): Returns the current time in seconds (monotonic).
+        sleep (callable): Sleeps for a number of seconds.
+        rng (random.Random, optional): Random source for the backoff jitter.
+    """
+
+    def __init__(self, rate, burst=None, max_retries=3, backoff_base=0.5, backoff_cap=30.0,
+                 failure_threshold=5, reset_timeout=60, clock=time.monotonic, sleep=time.sleep, rng=None):
+        self.limiter = RateLimiter(rate, burst, clock, sleep)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.deadline = None
+        self.breakers = {}
+        self.last_known = {}  # city -> last successfully fetched payload
+        self.counts = {'calls': 0, 'retries': 0, 'failures': 0, 'short_circuited': 0,
+                       'rate_limited': 0, 'past_deadline': 0, 'stale_served': 0}
+        self._lock = threading.Lock()
+
+    def start_cycle(self, seconds):
+        """
+        Sets the deadline for the calls of the current cycle, `seconds` from now.
+        """
+        self.deadline = self.clock() + seconds
+
+    def get(self, http, endpoint, url, timeout):
+        """
+        Makes a GET request through the rate limiter and the endpoint's circuit breaker,
+        retrying throttled, failed and timed-out calls.
+
+        Args:
+            http (object): A requests.Session or the requests module.
+            endpoint (str): The endpoint name the circuit breaker is kept for, e.g. 'weather'.
+            url (str): The URL to request.
+            timeout (float): The per-request deadline in seconds.
+
+        Returns:
+            requests.Response: The last response received, successful or not.
+            None: If no response was received (breaker open, out of time or network errors).
+        """
+        breaker = self._breaker(endpoint)
+        response = None
+        for attempt in range(self.max_retries + 1):
+            latest_start = self._latest_start(timeout)
+            if latest_start is not None and self.clock() > latest_start:
+                self._count('past_deadline')  # Even with a token to spare, the call would end too late
+                return response
+            if not breaker.allow():
+                self._count('short_circuited')
+                return response
+            if not self.limiter.acquire(latest_start):
+                self._count('rate_limited')
+                return response
+
+            self._count('calls')
+            retry_after = None
+            try:
+                response = http.get(url, timeout=timeout)
+            except requests.RequestException as e:
+                print(f"Network error occurred while requesting {endpoint} (attempt {attempt + 1}): {e}")
+                response = None
+            else:
+                if response.status_code not in RETRYABLE_STATUSES:
+                    breaker.record_success()  # Any non-retryable answer (200, 404, ...) means the API is up
+                    return response
+                retry_after = self._retry_after(response)
+
+            breaker.record_failure()
+            self._count('failures')
+            if attempt == self.max_retries:
+                break
+            delay = retry_after if retry_after is not None else self.rng.uniform(
+                0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+            latest_start = self._latest_start(timeout)
+            if latest_start is not None and self.clock() + delay > latest_start:
+                break  # A retry could not finish before the cycle deadline
+            self._count('retries')
+            self.sleep(delay)
+        return response
+
+    def with_fallback(self, city, payload):
+        """
+        Remembers a successfully fetched payload, or substitutes the city's last
+        known payload (marked `'stale': True`) for a failed fetch.
+
+        Args:
+            city (str): The name of the city.
+            payload (dict): The fetched weather payload, or None if the fetch failed.
+
+        Returns:
+            dict: The fresh payload, or a stale copy of the last known one.
+            None: If the fetch failed and the city was never fetched successfully.
+        """
+        if payload:
+            self.last_known[city] = payload
+            return payload
+        last = self.last_known.get(city)
+        if last is None:
+            return None
+        self._count('stale_served')
+        return dict(last, stale=True)
+
+    def stats(self):
+        """
+        Returns call, retry and fallback counts and the state of each endpoint's breaker.
+        """
+        with self._lock:
+            stats = dict(self.counts)
+        stats['breakers'] = {endpoint: breaker.state for endpoint, breaker in self.breakers.items()}
+        return stats
+
+    def _breaker(self, endpoint):
+        with self._lock:
+            breaker = self.breakers.get(endpoint)
+            if breaker is None:
+                breaker = self.breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.reset_timeout,
+                                                                   self.clock)
+            return breaker
+
+    def _latest_start(self, timeout):
+        # The last moment a call can start and still time out before the cycle deadline
+        return None if self.deadline is None else self.deadline - timeout
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    @staticmethod
+    def _retry_after(response):
+        if response.status_code != 429:
+            return None
+        try:
+            return max(0.0, float(response.headers.get('Retry-After')))
+        except (TypeError, ValueError):
+            return None  # Missing or an HTTP date; fall back to the jittered backoff
@@ -0,0 +1,148 @@
+import heapq
+import random
+import time
+from config import TEMP_THRESHOLD, SLEEP_INTERVAL
+
+class AdaptiveScheduler:
+    """
+    Schedules each city's next fetch on its own timeline.
+
+    Cities whose temperature is within `near_margin` degrees of the alert threshold,
+    or that changed by at least `fast_change` degrees since their previous reading,
+    are polled every `min_interval` seconds. Stable cities back off geometrically
+    towards `max_interval`. Fetches are paced by a token bucket of `rate_budget`
+    API requests per second, so a burst of due cities is spread out rather than
+    exceeding the API plan. With batched fetching, one request (token) covers up to
+    `cities_per_request` cities.
+
+    Timing is drift-free: the next due time is computed from the previous due time,
+    not from when the work finished. When fetching falls behind by more than one
+    interval, missed slots are skipped instead of queued (backpressure), and the
+    lag is recorded in `max_lag`.
+
+    Args:
+        cities (list of str): The names of the cities to schedule.
+        base_interval (float): The initial (and non-adaptive) polling interval in seconds.
+        min_interval (float): The polling interval for cities near the threshold or changing fast.
+        max_interval (float): The longest polling interval for stable cities.
+        rate_budget (float): The maximum sustained API requests per second.
+        burst (float, optional): The token bucket size; defaults to one minute of budget.
+        cities_per_request (int): Cities fetched by one request (GROUP_CHUNK_SIZE with the
+                                  group endpoint, 1 with one request per city).
+        threshold (float): The alert threshold the scheduler watches.
+        near_margin (float): Degrees from the threshold that count as "near".
+        fast_change (float): Degrees of change between readings that count as "fast".
+        adaptive (bool): If False, every city is polled every `base_interval` seconds.
+        clock (callable): Returns the current time in seconds (monotonic).
+        rng (random.Random, optional): Random source for the jittered start.
+    """
+
+    def __init__(self, cities, base_interval=SLEEP_INTERVAL, min_interval=60, max_interval=1800,
+                 rate_budget=1.0, burst=None, threshold=TEMP_THRESHOLD, near_margin=2.0,
+                 fast_change=2.0, adaptive=True, clock=time.monotonic, rng=None, cities_per_request=1):
+        self.base_interval = base_interval
+        self.min_interval = min_interval if adaptive else base_interval
+        self.max_interval = max_interval if adaptive else base_interval
+        self.rate_budget = rate_budget
+        self.burst = burst if burst is not None else max(1.0, rate_budget * 60)
+        self.cities_per_request = cities_per_request
+        self.threshold = threshold
+        self.near_margin = near_margin
+        self.fast_change = fast_change
+        self.clock = clock
+        rng = rng or random.Random()
+
+        now = clock()
+        self.tokens = self.burst
+        self.refilled_at = now
+        self.intervals = {}
+        self.scheduled = {}  # city -> due time of the fetch currently in progress
+        self.last_temps = {}
+        self.max_lag = 0.0
+        self.fetches = 0
+        self.requests = 0
+
+        # Spread the first fetches over one base interval so they don't all fire at once
+        self.heap = []
+        for city in cities:
+            self.intervals[city] = base_interval
+            heapq.heappush(self.heap, (now + rng.uniform(0, base_interval), city))
+
+    def due(self, now=None):
+        """
+        Pops the cities that are due, as far as the rate budget allows.
+
+        Args:
+            now (float, optional): The current time; defaults to the scheduler's clock.
+
+        Returns:
+            list of str: The cities to fetch now. Each must be passed back to `record`.
+        """
+        if now is None:
+            now = self.clock()
+        self._refill(now)
+
+        cities = []
+        while self.heap and self.heap[0][0] <= now:
+            # Every `cities_per_request` cities start a new request, which costs a token
+            if len(cities) % self.cities_per_request == 0:
+                if self.tokens < 1:
+                    break
+                self.tokens -= 1
+                self.requests += 1
+            due_at, city = heapq.heappop(self.heap)
+            self.scheduled[city] = due_at
+            self.max_lag = max(self.max_lag, now - due_at)
+            cities.append(city)
+        self.fetches += len(cities)
+        return cities
+
+    def record(self, city, temperature, now=None):
+        """
+        Reschedules a fetched city based on its latest reading.
+
+        Args:
+            city (str): The name of the city.
+            temperature (float): The latest temperature, or None if the fetch failed
+                                 or the reading had not changed.
+            now (float, optional): The current time; defaults to the scheduler's clock.
+        """
+        if now is None:
+            now = self.clock()
+        interval = self.intervals[city]
+
+        if temperature is not None:
+            previous = self.last_temps.get(city)
+            near = abs(temperature - self.threshold) <= self.near_margin
+            fast = previous is not None and abs(temperature - previous) >= self.fast_change
+            if near or fast:
+                interval = self.min_interval
+            else:
+                interval = min(self.max_interval, max(self.base_interval, interval * 1.5))
+            self.last_temps[city] = temperature
+        self.intervals[city] = interval
+
+        # Drift-free: step from the slot that was due, skipping slots already missed
+        next_due = self.scheduled.pop(city, now) + interval
+        if next_due <= now:
+            next_due += ((now - next_due) // interval + 1) * interval
+        heapq.heappush(self.heap, (next_due, city))
+
+    def next_wakeup(self, now=None):
+        """
+        Returns the time at which the next city can be fetched, taking the rate budget into account.
+        """
+        if now is None:
+            now = self.clock()
+        if not self.heap:
+            return now + self.base_interval
+        self._refill(now)
+        wakeup = self.heap[0][0]
+        if self.tokens < 1:
+            # Wait for the next whole token (at least a microsecond, so float rounding can't stall)
+            wakeup = max(wakeup, now + max((1 - self.tokens) / self.rate_budget, 1e-6))
+        return wakeup
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate_budget)
+        self.refilled_at = now
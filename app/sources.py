@@ -0,0 +1,415 @@
+import csv
+import glob
+import heapq
+import itertools
+import json
+import logging
+import queue
+import threading
+from collections import namedtuple
+from operator import attrgetter
+from datetime import datetime
+
+# A normalized reading, whatever source it came from (temperatures in °C, timestamp in Unix seconds)
+Reading = namedtuple('Reading', ['city', 'timestamp', 'temperature', 'min_temperature', 'max_temperature',
+                                 'condition', 'source'])
+
+# Field names of normalized readings that file sources map their columns to
+FILE_FIELDS = ('city', 'timestamp', 'temperature', 'min_temperature', 'max_temperature', 'condition')
+
+class SourceAdapter:
+    """
+    Base class of weather data sources. Subclasses implement `readings` to stream
+    normalized Reading tuples; `chunks` batches them for the fan-out.
+
+    Args:
+        name (str): The source name, stored on each reading and used to look up its priority.
+        priority (int): Readings from higher-priority sources win when merged.
+    """
+
+    def __init__(self, name, priority=0):
+        self.name = name
+        self.priority = priority
+
+    def readings(self):
+        """
+        Yields the source's readings as Reading tuples.
+        """
+        raise NotImplementedError
+
+    def chunks(self, chunk_size=1000):
+        """
+        Yields the source's readings in lists of up to `chunk_size`.
+        """
+        readings = self.readings()
+        while True:
+            chunk = list(itertools.islice(readings, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+def normalize_openweathermap(payload, source='openweathermap'):
+    """
+    Converts an OpenWeatherMap current-weather payload into a Reading.
+
+    Args:
+        payload (dict): The raw weather data from the API.
+        source (str): The source name stored on the reading.
+
+    Returns:
+        Reading: The normalized reading (timestamped with the observation time 'dt').
+        None: If the payload is malformed.
+    """
+    try:
+        main = payload['main']
+        return Reading(payload['name'], float(payload['dt']), round(main['temp'], 2), round(main['temp_min'], 2),
+                       round(main['temp_max'], 2), payload['weather'][0]['description'], source)
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+class OpenWeatherMapSource(SourceAdapter):
+    """
+    Current weather of a list of cities from the OpenWeatherMap API.
+
+    Args:
+        cities (list of str): The names of the cities to fetch.
+        fetch (callable): Called with the list of cities; returns an iterable of
+                          (city, data) like `fetch_all_weather_data`.
+        name (str): The source name.
+        priority (int): The source priority.
+    """
+
+    def __init__(self, cities, fetch, name='openweathermap', priority=0):
+        super().__init__(name, priority)
+        self.cities = cities
+        self.fetch = fetch
+
+    def readings(self):
+        for _, data in self.fetch(self.cities):
+            # Stale fallbacks repeat an earlier observation and would only ever be duplicates
+            if data and not data.get('stale'):
+                reading = normalize_openweathermap(data, self.name)
+                if reading is not None:
+                    yield reading
+
+def parse_timestamp(value):
+    """
+    Parses Unix seconds or an ISO 8601 date and time (e.g. '2024-06-01 14:05:00') into Unix seconds.
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+class FileSource(SourceAdapter):
+    """
+    Readings from NDJSON or CSV files, such as files dropped by local weather
+    stations. Files are read one row at a time, so memory use stays constant
+    however many rows they hold. Malformed rows are skipped and counted.
+
+    Each row needs a city, a timestamp (Unix seconds or ISO 8601) and a
+    temperature in °C; min/max temperature and condition are optional.
+
+    When a glob matches several files, such as one file per sensor covering the
+    same period, their rows are merged by timestamp (each file being in time
+    order), so the source still delivers one time-ordered stream for the
+    `ReadingMerger`.
+
+    Args:
+        pattern (str): A file path or glob pattern, e.g. 'feeds/*.ndjson'. Files
+                       ending in '.csv' are read as CSV with a header row,
+                       anything else as one JSON object per line.
+        name (str): The source name.
+        priority (int): The source priority.
+        columns (dict, optional): Maps field names (see FILE_FIELDS) to the names
+                                  the files use, e.g. {'temperature': 'temp_c'}.
+        interleave (bool): Merge the files by timestamp; False reads them one after
+                           another, which is cheaper when order does not matter.
+    """
+
+    def __init__(self, pattern, name, priority=0, columns=None, interleave=True):
+        super().__init__(name, priority)
+        self.pattern = pattern
+        self.interleave = interleave
+        self.columns = {field: (columns or {}).get(field, field) for field in FILE_FIELDS}
+        self.rows = 0
+        self.skipped = 0
+
+    def readings(self):
+        files = [self._read_file(path) for path in sorted(glob.glob(self.pattern))]
+        if self.interleave and len(files) > 1:
+            return heapq.merge(*files, key=attrgetter('timestamp'))
+        return itertools.chain.from_iterable(files)
+
+    def _read_file(self, path):
+        skipped = 0
+        rows = self._read_csv(path) if path.endswith('.csv') else self._read_ndjson(path)
+        for row in rows:
+            self.rows += 1
+            reading = self._normalize(row)
+            if reading is None:
+                skipped += 1
+            else:
+                yield reading
+        self.skipped += skipped
+        if skipped:
+            logging.error(f"Skipped {skipped} malformed rows in '{path}'")
+
+    def _read_csv(self, path):
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            # Look up column positions once instead of building a dict per row
+            positions = [header.index(self.columns[field]) if self.columns[field] in header else None
+                         for field in FILE_FIELDS]
+            for values in reader:
+                yield [values[position] if position is not None and position < len(values) else None
+                       for position in positions]
+
+    def _read_ndjson(self, path):
+        names = [self.columns[field] for field in FILE_FIELDS]
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    yield [record.get(name) for name in names]
+                except (ValueError, AttributeError):
+                    yield None
+
+    def _normalize(self, row):
+        if row is None:
+            return None
+        city, timestamp, temperature, min_temperature, max_temperature, condition = row
+        try:
+            temperature = round(float(temperature), 2)
+            return Reading(city, timestamp if isinstance(timestamp, (int, float)) else parse_timestamp(timestamp),
+                           temperature,
+                           round(float(min_temperature), 2) if min_temperature not in (None, '') else temperature,
+                           round(float(max_temperature), 2) if max_temperature not in (None, '') else temperature,
+                           condition or None, self.name) if city else None
+        except (TypeError, ValueError):
+            return None
+
+def fan_out(sources, max_workers=None, chunk_size=1000, max_pending=64):
+    """
+    Runs every source in its own thread and yields their readings in chunks as they
+    arrive. At most `max_pending` chunks are buffered, so a fast source waits for
+    the consumer instead of filling memory. A failing source is logged and the
+    others carry on.
+
+    Sources run in threads, which overlaps network and disk waits; parsing itself
+    is shared out under the GIL.
+
+    Args:
+        sources (list of SourceAdapter): The sources to read.
+        max_workers (int, optional): Sources read at once (all of them if None).
+        chunk_size (int): Readings per chunk.
+        max_pending (int): Chunks buffered between the sources and the consumer.
+
+    Yields:
+        tuple: (source, chunk) with a list of the source's readings, or (source, None)
+               once the source has finished.
+    """
+    chunks = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+    slots = threading.Semaphore(max_workers or len(sources) or 1)
+    def put(item):
+        # Give up if the consumer has stopped, rather than blocking forever on a full queue
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(source):
+        with slots:
+            try:
+                for chunk in source.chunks(chunk_size):
+                    if not put((source, chunk)):
+                        return
+            except Exception as e:
+                print(f"Error reading weather source '{source.name}': {e}")
+            finally:
+                put((source, None))
+
+    threads = [threading.Thread(target=run, args=(source,), name=f"source-{source.name}", daemon=True)
+               for source in sources]
+    for thread in threads:
+        thread.start()
+    try:
+        remaining = len(threads)
+        while remaining:
+            item = chunks.get()
+            if item[1] is None:
+                remaining -= 1
+            yield item
+    finally:
+        stop.set()
+
+class ReadingMerger:
+    """
+    Streaming merge of readings from several sources, deduplicated by city and
+    time slot: of all readings of a city within one `resolution`-second slot, the
+    one from the highest-priority source is kept (the first seen on a tie).
+
+    Each source is assumed to deliver readings roughly in time order. A slot is
+    emitted once every source still running has moved `window` seconds past it,
+    so sources may lag one another and deliver up to `window` seconds out of
+    order; memory is bounded by the cities times the slots between the slowest
+    and fastest source, not by the stream length. Readings arriving after their
+    slot was emitted are dropped and counted as late.
+
+    Args:
+        priorities (dict, optional): Source name to priority; unknown sources get 0.
+        resolution (float): Seconds per time slot; readings in the same slot are duplicates.
+        window (float): Seconds readings are held for later, out-of-order duplicates.
+    """
+
+    def __init__(self, priorities=None, resolution=300, window=3600):
+        self.priorities = dict(priorities or {})
+        self.resolution = resolution
+        self.window_slots = int(window // resolution)
+        self.pending = {}  # Slot to {city: (priority, reading)}
+        self.newest = {}  # Source name to the newest slot it delivered (None before its first reading)
+        self.finished = set()
+        self.emitted_below = None  # Slots below this have been emitted
+        self.counts = {'readings': 0, 'duplicates': 0, 'replaced': 0, 'late': 0, 'emitted': 0}
+
+    def expect(self, sources):
+        """
+        Registers sources before they deliver anything, so nothing is emitted until
+        each of them has either caught up or finished.
+
+        Args:
+            sources (list of SourceAdapter): The sources; their priorities are used
+                                             unless `priorities` already names them.
+        """
+        for source in sources:
+            self.newest.setdefault(source.name, None)
+            self.priorities.setdefault(source.name, source.priority)
+
+    def add(self, readings):
+        """
+        Merges a chunk of readings.
+
+        Args:
+            readings (list of Reading): The readings to merge.
+
+        Returns:
+            list of Reading: Merged readings whose slots are now complete, oldest slot first.
+        """
+        pending = self.pending
+        priorities = self.priorities
+        resolution = self.resolution
+        emitted_below = self.emitted_below
+        newest = self.newest
+        duplicates = replaced = late = 0
+        for reading in readings:
+            slot = int(reading.timestamp // resolution)
+            source = reading.source
+            source_newest = newest.get(source)
+            if source_newest is None or slot > source_newest:
+                newest[source] = slot
+            if emitted_below is not None and slot < emitted_below:
+                late += 1
+                continue
+            bucket = pending.get(slot)
+            if bucket is None:
+                bucket = pending[slot] = {}
+            priority = priorities.get(source, 0)
+            current = bucket.get(reading.city)
+            if current is None:
+                bucket[reading.city] = (priority, reading)
+            else:
+                duplicates += 1
+                if priority > current[0]:
+                    bucket[reading.city] = (priority, reading)
+                    replaced += 1
+
+        counts = self.counts
+        counts['readings'] += len(readings)
+        counts['duplicates'] += duplicates
+        counts['replaced'] += replaced
+        counts['late'] += late
+        return self._emit_complete()
+
+    def finish(self, source_name):
+        """
+        Marks a source as finished, so it no longer holds back the merge.
+
+        Returns:
+            list of Reading: Merged readings whose slots are now complete.
+        """
+        self.newest.setdefault(source_name, None)
+        self.finished.add(source_name)
+        return self._emit_complete()
+
+    def flush(self):
+        """
+        Returns every reading still held back, oldest slot first.
+        """
+        if not self.pending:
+            return []
+        return self._emit(max(self.pending) + 1)
+
+    def stats(self):
+        """
+        Returns the merge statistics.
+
+        Returns:
+            dict: Readings seen, duplicates (and how many replaced an earlier reading),
+                  late readings dropped, readings emitted and readings still pending.
+        """
+        return dict(self.counts, pending=sum(len(bucket) for bucket in self.pending.values()))
+
+    def _emit_complete(self):
+        running = [slot for source, slot in self.newest.items() if source not in self.finished]
+        if any(slot is None for slot in running):
+            return []  # A source has not delivered anything yet
+        if running:
+            return self._emit(min(running) - self.window_slots)
+        return self._emit(max(self.pending) + 1) if self.pending else []
+
+    def _emit(self, below):
+        if self.emitted_below is not None and below <= self.emitted_below:
+            return []
+        merged = []
+        for slot in sorted(slot for slot in self.pending if slot < below):
+            merged.extend(reading for _, reading in self.pending.pop(slot).values())
+        self.emitted_below = below
+        self.counts['emitted'] += len(merged)
+        return merged
+
+def merge_sources(sources, resolution=300, window=3600, max_workers=None, chunk_size=1000, merger=None):
+    """
+    Reads all sources in parallel and yields their readings merged and deduplicated
+    (see `ReadingMerger`), using each source's priority.
+
+    Args:
+        sources (list of SourceAdapter): The sources to read.
+        resolution (float): Seconds per deduplication time slot.
+        window (float): Seconds readings are held for later duplicates.
+        max_workers (int, optional): Sources read at once (all of them if None).
+        chunk_size (int): Readings per chunk.
+        merger (ReadingMerger, optional): The merger to use, e.g. with configured priorities
+                                          or to read its stats afterwards.
+
+    Yields:
+        list of Reading: Chunks of merged readings.
+    """
+    if merger is None:
+        merger = ReadingMerger(resolution=resolution, window=window)
+    merger.expect(sources)
+    for source, chunk in fan_out(sources, max_workers, chunk_size):
+        merged = merger.add(chunk) if chunk is not None else merger.finish(source.name)
+        if merged:
+            yield merged
+    merged = merger.flush()
+    if merged:
+        yield merged
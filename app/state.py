@@ -0,0 +1,379 @@
+import glob
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from datetime import date
+import numpy as np
+from app import data_processing
+from app.data_processing import DailyAggregate
+
+# Snapshot file layout: header, then named arrays, then a CRC32 of everything before it
+SNAPSHOT_MAGIC = b'WXSN'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<4sHdQI')  # magic, version, created, WAL sequence, array count
+ARRAY_HEADER = struct.Struct('<H8sBQ')  # name length, dtype, dimensions, byte length
+SNAPSHOT_FILE = 'state.snapshot'
+
+# WAL record layout: header (payload length, payload CRC32, sequence), then a JSON payload
+WAL_HEADER = struct.Struct('<IIQ')
+WAL_PATTERN = 'state.wal.*'
+
+def _encode_strings(strings):
+    # Strings are stored as one UTF-8 blob plus offsets, which is far smaller than fixed-width arrays
+    encoded = [string.encode() for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+def _decode_strings(blob, offsets):
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[start:end].decode() for start, end in zip(bounds, bounds[1:])]
+
+def capture_state(engine=None):
+    """
+    Captures the daily aggregates and (optionally) an AlertEngine's state as a
+    flat dict of NumPy arrays.
+
+    Args:
+        engine (AlertEngine, optional): The alert engine whose state is included.
+
+    Returns:
+        dict: Array name to NumPy array.
+    """
+    cities = list(data_processing.daily_weather_data)
+    aggregates = [data_processing.daily_weather_data[city] for city in cities]
+
+    # Condition counts per city as a CSR structure over one table of condition names
+    condition_index = {}
+    condition_ids = []
+    condition_counts = []
+    offsets = [0]
+    dominant = []
+    for aggregate in aggregates:
+        for condition, count in aggregate.condition_counts.items():
+            condition_ids.append(condition_index.setdefault(condition, len(condition_index)))
+            condition_counts.append(count)
+        offsets.append(len(condition_ids))
+        dominant.append(condition_index.get(aggregate.dominant_condition, -1))
+
+    arrays = {}
+    arrays['agg_city'], arrays['agg_city_offsets'] = _encode_strings(cities)
+    arrays['agg_day'] = np.array([date.fromisoformat(aggregate.day).toordinal() for aggregate in aggregates],
+                                 dtype=np.int32)
+    arrays['agg_count'] = np.array([aggregate.count for aggregate in aggregates], dtype=np.int64)
+    for name in ('total', 'min_temp', 'max_temp', 'mean', 'm2'):
+        arrays[f'agg_{name}'] = np.array([getattr(aggregate, name) for aggregate in aggregates], dtype=np.float64)
+    arrays['agg_track_variance'] = np.array([aggregate.track_variance for aggregate in aggregates], dtype=np.bool_)
+    arrays['agg_dominant'] = np.array(dominant, dtype=np.int32)
+    arrays['cond_name'], arrays['cond_name_offsets'] = _encode_strings(list(condition_index))
+    arrays['cond_offsets'] = np.array(offsets, dtype=np.int64)
+    arrays['cond_id'] = np.array(condition_ids, dtype=np.int32)
+    arrays['cond_count'] = np.array(condition_counts, dtype=np.int64)
+
+    if engine is not None:
+        state = engine.export_state()
+        arrays['engine_city'], arrays['engine_city_offsets'] = _encode_strings(state.pop('cities'))
+        for name, values in state.items():
+            arrays[f'engine_{name}'] = values
+    return arrays
+
+def restore_state(arrays, engine=None):
+    """
+    Replaces the daily aggregates with captured state,
+    and restores the AlertEngine state if both it and an engine are given.
+
+    Args:
+        arrays (dict): Arrays returned by `capture_state` or `read_snapshot`.
+        engine (AlertEngine, optional): The alert engine to restore.
+    """
+    cities = _decode_strings(arrays['agg_city'], arrays['agg_city_offsets'])
+    conditions = _decode_strings(arrays['cond_name'], arrays['cond_name_offsets'])
+    offsets = arrays['cond_offsets'].tolist()
+    condition_ids = arrays['cond_id'].tolist()
+    condition_counts = arrays['cond_count'].tolist()
+    columns = [arrays[f'agg_{name}'].tolist() for name in
+               ('day', 'count', 'total', 'min_temp', 'max_temp', 'mean', 'm2', 'track_variance', 'dominant')]
+
+    daily_weather_data = {}
+    for i, (city, day, count, total, min_temp, max_temp, mean, m2, track_variance, dominant) in enumerate(
+            zip(cities, *columns)):
+        aggregate = DailyAggregate(date.fromordinal(day).isoformat(), track_variance)
+        aggregate.count = count
+        aggregate.total = total
+        aggregate.min_temp = min_temp
+        aggregate.max_temp = max_temp
+        aggregate.mean = mean
+        aggregate.m2 = m2
+        aggregate.condition_counts = {conditions[condition_ids[j]]: condition_counts[j]
+                                      for j in range(offsets[i], offsets[i + 1])}
+        aggregate.dominant_condition = conditions[dominant] if dominant >= 0 else None
+        daily_weather_data[city] = aggregate
+    data_processing.daily_weather_data.clear()
+    data_processing.daily_weather_data.update(daily_weather_data)
+
+    if engine is not None and 'engine_city' in arrays:
+        state = {name[len('engine_'):]: values for name, values in arrays.items()
+                 if name.startswith('engine_') and not name.startswith('engine_city')}
+        state['cities'] = _decode_strings(arrays['engine_city'], arrays['engine_city_offsets'])
+        engine.import_state(state)
+
+def write_snapshot(path, arrays, sequence):
+    """
+    Atomically writes captured state to a versioned binary snapshot file.
+
+    Args:
+        path (str): The snapshot file.
+        arrays (dict): Arrays returned by `capture_state`.
+        sequence (int): The last WAL sequence number the state includes.
+
+    Returns:
+        int: The size of the snapshot in bytes.
+    """
+    parts = [SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, time.time(), sequence, len(arrays))]
+    for name, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        encoded_name = name.encode()
+        parts.append(ARRAY_HEADER.pack(len(encoded_name), values.dtype.str.encode(), values.ndim, values.nbytes))
+        parts.append(encoded_name)
+        parts.append(struct.pack(f'<{values.ndim}Q', *values.shape))
+        parts.append(values.tobytes())
+    body = b''.join(parts)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(body)
+        f.write(struct.pack('<I', zlib.crc32(body)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)  # Readers see the old snapshot or the new one, never a partial file
+    return len(body) + 4
+
+def read_snapshot(path):
+    """
+    Reads a snapshot written by `write_snapshot`.
+
+    Args:
+        path (str): The snapshot file.
+
+    Returns:
+        tuple: (arrays, sequence), or None if the file is missing, corrupt or of an unknown version.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if len(data) < SNAPSHOT_HEADER.size + 4 or struct.unpack('<I', data[-4:])[0] != zlib.crc32(data[:-4]):
+        print(f"Ignoring corrupt state snapshot '{path}'")
+        return None
+    magic, version, _, sequence, count = SNAPSHOT_HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        print(f"Ignoring state snapshot '{path}' of unknown format (version {version})")
+        return None
+
+    arrays = {}
+    position = SNAPSHOT_HEADER.size
+    for _ in range(count):
+        name_length, dtype, ndim, nbytes = ARRAY_HEADER.unpack_from(data, position)
+        position += ARRAY_HEADER.size
+        name = data[position:position + name_length].decode()
+        position += name_length
+        shape = struct.unpack_from(f'<{ndim}Q', data, position)
+        position += 8 * ndim
+        dtype = np.dtype(dtype.rstrip(b'\0').decode())
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=nbytes // dtype.itemsize,
+                                     offset=position).reshape(shape)
+        position += nbytes
+    return arrays, sequence
+
+class StateSnapshots:
+    """
+    Keeps the in-memory pipeline state (daily aggregates and the AlertEngine) recoverable across restarts.
+
+    Every cycle's readings are appended to a write-ahead log (`log_cycle`).
+    Periodically the state is captured in the calling thread, so the snapshot is a
+    consistent cut between cycles, and written atomically by a background thread as
+    a compact binary file. Each snapshot starts a new WAL file; older WAL files are
+    deleted once the snapshot covering them is on disk. `recover` loads the latest
+    snapshot and replays the WAL written after it, restoring the state exactly.
+
+    Args:
+        directory (str): The directory holding the snapshot and WAL files.
+        interval (float): Minimum seconds between snapshots taken by `maybe_snapshot`.
+        fsync (bool): Sync every WAL append to disk (survives power loss, not just crashes).
+    """
+
+    def __init__(self, directory, interval=300, fsync=True):
+        self.directory = directory
+        self.interval = interval
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.sequence = 0
+        self.wal = None
+        self.wal_generation = 0
+        self.last_snapshot = time.monotonic()
+        self.snapshot_bytes = 0
+        self.last_snapshot_seconds = 0.0
+
+        self._queue = queue.Queue(maxsize=1)
+        self._writer = threading.Thread(target=self._write_snapshots, daemon=True)
+        self._writer.start()
+
+    def recover(self, engine=None):
+        """
+        Restores state from the latest snapshot and replays the readings logged after it.
+
+        Args:
+            engine (AlertEngine, optional): The alert engine to restore.
+
+        Returns:
+            dict: The snapshot sequence, readings replayed and seconds taken, or
+                  None if there was nothing to recover.
+        """
+        start = time.perf_counter()
+        snapshot = read_snapshot(self.snapshot_path)
+        snapshot_sequence = 0
+        if snapshot is not None:
+            arrays, snapshot_sequence = snapshot
+            restore_state(arrays, engine)
+
+        replayed = 0
+        self.sequence = snapshot_sequence
+        wal_paths = self._wal_paths()
+        for path in wal_paths:
+            for sequence, record in self._read_wal(path):
+                if sequence <= snapshot_sequence:
+                    continue
+                replayed += self._replay(record, engine)
+                self.sequence = sequence
+        if wal_paths:
+            self.wal_generation = int(wal_paths[-1].rsplit('.', 1)[1])
+
+        if snapshot is None and not replayed:
+            return None
+        return {'snapshot_sequence': snapshot_sequence, 'replayed_readings': replayed,
+                'seconds': round(time.perf_counter() - start, 4)}
+
+    def log_cycle(self, readings, now=None):
+        """
+        Appends one cycle's readings to the write-ahead log.
+
+        Args:
+            readings (list of tuple): (city, date, temperature, condition) per reading.
+            now (float, optional): The time the cycle's alerts were evaluated at, as passed to
+                                   `AlertEngine.evaluate`; None if alerts were evaluated elsewhere.
+        """
+        if not readings:
+            return
+        if self.wal is None:
+            self._open_wal()
+        self.sequence += 1
+        payload = json.dumps({'now': now, 'readings': readings}, separators=(',', ':')).encode()
+        self.wal.write(WAL_HEADER.pack(len(payload), zlib.crc32(payload), self.sequence) + payload)
+        self.wal.flush()
+        if self.fsync:
+            os.fsync(self.wal.fileno())
+
+    def maybe_snapshot(self, engine=None):
+        """
+        Takes a snapshot if `interval` seconds have passed since the last one.
+        """
+        if time.monotonic() - self.last_snapshot >= self.interval:
+            self.snapshot(engine)
+
+    def snapshot(self, engine=None, wait=False):
+        """
+        Captures the current state and hands it to the background writer. Readings
+        logged from now on go to a new WAL file. Never waits for a slow write unless
+        `wait` is set: a snapshot still queued behind it is replaced by this one.
+
+        Args:
+            engine (AlertEngine, optional): The alert engine whose state is included.
+            wait (bool): Block until the snapshot is on disk.
+        """
+        arrays = capture_state(engine)
+        sequence = self.sequence
+        self._open_wal()  # Later readings must survive the deletion of the WAL files this snapshot covers
+        self.last_snapshot = time.monotonic()
+        done = threading.Event()
+        item = (arrays, sequence, self.wal_generation, done)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # The writer is still busy; this snapshot supersedes the one waiting behind it
+            try:
+                self._queue.get_nowait()[3].set()
+            except queue.Empty:
+                pass  # The writer just took it
+            self._queue.put_nowait(item)
+        if wait:
+            done.wait()
+
+    def close(self, engine=None):
+        """
+        Takes a final snapshot, waits for it to be written and closes the WAL.
+        """
+        self.snapshot(engine, wait=True)
+        self._queue.put(None)
+        self._writer.join()
+        if self.wal is not None:
+            self.wal.close()
+            self.wal = None
+
+    def _open_wal(self):
+        if self.wal is not None:
+            self.wal.close()
+        self.wal_generation += 1
+        self.wal = open(os.path.join(self.directory, f"state.wal.{self.wal_generation:08d}"), 'ab')
+
+    def _wal_paths(self):
+        return sorted(glob.glob(os.path.join(self.directory, WAL_PATTERN)))
+
+    def _write_snapshots(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            arrays, sequence, generation, done = item
+            try:
+                start = time.perf_counter()
+                self.snapshot_bytes = write_snapshot(self.snapshot_path, arrays, sequence)
+                self.last_snapshot_seconds = time.perf_counter() - start
+                # WAL files older than the one opened with this snapshot are now covered by it
+                for path in self._wal_paths():
+                    if int(path.rsplit('.', 1)[1]) < generation:
+                        os.remove(path)
+            except OSError as e:
+                print(f"Error writing state snapshot '{self.snapshot_path}': {e}")
+            finally:
+                done.set()
+
+    @staticmethod
+    def _read_wal(path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        position = 0
+        while position + WAL_HEADER.size <= len(data):
+            length, crc, sequence = WAL_HEADER.unpack_from(data, position)
+            payload = data[position + WAL_HEADER.size:position + WAL_HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break  # A record torn by a crash; everything before it is intact
+            yield sequence, json.loads(payload)
+            position += WAL_HEADER.size + length
+
+    @staticmethod
+    def _replay(record, engine):
+        readings = record['readings']
+        for city, reading_date, temperature, condition in readings:
+            data_processing.add_to_daily_summary(city, {'temperature': temperature, 'weather_condition': condition,
+                                                        'date': reading_date})
+        if engine is not None and record['now'] is not None:
+            engine.evaluate([reading[0] for reading in readings], [reading[2] for reading in readings],
+                            now=record['now'])  # Alerts were already raised before the restart
+        return len(readings)
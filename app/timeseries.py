@@ -0,0 +1,298 @@
+from datetime import datetime, timedelta
+
+# Resolutions available for range queries: (name, seconds per point, table, time column)
+RESOLUTIONS = [
+    ('raw', 300, 'weather_readings', 'recorded_at'),
+    ('hourly', 3600, 'weather_hourly', 'hour'),
+    ('daily', 86400, 'weather_daily', 'day'),
+]
+
+# Readings are keyed by (city, recorded_at); a reading that is already stored is left as it is
+INSERT_READING_QUERIES = {
+    'mysql': """
+INSERT INTO weather_readings (city, recorded_at, temperature, max_temperature, min_temperature, weather_condition)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE recorded_at = recorded_at
+""",
+    'sqlite': """
+INSERT INTO weather_readings (city, recorded_at, temperature, max_temperature, min_temperature, weather_condition)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON CONFLICT (city, recorded_at) DO NOTHING
+""",
+}
+
+# Keys of the readings already stored in a time range
+SELECT_READING_KEYS_QUERY = """
+SELECT city, recorded_at FROM weather_readings
+WHERE recorded_at >= %s AND recorded_at <= %s AND city IN ({cities})
+"""
+
+# Cities per key lookup, keeping the IN list under SQLite's bound-parameter limit
+KEY_QUERY_CHUNK = 500
+
+# Rollup upserts: counts and sums add up, minimums and maximums widen
+UPSERT_ROLLUP_QUERIES = {
+    'mysql': """
+INSERT INTO {table} (city, {column}, readings, temperature_sum, min_temperature, max_temperature)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    readings = readings + VALUES(readings),
+    temperature_sum = temperature_sum + VALUES(temperature_sum),
+    min_temperature = LEAST(min_temperature, VALUES(min_temperature)),
+    max_temperature = GREATEST(max_temperature, VALUES(max_temperature))
+""",
+    'sqlite': """
+INSERT INTO {table} (city, {column}, readings, temperature_sum, min_temperature, max_temperature)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON CONFLICT (city, {column}) DO UPDATE SET
+    readings = readings + excluded.readings,
+    temperature_sum = temperature_sum + excluded.temperature_sum,
+    min_temperature = MIN(min_temperature, excluded.min_temperature),
+    max_temperature = MAX(max_temperature, excluded.max_temperature)
+""",
+}
+
+# Tables for SQLite, which has no setup script (MySQL uses scripts/setup.sql)
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS weather_readings (
+    city TEXT NOT NULL, recorded_at TEXT NOT NULL, temperature REAL, max_temperature REAL,
+    min_temperature REAL, weather_condition TEXT, PRIMARY KEY (city, recorded_at)
+);
+CREATE INDEX IF NOT EXISTS idx_readings_recorded_at ON weather_readings (recorded_at);
+CREATE TABLE IF NOT EXISTS weather_hourly (
+    city TEXT NOT NULL, hour TEXT NOT NULL, readings INTEGER, temperature_sum REAL,
+    min_temperature REAL, max_temperature REAL, PRIMARY KEY (city, hour)
+);
+CREATE TABLE IF NOT EXISTS weather_daily (
+    city TEXT NOT NULL, day TEXT NOT NULL, readings INTEGER, temperature_sum REAL,
+    min_temperature REAL, max_temperature REAL, PRIMARY KEY (city, day)
+);
+"""
+
+def _sql(query, dialect):
+    # Queries are written with MySQL placeholders; SQLite uses '?'
+    return query.replace('%s', '?') if dialect == 'sqlite' else query
+
+def rollup(readings):
+    """
+    Pre-aggregates readings into hourly and daily buckets per city, so each flush
+    upserts one row per bucket instead of one per reading.
+
+    Args:
+        readings (list of tuple): (city, date, temperature, max_temp, min_temp, condition)
+                                  rows, with dates formatted as 'YYYY-MM-DD HH:MM:SS'.
+
+    Returns:
+        tuple: (hourly, daily) lists of (city, bucket, readings, temperature_sum,
+               min_temperature, max_temperature) rows.
+    """
+    hourly = {}
+    daily = {}
+    for city, date, temperature, _, _, _ in readings:
+        for buckets, bucket in ((hourly, date[:13] + ':00:00'), (daily, date[:10])):
+            key = (city, bucket)
+            aggregate = buckets.get(key)
+            if aggregate is None:
+                buckets[key] = [1, temperature, temperature, temperature]
+            else:
+                aggregate[0] += 1
+                aggregate[1] += temperature
+                aggregate[2] = min(aggregate[2], temperature)
+                aggregate[3] = max(aggregate[3], temperature)
+    return ([key + tuple(value) for key, value in hourly.items()],
+            [key + tuple(value) for key, value in daily.items()])
+
+def new_readings(cursor, readings, dialect='mysql'):
+    """
+    Drops readings whose (city, time) key is already stored or appears earlier in
+    the batch, so each reading is written and counted in the rollups once.
+
+    Args:
+        cursor (object): A DB-API cursor.
+        readings (list of tuple): (city, date, temperature, max_temp, min_temp, condition) rows.
+        dialect (str): 'mysql' or 'sqlite'.
+
+    Returns:
+        list of tuple: The readings not stored yet, in their original order.
+    """
+    if not readings:
+        return []
+    dates = [str(reading[1]) for reading in readings]
+    cities = sorted({reading[0] for reading in readings})
+    seen = set()
+    for i in range(0, len(cities), KEY_QUERY_CHUNK):
+        chunk = cities[i:i + KEY_QUERY_CHUNK]
+        query = SELECT_READING_KEYS_QUERY.format(cities=', '.join(['%s'] * len(chunk)))
+        cursor.execute(_sql(query, dialect), [min(dates), max(dates)] + chunk)
+        seen.update((city, str(recorded_at)) for city, recorded_at in cursor.fetchall())
+    fresh = []
+    for reading, date in zip(readings, dates):
+        key = (reading[0], date)
+        if key not in seen:
+            seen.add(key)
+            fresh.append(reading)
+    return fresh
+
+def write_readings(cursor, readings, dialect='mysql'):
+    """
+    Inserts raw readings and incrementally updates the hourly and daily rollups.
+    Runs on the caller's cursor so it joins the caller's transaction.
+
+    Writing is idempotent: readings already stored (or repeated within the batch)
+    are skipped and left out of the rollups, so re-ingested or replayed readings
+    are never counted twice.
+
+    Args:
+        cursor (object): A DB-API cursor.
+        readings (list of tuple): (city, date, temperature, max_temp, min_temp, condition) rows.
+        dialect (str): 'mysql' or 'sqlite'.
+
+    Returns:
+        list of tuple: The readings that were inserted.
+    """
+    readings = new_readings(cursor, readings, dialect)
+    if not readings:
+        return readings
+    cursor.executemany(_sql(INSERT_READING_QUERIES[dialect], dialect), readings)
+
+    hourly, daily = rollup(readings)
+    upsert = UPSERT_ROLLUP_QUERIES[dialect]
+    cursor.executemany(_sql(upsert.format(table='weather_hourly', column='hour'), dialect), hourly)
+    cursor.executemany(_sql(upsert.format(table='weather_daily', column='day'), dialect), daily)
+    return readings
+
+def choose_resolution(start, end, max_points=500, retention=None, now=None):
+    """
+    Picks the finest resolution that returns at most `max_points` points for a window,
+    i.e. only as coarse as the window requires. Resolutions whose retention no longer
+    covers the start of the window are skipped.
+
+    Args:
+        start (datetime): The start of the window.
+        end (datetime): The end of the window.
+        max_points (int): The maximum number of points wanted per city.
+        retention (dict, optional): Days of data kept per resolution name, e.g. {'raw': 30}.
+        now (datetime, optional): The reference time for retention; defaults to the current time.
+
+    Returns:
+        tuple: The (name, seconds per point, table, time column) resolution.
+    """
+    retention = retention or {}
+    now = now or datetime.now()
+    window = (end - start).total_seconds()
+    for resolution in RESOLUTIONS:
+        days = retention.get(resolution[0])
+        if days is not None and start < now - timedelta(days=days):
+            continue  # Already pruned at this resolution
+        if window / resolution[1] <= max_points:
+            return resolution
+    return RESOLUTIONS[-1]
+
+def query_range(connection, city, start, end, max_points=500, retention=None, dialect='mysql'):
+    """
+    Fetches a city's temperature history for a time window from the raw, hourly or
+    daily table, whichever is the finest that fits in `max_points`. Every table is
+    keyed on (city, time), so the query is a single index range scan.
+
+    Args:
+        connection (object): A DB-API connection.
+        city (str): The name of the city.
+        start (datetime): The start of the window (inclusive).
+        end (datetime): The end of the window (exclusive).
+        max_points (int): The maximum number of points wanted.
+        retention (dict, optional): Days of data kept per resolution name, e.g. {'raw': 30}.
+        dialect (str): 'mysql' or 'sqlite'.
+
+    Returns:
+        list of dict: Rows with 'time', 'avg_temperature', 'min_temperature',
+                      'max_temperature' and 'readings', oldest first.
+    """
+    name, _, table, column = choose_resolution(start, end, max_points, retention)
+    if name == 'raw':
+        select = f"SELECT {column}, temperature, min_temperature, max_temperature, 1 FROM {table}"
+    else:
+        select = (f"SELECT {column}, temperature_sum / readings, min_temperature, max_temperature, readings "
+                  f"FROM {table}")
+    query = f"{select} WHERE city = %s AND {column} >= %s AND {column} < %s ORDER BY {column}"
+
+    time_format = '%Y-%m-%d' if name == 'daily' else '%Y-%m-%d %H:%M:%S'
+    cursor = connection.cursor()
+    try:
+        cursor.execute(_sql(query, dialect), (city, start.strftime(time_format), end.strftime(time_format)))
+        return [{'time': row[0], 'avg_temperature': row[1], 'min_temperature': row[2],
+                 'max_temperature': row[3], 'readings': row[4]} for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+def prune_retention(connection, raw_days=30, hourly_days=365, now=None, dialect='mysql'):
+    """
+    Removes raw readings and hourly rollups older than their retention windows.
+    Daily rollups are kept forever. On MySQL, whole expired monthly partitions of
+    weather_readings are dropped first, which is instant; remaining rows are deleted.
+
+    Args:
+        connection (object): A DB-API connection.
+        raw_days (int): Days of raw readings to keep.
+        hourly_days (int): Days of hourly rollups to keep.
+        now (datetime, optional): The reference time; defaults to the current time.
+        dialect (str): 'mysql' or 'sqlite'.
+
+    Returns:
+        dict: The number of partitions dropped and rows deleted per table.
+    """
+    now = now or datetime.now()
+    raw_cutoff = now - timedelta(days=raw_days)
+    hourly_cutoff = now - timedelta(days=hourly_days)
+
+    result = {'partitions_dropped': 0}
+    cursor = connection.cursor()
+    try:
+        if dialect == 'mysql':
+            _add_month_partitions(cursor, now)
+            result['partitions_dropped'] = _drop_expired_partitions(cursor, raw_cutoff)
+        for table, column, cutoff in (('weather_readings', 'recorded_at', raw_cutoff),
+                                      ('weather_hourly', 'hour', hourly_cutoff)):
+            cursor.execute(_sql(f"DELETE FROM {table} WHERE {column} < %s", dialect),
+                           (cutoff.strftime('%Y-%m-%d %H:%M:%S'),))
+            result[table] = cursor.rowcount
+        connection.commit()
+    finally:
+        cursor.close()
+    return result
+
+def _month_partitions(cursor):
+    # Partitions are named pYYYYMM and hold that month's readings (see scripts/setup.sql)
+    cursor.execute("""
+        SELECT partition_name FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = 'weather_readings' AND partition_name LIKE 'p______'
+    """)
+    return [name for (name,) in cursor.fetchall()]
+
+def _add_month_partitions(cursor, now):
+    # Split this month and next month out of the catch-all pmax partition ahead of time
+    existing = set(_month_partitions(cursor))
+    month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(2):
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        name = month.strftime('p%Y%m')
+        if name not in existing:
+            cursor.execute(f"""
+                ALTER TABLE weather_readings REORGANIZE PARTITION pmax INTO (
+                    PARTITION {name} VALUES LESS THAN (TO_DAYS('{next_month:%Y-%m-%d}')),
+                    PARTITION pmax VALUES LESS THAN MAXVALUE)
+            """)
+        month = next_month
+
+def _drop_expired_partitions(cursor, cutoff):
+    expired = []
+    for name in _month_partitions(cursor):
+        try:
+            month = datetime.strptime(name[1:], '%Y%m')
+        except ValueError:
+            continue
+        month_end = (month + timedelta(days=32)).replace(day=1)
+        if month_end <= cutoff:
+            expired.append(name)
+    if expired:
+        cursor.execute(f"ALTER TABLE weather_readings DROP PARTITION {', '.join(expired)}")
+    return len(expired)
@@ -1,65 +1,327 @@
-import matplotlib
-matplotlib.use('Agg')  # Use Agg backend for rendering plots
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+import html
+import io
+import os
 from datetime import datetime
+import numpy as np
+from app.metrics import timed
 
-def plot_temperature_trends(weather_summaries):
+# Function to import pyplot on first use, so importing this module does not load matplotlib
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')  # Use Agg backend for rendering plots
+    import matplotlib.pyplot as plt
+    return plt
+
+# Function to save a figure without readers ever seeing a half-written file
+def _save_atomic(figure, filename):
+    root, ext = os.path.splitext(filename)
+    tmp_filename = f"{root}.tmp{ext}"
+    figure.savefig(tmp_filename)
+    os.replace(tmp_filename, filename)
+
+# Function to render a figure as SVG markup
+def figure_svg(figure):
+    buffer = io.StringIO()
+    figure.savefig(buffer, format='svg')
+    svg = buffer.getvalue()
+    return svg[svg.index('<svg'):]  # Drop the XML prolog so the markup can be inlined in HTML
+
+def write_html_report(filename, daily_summaries, figures=()):
     """
-    Plots the temperature trends including average, minimum, and maximum temperatures,
-    along with dominant weather conditions for each date.
+    Writes a self-contained HTML report: the given charts as inline SVG, followed
+    by a table of the daily summaries.
 
     Args:
-        weather_summaries (list of dict): A list of weather summary records, 
-                                           each containing date, avg_temperature, 
-                                           min_temperature, max_temperature, 
-                                           and dominant_condition.
+        filename (str): The HTML file to write.
+        daily_summaries (list of dict): Summaries as returned by `get_daily_summaries`.
+        figures (list of tuple): (title, SVG markup) per chart.
+
+    Returns:
+        str: The file written.
     """
-    # Check if any weather summaries are provided for plotting
-    if not weather_summaries:
-        print("No weather summaries provided for plotting.")
-        return
-
-    try:
-        # Extract and convert date strings to datetime objects
-        dates = [datetime.strptime(entry['date'], '%Y-%m-%d %H:%M:%S') for entry in weather_summaries]
-        avg_temperatures = [entry.get('avg_temperature') for entry in weather_summaries]
-        min_temperatures = [entry.get('min_temperature') for entry in weather_summaries]
-        max_temperatures = [entry.get('max_temperature') for entry in weather_summaries]
-        conditions = [entry.get('dominant_condition') for entry in weather_summaries]
-
-        # Create a new figure for plotting
-        plt.figure(figsize=(10, 6))
-
-        # Plot average, minimum, and maximum temperatures
-        plt.plot(dates, avg_temperatures, marker='o', color='b', label='Avg Temperature')
-        plt.plot(dates, min_temperatures, marker='x', linestyle='--', color='g', label='Min Temperature')
-        plt.plot(dates, max_temperatures, marker='x', linestyle='--', color='r', label='Max Temperature')
-
-        # Annotate the plot with dominant weather conditions
-        for i, condition in enumerate(conditions):
-            plt.annotate(condition, (dates[i], avg_temperatures[i]), 
-                         textcoords="offset points", xytext=(0, 10), ha='center')
-
-        # Formatting the x-axis to display dates properly
-        plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
-        plt.gca().xaxis.set_major_locator(mdates.AutoDateLocator())
-
-        # Set plot titles and labels
-        plt.title("Temperature Trends with Weather Conditions")
-        plt.xlabel("Date")
-        plt.ylabel("Temperature (°C)")
-        plt.xticks(rotation=45)  # Rotate x-axis labels for better visibility
-        plt.legend()
-
-        # Adjust layout to prevent clipping of tick-labels
-        plt.tight_layout()
-
-        # Save the figure to a PNG file
-        filename = f'temperature_trends_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
-        plt.savefig(filename)
-        plt.close()  # Close the plot to free memory
-        print(f"Temperature trends plot saved as '{filename}'.")
-
-    except Exception as e:
-        print(f"Error while plotting temperature trends: {e}")
+    rows = ''.join(
+        f"<tr><td>{html.escape(str(summary['city']))}</td><td>{html.escape(str(summary['date']))}</td>"
+        f"<td>{summary['avg_temperature']:.2f}</td><td>{summary['min_temperature']:.2f}</td>"
+        f"<td>{summary['max_temperature']:.2f}</td>"
+        f"<td>{html.escape(str(summary['dominant_condition']))}</td></tr>\n"
+        for summary in sorted(daily_summaries, key=lambda summary: summary['city'])
+    )
+    charts = ''.join(f"<h2>{html.escape(title)}</h2>\n{svg}\n" for title, svg in figures)
+    document = (
+        "<!DOCTYPE html>\n<html>\n<head><meta charset=\"utf-8\"><title>Weather Report</title>\n"
+        "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+        "td,th{border:1px solid #ccc;padding:2px 8px;text-align:right}</style></head>\n<body>\n"
+        f"<h1>Weather Report</h1>\n<p>Generated {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>\n{charts}"
+        "<h2>Daily Summaries</h2>\n<table>\n<tr><th>City</th><th>Date</th><th>Avg (°C)</th><th>Min (°C)</th>"
+        f"<th>Max (°C)</th><th>Dominant Condition</th></tr>\n{rows}</table>\n</body>\n</html>\n"
+    )
+    root, ext = os.path.splitext(filename)
+    tmp_filename = f"{root}.tmp{ext}"
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        f.write(document)
+    os.replace(tmp_filename, filename)
+    return filename
+
+def decimate_min_max(x, y, buckets):
+    """
+    Reduces a series to at most two points per bucket (its minimum and maximum),
+    which preserves the visible envelope of the line at a fixed pixel width.
+
+    Args:
+        x (numpy.ndarray): The x values, sorted ascending.
+        y (numpy.ndarray): The y values.
+        buckets (int): The number of buckets, typically the plot width in pixels.
+
+    Returns:
+        tuple: (x, y) arrays with at most 2 * buckets points.
+    """
+    count = len(x)
+    if count <= 2 * buckets:
+        return x, y
+
+    starts = np.linspace(0, count, buckets, endpoint=False).astype(np.intp)
+    bucket_ids = np.repeat(np.arange(buckets), np.diff(np.append(starts, count)))
+    min_idx = starts + _argreduce(y, starts, bucket_ids, np.minimum)
+    max_idx = starts + _argreduce(y, starts, bucket_ids, np.maximum)
+
+    # Keep the min and max of each bucket in their original order
+    idx = np.sort(np.concatenate((min_idx, max_idx)))
+    return x[idx], y[idx]
+
+def _argreduce(values, starts, bucket_ids, ufunc):
+    # Offset within each bucket of the first element equal to the bucket's min/max
+    extremes = ufunc.reduceat(values, starts)
+    positions = np.arange(len(values)) - starts[bucket_ids]
+    matches = np.where(values == extremes[bucket_ids], positions, len(values))
+    return np.minimum.reduceat(matches, starts)
+
+class _CitySeries:
+    """
+    Growable history of one city's readings and the line artist that draws it.
+    Readings before `start` have been trimmed; their space is reclaimed lazily.
+    """
+    __slots__ = ('times', 'temps', 'start', 'size', 'line', 'condition')
+
+    def __init__(self, line):
+        self.times = np.empty(256)
+        self.temps = np.empty(256)
+        self.start = 0
+        self.size = 0
+        self.line = line
+        self.condition = None
+
+    def data(self):
+        return self.times[self.start:self.size], self.temps[self.start:self.size]
+
+    def trim(self, cutoff):
+        # Skip readings older than `cutoff` (times are ascending)
+        self.start += int(np.searchsorted(self.times[self.start:self.size], cutoff))
+
+    def extend(self, times, temps):
+        if self.size + len(times) > len(self.times) and self.start * 2 >= len(self.times):
+            # Move the kept readings to the front instead of growing; at most every other fill, so amortized O(1)
+            kept = self.size - self.start
+            self.times[:kept] = self.times[self.start:self.size]
+            self.temps[:kept] = self.temps[self.start:self.size]
+            self.start = 0
+            self.size = kept
+        needed = self.size + len(times)
+        if needed > len(self.times):
+            # Grow geometrically so appends stay amortized O(1)
+            capacity = max(needed, 2 * len(self.times))
+            self.times = np.resize(self.times, capacity)
+            self.temps = np.resize(self.temps, capacity)
+        self.times[self.size:needed] = times
+        self.temps[self.size:needed] = temps
+        self.size = needed
+
+class TrendRenderer:
+    """
+    Renders temperature trends incrementally across cycles.
+
+    One figure with one line per city is kept for the lifetime of the renderer;
+    each cycle only the new points are parsed and appended. Each city keeps the
+    last `history_days` days of readings, so memory and the per-render min/max
+    decimation to the plot's pixel width stay bounded however long it runs. Cycles without new data skip rendering entirely,
+    and the output file is overwritten in place (optionally keeping `keep`
+    rotated copies) instead of creating a new file every cycle.
+
+    Args:
+        filename (str): The PNG file the plot is written to.
+        keep (int): The number of previous renders to keep as `<name>.1.png`, `<name>.2.png`, ...
+        size (tuple): The figure size in inches.
+        dpi (int): The figure resolution.
+        max_legend (int): Only show a legend when at most this many cities are plotted.
+        formats (tuple of str): Extra formats written next to `filename`, e.g. ('svg',) for `<name>.svg`.
+        history_days (float, optional): Days of readings plotted per city, counted back from
+                                        its latest reading; None keeps every reading.
+    """
+
+    def __init__(self, filename='temperature_trends.png', keep=0, size=(10, 6), dpi=100, max_legend=10, formats=(),
+                 history_days=7):
+        # Figure and FigureCanvasAgg draw without pyplot or a GUI backend
+        import matplotlib.dates as mdates
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.filename = filename
+        self.keep = keep
+        self.formats = formats
+        self.max_legend = max_legend
+        self.history_days = history_days
+        self.buckets = int(size[0] * dpi)  # One bucket per horizontal pixel
+        self.series = {}
+        self.dirty = False
+        self.legend_cities = None
+
+        self.figure = Figure(figsize=size, dpi=dpi)
+        FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_subplot()
+        self.axes.set_title("Temperature Trends")
+        self.axes.set_xlabel("Date")
+        self.axes.set_ylabel("Temperature (°C)")
+        self.axes.xaxis_date()
+        self.axes.xaxis.set_major_locator(mdates.AutoDateLocator())
+        self.axes.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
+        self.axes.tick_params(axis='x', labelrotation=45)
+        self.figure.subplots_adjust(left=0.08, right=0.97, top=0.93, bottom=0.22)  # Fixed layout, no tight_layout
+
+    def update(self, weather_summaries):
+        """
+        Appends new readings to the per-city histories.
+
+        Args:
+            weather_summaries (list of dict): New records, each with 'date'
+                                              ('YYYY-MM-DD HH:MM:SS'), 'avg_temperature' and
+                                              optionally 'city' and 'dominant_condition'.
+        """
+        import matplotlib.dates as mdates
+
+        grouped = {}
+        for entry in weather_summaries:
+            city = entry.get('city', 'All cities')
+            times, temps = grouped.setdefault(city, ([], []))
+            times.append(datetime.fromisoformat(entry['date']))
+            temps.append(float(entry['avg_temperature']))  # Converted here so a bad record fails before any series changes
+            if entry.get('dominant_condition'):
+                self._get_series(city).condition = entry['dominant_condition']
+
+        for city, (times, temps) in grouped.items():
+            series = self._get_series(city)
+            series.extend(mdates.date2num(times), temps)
+            if self.history_days is not None:
+                series.trim(series.times[series.size - 1] - self.history_days)  # Date numbers count days
+            self.dirty = True
+
+    @timed('plot')
+    def render(self):
+        """
+        Redraws the figure and writes it to `filename` if new data arrived since the last render.
+
+        Returns:
+            str: The file written.
+            None: If rendering was skipped because nothing changed.
+        """
+        if not self.dirty:
+            return None
+
+        for city, series in self.series.items():
+            x, y = decimate_min_max(*series.data(), self.buckets)
+            series.line.set_data(x, y)
+            series.line.set_label(f"{city} ({series.condition})" if series.condition else city)
+
+        self.axes.relim()
+        self.axes.autoscale_view()
+
+        # Rebuild the legend only when the set of cities changed
+        cities = tuple(self.series)
+        if cities != self.legend_cities:
+            legend = self.axes.get_legend()
+            if legend is not None:
+                legend.remove()
+            if len(cities) <= self.max_legend:
+                self.axes.legend(loc='upper left')
+            self.legend_cities = cities
+
+        self._rotate()
+        root = os.path.splitext(self.filename)[0]
+        _save_atomic(self.figure, self.filename)
+        for file_format in self.formats:
+            _save_atomic(self.figure, f"{root}.{file_format}")
+        self.dirty = False
+        return self.filename
+
+    def svg(self):
+        """
+        Returns the figure as it was last rendered, as SVG markup.
+        """
+        return figure_svg(self.figure)
+
+    def small_multiples(self, columns=4, max_cities=24, panel_size=(3.0, 2.0), dpi=100):
+        """
+        Builds a grid with one small chart per city on a shared temperature scale,
+        which stays readable where one combined chart would be a tangle of lines.
+
+        Args:
+            columns (int): Charts per row.
+            max_cities (int): Cities drawn at most (the first ones added).
+            panel_size (tuple): The size of each chart in inches.
+            dpi (int): The figure resolution.
+
+        Returns:
+            matplotlib.figure.Figure: The figure, or None if there is no data.
+        """
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        cities = [city for city, series in self.series.items() if series.size > series.start][:max_cities]
+        if not cities:
+            return None
+
+        rows = -(-len(cities) // columns)
+        figure = Figure(figsize=(panel_size[0] * columns, panel_size[1] * rows), dpi=dpi)
+        FigureCanvasAgg(figure)
+        grid = figure.subplots(rows, columns, sharey=True, squeeze=False)
+        buckets = int(panel_size[0] * dpi)
+        for axes, city in zip(grid.flat, cities):
+            series = self.series[city]
+            x, y = decimate_min_max(*series.data(), buckets)
+            axes.plot(x, y, linewidth=1)
+            axes.set_title(f"{city} ({series.condition})" if series.condition else city, fontsize=9)
+            axes.xaxis_date()
+            axes.tick_params(labelsize=7)
+            axes.tick_params(axis='x', labelbottom=False)
+        for axes in grid.flat[len(cities):]:
+            axes.set_visible(False)
+        figure.subplots_adjust(left=0.06, right=0.98, top=1 - 0.3 / rows, bottom=0.04, hspace=0.5)
+        return figure
+
+    def render_small_multiples(self, filename, **options):
+        """
+        Writes the `small_multiples` grid to a file (PNG, SVG or any format matplotlib
+        supports, chosen by extension).
+
+        Returns:
+            matplotlib.figure.Figure: The figure written, or None if there is no data.
+        """
+        figure = self.small_multiples(**options)
+        if figure is not None:
+            _save_atomic(figure, filename)
+        return figure
+
+    def _get_series(self, city):
+        series = self.series.get(city)
+        if series is None:
+            line, = self.axes.plot([], [], linewidth=1)
+            series = self.series[city] = _CitySeries(line)
+        return series
+
+    def _rotate(self):
+        if not self.keep or not os.path.exists(self.filename):
+            return
+        root, ext = os.path.splitext(self.filename)
+        for generation in range(self.keep - 1, 0, -1):
+            older = f"{root}.{generation}{ext}"
+            if os.path.exists(older):
+                os.replace(older, f"{root}.{generation + 1}{ext}")
+        os.replace(self.filename, f"{root}.1{ext}")
@@ -0,0 +1,190 @@
+import bisect
+import hashlib
+import multiprocessing
+import queue
+import time
+from app.api_client import fetch_all_weather_data, BASE_URL, DEFAULT_TIMEOUT
+from app.data_processing import process_weather_batch
+from app.alerting import AlertEngine
+
+class HashRing:
+    """
+    Consistent hash ring that assigns cities to shards.
+
+    Each shard owns `replicas` points on the ring, so adding or removing a shard
+    only moves the cities adjacent to its points instead of reshuffling everything.
+
+    Args:
+        shard_count (int): The number of shards.
+        replicas (int): Virtual nodes per shard; more gives a more even spread.
+    """
+
+    def __init__(self, shard_count, replicas=100):
+        points = sorted((self._hash(f"shard-{shard}-{replica}"), shard)
+                        for shard in range(shard_count) for replica in range(replicas))
+        self.keys = [key for key, _ in points]
+        self.shards = [shard for _, shard in points]
+
+    def shard_for(self, city):
+        """
+        Returns the shard that owns a city.
+        """
+        index = bisect.bisect(self.keys, self._hash(city)) % len(self.keys)
+        return self.shards[index]
+
+    def partition(self, cities):
+        """
+        Splits cities into one list per shard.
+
+        Args:
+            cities (list of str): The names of the cities.
+
+        Returns:
+            list of list: The cities owned by each shard, indexed by shard number.
+        """
+        shard_count = max(self.shards) + 1
+        shards = [[] for _ in range(shard_count)]
+        for city in cities:
+            shards[self.shard_for(city)].append(city)
+        return shards
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+def shard_rules(rules, cities):
+    """
+    Returns a copy of an alert engine holding only the state of the given cities,
+    so each worker starts from the streaks and cooldowns saved for its shard.
+
+    Args:
+        rules (AlertEngine): The configured engine, with any restored state.
+        cities (list of str): The cities owned by the shard.
+
+    Returns:
+        AlertEngine: An engine with the same thresholds and the shard's state.
+    """
+    engine = AlertEngine(rules.high_threshold, rules.low_threshold, rules.rate_threshold, rules.consecutive,
+                         rules.hysteresis, rules.cooldown, rules.high_overrides, rules.low_overrides)
+    state = rules.export_state()
+    owned = set(cities)
+    rows = [row for row, city in enumerate(state['cities']) if city in owned]
+    engine.import_state({name: [state['cities'][row] for row in rows] if name == 'cities' else values[rows]
+                         for name, values in state.items()})
+    return engine
+
+def run_worker(shard, cities, api_key, result_queue, stop_event, interval, cycles=None,
+               max_workers=10, timeout=DEFAULT_TIMEOUT, base_url=BASE_URL, alert_engine=None, make_fetch=None):
+    """
+    Worker process loop: fetches, processes and checks alerts for one shard of cities
+    every `interval` seconds, and sends each cycle's results to `result_queue`.
+
+    Each result is a compact dict of NumPy columns from `process_weather_batch`
+    plus 'shard', the 'alerts' triggered, the time they were 'evaluated_at' and the
+    shard's 'alert_state' after the cycle (see `AlertEngine.export_state`), so only
+    one pickle per cycle crosses the process boundary. A cycle that fails sends
+    {'shard': ..., 'error': ...} instead and the worker carries on with the next cycle.
+
+    Args:
+        shard (int): The shard number of this worker.
+        cities (list of str): The cities owned by this shard.
+        api_key (str): The API key for authenticating the OpenWeatherMap API request.
+        result_queue (multiprocessing.Queue): Where result batches are sent.
+        stop_event (multiprocessing.Event): Set to stop the worker.
+        interval (float): Seconds between cycles.
+        cycles (int, optional): Stop after this many cycles (runs until stopped if None).
+        max_workers (int): The maximum number of concurrent requests within the worker.
+        timeout (float): The per-request deadline in seconds.
+        base_url (str): The base URL of the weather API.
+        alert_engine (AlertEngine, optional): The shard's alert rules and state (see
+                                              `shard_rules`); default rules if None.
+        make_fetch (callable, optional): Called once in the worker process with the shard number;
+                                         returns the function that fetches a cycle's new payloads
+                                         for a list of cities. If None, every city is fetched with
+                                         `fetch_all_weather_data`, without caching or retries.
+    """
+    alert_engine = alert_engine or AlertEngine()
+    if make_fetch is not None:
+        fetch = make_fetch(shard)
+    else:
+        def fetch(cities):
+            return [data for _, data in fetch_all_weather_data(cities, api_key, max_workers, timeout, base_url)
+                    if data]
+    started = time.monotonic()
+    cycle = 0
+    while not stop_event.is_set() and (cycles is None or cycle < cycles):
+        try:
+            batch = process_weather_batch(fetch(cities))
+            batch['shard'] = shard
+            batch['evaluated_at'] = time.time()
+            batch['alerts'] = alert_engine.evaluate(batch['city'], batch['temperature'], now=batch['evaluated_at'])
+            batch['alert_state'] = alert_engine.export_state()
+            result_queue.put(batch)
+        except Exception as e:
+            result_queue.put({'shard': shard, 'error': f"{type(e).__name__}: {e}"})
+
+        # Drift-free pacing: wait for the next slot measured from the start time
+        cycle += 1
+        if cycles is None or cycle < cycles:
+            stop_event.wait(max(0.0, started + cycle * interval - time.monotonic()))
+
+def run_sharded(cities, api_key, handle_batch, worker_count, interval, cycles=None, stop_event=None,
+                max_workers=10, timeout=DEFAULT_TIMEOUT, base_url=BASE_URL, rules=None, make_fetch=None):
+    """
+    Shards cities across `worker_count` processes by consistent hashing and hands
+    every result batch to `handle_batch` in the calling process, which acts as the
+    single writer/aggregator. Slow database writes or plotting in `handle_batch`
+    never block fetching, which happens in the workers. Failed worker cycles are
+    reported here and skipped.
+
+    Workers are started with the 'spawn' method, so they never inherit the
+    caller's threads, locks or open database connections.
+
+    Args:
+        cities (list of str): The names of the cities to monitor.
+        api_key (str): The API key for authenticating the OpenWeatherMap API request.
+        handle_batch (callable): Called with each result batch from `run_worker`.
+        worker_count (int): The number of worker processes.
+        interval (float): Seconds between each worker's cycles.
+        cycles (int, optional): Cycles each worker runs (runs until stopped if None).
+        stop_event (multiprocessing.Event, optional): Set to stop all workers; must come from
+                                                      `multiprocessing.get_context('spawn')`.
+        max_workers (int): The maximum number of concurrent requests per worker.
+        timeout (float): The per-request deadline in seconds.
+        base_url (str): The base URL of the weather API.
+        rules (AlertEngine, optional): The alert rules and restored state to split across
+                                       the shards; default rules if None.
+        make_fetch (callable, optional): Builds each worker's fetching pipeline (see `run_worker`);
+                                         must be a module-level function so it can be pickled.
+    """
+    context = multiprocessing.get_context('spawn')
+    stop_event = stop_event or context.Event()
+    result_queue = context.Queue()
+    shards = HashRing(worker_count).partition(cities)
+    rules = rules or AlertEngine()
+
+    processes = [
+        context.Process(target=run_worker, name=f"weather-worker-{shard}",
+                        args=(shard, shard_cities, api_key, result_queue, stop_event, interval, cycles,
+                              max_workers, timeout, base_url, shard_rules(rules, shard_cities), make_fetch),
+                        daemon=True)
+        for shard, shard_cities in enumerate(shards) if shard_cities
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        # Aggregate results until every worker has exited and the queue is drained
+        while any(process.is_alive() for process in processes) or not result_queue.empty():
+            try:
+                batch = result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if 'error' in batch:
+                print(f"Error in weather worker {batch['shard']}: {batch['error']}")
+                continue
+            handle_batch(batch)
+    finally:
+        stop_event.set()
+        for process in processes:
+            process.join(timeout=timeout + 1)
@@ -1,10 +1,12 @@
 # config.py
 
 import os
-from dotenv import load_dotenv
 
 # Load environment variables from a .env file for better security
-load_dotenv()
+# (skipped when the key is already set, e.g. by cron or a service manager)
+if 'OPENWEATHER_API_KEY' not in os.environ:
+    from dotenv import load_dotenv
+    load_dotenv()
 
 # OpenWeatherMap API key
 API_KEY = os.getenv('OPENWEATHER_API_KEY')  # Fetch from environment variables
@@ -22,10 +24,96 @@ CITIES = [
 # Temperature thresholds for alerts
 TEMP_THRESHOLD = 35.0  # Alert when temperature exceeds 35°C
 ALERT_CONSECUTIVE_THRESHOLD = 2  # Trigger alert if breached in 2 consecutive updates
+LOW_TEMP_THRESHOLD = 5.0  # Alert when temperature falls below 5°C
+RATE_OF_CHANGE_THRESHOLD = 5.0  # Alert when temperature changes by 5°C between updates
+ALERT_HYSTERESIS = 1.0  # Degrees back past a threshold before a streak resets
+ALERT_COOLDOWN = 1800  # Minimum seconds between repeated alerts of one kind for a city
+CITY_TEMP_THRESHOLDS = {}  # Per-city high thresholds, e.g. {'Chennai': 38.0}
+ALERT_STATE_FILE = 'alert_state.npz'  # Alert streaks and cooldowns persisted across restarts (without STATE_DIR)
+
+# Warm restart (snapshots of in-memory state plus a write-ahead log of readings)
+STATE_DIR = 'state'  # Directory of the state snapshot and write-ahead log (None disables)
+STATE_SNAPSHOT_INTERVAL = 300  # Minimum seconds between state snapshots
+STATE_WAL_FSYNC = True  # Sync every write-ahead log append to disk
+
+# Plot output settings
+PLOT_FILENAME = 'temperature_trends.png'  # Overwritten with the latest render every cycle
+PLOT_KEEP_FILES = 0  # Number of previous renders to keep as rotated copies
+PLOT_IN_BACKGROUND = True  # Render plots and reports in a separate process so cycles never wait for them
+PLOT_EXPORT_FORMATS = ()  # Extra formats written next to PLOT_FILENAME, e.g. ('svg',)
+PLOT_HISTORY_DAYS = 7  # Days of readings the live trends plot keeps per city (older ones are dropped)
+PLOT_SMALL_MULTIPLES_FILE = None  # Also plot one small chart per city to this file, e.g. 'city_trends.png'
+REPORT_HTML_FILE = None  # Also write an HTML report with the charts and daily summaries, e.g. 'report.html'
 
 # Interval to wait between data fetches (in seconds)
 SLEEP_INTERVAL = 300  # 5 minutes
 
+# Adaptive per-city scheduling
+ADAPTIVE_SCHEDULING = True  # Poll cities near the threshold more often and stable cities less often
+MIN_POLL_INTERVAL = 60  # Fastest polling interval for cities near the threshold (in seconds)
+MAX_POLL_INTERVAL = 1800  # Slowest polling interval for stable cities (in seconds)
+REQUEST_RATE_BUDGET = 1.0  # Maximum sustained API requests per second (60/minute free plan)
+
+# Multi-source ingestion (the `ingest` command)
+FILE_SOURCES = []  # Station feeds to merge, e.g. [{'pattern': 'feeds/*.ndjson', 'name': 'stations', 'priority': 10}]
+SOURCE_PRIORITIES = {'openweathermap': 0}  # Source name to priority; higher wins when readings collide
+MERGE_RESOLUTION = 300  # Readings of a city within this many seconds of each other are duplicates
+MERGE_WINDOW = 3600  # Seconds sources may lag one another before their readings are dropped as late
+
+# Recomputing history (the `backfill` command)
+BACKFILL_PARTITION_DAYS = 7  # Days of readings recomputed per parallel task
+BACKFILL_WORKERS = os.cpu_count() or 1  # Worker processes recomputing partitions
+BACKFILL_CHECKPOINT_DIR = 'backfill_checkpoints'  # Finished partitions, so an interrupted run resumes
+
+# Concurrent fetching settings
+MAX_CONCURRENT_REQUESTS = 10  # Maximum number of API requests in flight at once
+REQUEST_TIMEOUT = 10  # Per-request deadline (in seconds)
+WORKER_PROCESSES = 1  # Shard cities across this many worker processes (1 runs everything in one process)
+
+# API reliability (rate limiting, retries and circuit breaking)
+API_RATE_LIMIT = 60  # API calls per minute allowed by the API plan (60 on the free plan)
+API_RATE_BURST = 10  # API calls allowed back to back before the rate limit applies
+FETCH_MAX_RETRIES = 3  # Retries of a failed or throttled API call
+RETRY_BACKOFF_BASE = 0.5  # Upper bound of the first retry delay (in seconds), doubling per retry
+RETRY_BACKOFF_CAP = 30  # Upper bound of any retry delay (in seconds)
+CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive failures that stop calls to an endpoint
+CIRCUIT_RESET_TIMEOUT = 60  # Seconds before a stopped endpoint is tried again
+FETCH_CYCLE_DEADLINE = 120  # Seconds a cycle may spend fetching, retries included
+
+# Batched fetching through the OpenWeatherMap multi-ID group endpoint
+USE_GROUP_ENDPOINT = True  # Fetch cities in batches by ID instead of one request per city
+GROUP_CHUNK_SIZE = 20  # City IDs per group request (the API allows at most 20)
+CITY_ID_CACHE_FILE = 'city_ids.json'  # On-disk cache of city name to ID mappings
+
+# Response cache settings
+CACHE_TTL = 600  # Seconds a fetched payload is reused (OpenWeatherMap refreshes about every 10 minutes)
+CACHE_MAX_ENTRIES = 10000  # Cached cities before the least recently used are evicted
+RESPONSE_CACHE_FILE = 'response_cache.json'  # On-disk copy of the cache that survives restarts
+
+# Database write settings
+DB_POOL_SIZE = 5  # Number of pooled MySQL connections
+DB_BATCH_SIZE = 500  # Buffered rows that trigger a batched write
+DB_FLUSH_INTERVAL = 5.0  # Maximum time rows stay buffered (in seconds)
+DB_MAX_BUFFERED_ROWS = 100000  # Rows kept in memory while MySQL is down and there is no local store
+
+# Time-series storage (raw readings plus hourly and daily rollups)
+TIMESERIES_ENABLED = True  # Also write readings to the time-series tables
+RAW_RETENTION_DAYS = 30  # Days of raw 5-minute readings to keep
+HOURLY_RETENTION_DAYS = 365  # Days of hourly rollups to keep (daily rollups are kept forever)
+
+# Embedded local storage
+STORAGE_BACKEND = 'mysql'  # 'mysql', or 'local' to run with no database server
+LOCAL_STORE_FALLBACK = True  # Buffer writes locally while MySQL is down and replay them later
+LOCAL_STORE_DIR = 'local_store'  # Directory of the embedded store (SQLite metadata + segment files)
+LOCAL_STORE_MAX_REPLAY_ATTEMPTS = 3  # Failed replays of a batch MySQL rejects before its bad rows are quarantined
+
+# Instrumentation
+METRICS_ENABLED = True  # Collect per-stage latency histograms and counters
+METRICS_PORT = 9108  # Serve /metrics (Prometheus text) and /metrics.json on this port (0 disables; skipped with a warning if taken)
+METRICS_SNAPSHOT_FILE = None  # Also write a JSON snapshot to this file, e.g. 'metrics.json'
+METRICS_SNAPSHOT_INTERVAL = 60  # Seconds between JSON snapshots
+SLOW_CYCLE_PROFILE_THRESHOLD = None  # Sample and log stacks of cycles slower than this (in seconds)
+
 # Optional: Add more configurations as needed
 
 def display_config():
@@ -38,7 +126,14 @@ def display_config():
     print(f"Cities to Monitor: {', '.join(CITIES)}")
     print(f"Temperature Alert Threshold: {TEMP_THRESHOLD}°C")
     print(f"Alert Consecutive Threshold: {ALERT_CONSECUTIVE_THRESHOLD} updates")
+    print(f"Low Temperature Threshold: {LOW_TEMP_THRESHOLD}°C")
+    print(f"Rate of Change Threshold: {RATE_OF_CHANGE_THRESHOLD}°C per update")
     print(f"Sleep Interval: {SLEEP_INTERVAL} seconds")
+    print(f"Adaptive Scheduling: {ADAPTIVE_SCHEDULING} ({MIN_POLL_INTERVAL}-{MAX_POLL_INTERVAL} seconds)")
+    print(f"Max Concurrent Requests: {MAX_CONCURRENT_REQUESTS}")
+    print(f"Request Timeout: {REQUEST_TIMEOUT} seconds")
+    print(f"API Rate Limit: {API_RATE_LIMIT} calls per minute ({FETCH_MAX_RETRIES} retries per call)")
+    print(f"Use Group Endpoint: {USE_GROUP_ENDPOINT} ({GROUP_CHUNK_SIZE} cities per request)")
 
 if __name__ == "__main__":
     # Display the configuration when this script is run directly
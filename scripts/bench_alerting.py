@@ -0,0 +1,36 @@
+# scripts/bench_alerting.py
+#
+# Measures AlertEngine throughput in readings per second for a large number of
+# cities. Run from the project root with: python -m scripts.bench_alerting [cities]
+
+import sys
+import time
+
+import numpy as np
+
+from app.alerting import AlertEngine
+
+CYCLES = 20
+
+def main():
+    city_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    cities = [f"City{i}" for i in range(city_count)]
+    rng = np.random.default_rng(0)
+    engine = AlertEngine(cooldown=0)
+
+    # Register every city once so the timed cycles measure steady-state evaluation
+    engine.evaluate(cities, rng.normal(30, 5, city_count), now=0)
+
+    alerts = 0
+    start = time.perf_counter()
+    for cycle in range(1, CYCLES + 1):
+        temperatures = rng.normal(30, 5, city_count)
+        alerts += len(engine.evaluate(cities, temperatures, now=cycle * 300))
+    elapsed = time.perf_counter() - start
+
+    readings = CYCLES * city_count
+    print(f"{city_count} cities x {CYCLES} cycles: {readings / elapsed:,.0f} readings/s, "
+          f"{elapsed / CYCLES * 1000:.1f} ms per cycle, {alerts} alerts")
+
+if __name__ == "__main__":
+    main()
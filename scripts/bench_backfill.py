@@ -0,0 +1,163 @@
+# scripts/bench_backfill.py
+#
+# Recomputes daily summaries and alerts from raw readings with app.backfill:
+#   1. checks the results match the live path (DailyAggregate and AlertEngine fed
+#      one cycle at a time) on a small data set, and that an interrupted run
+#      resumes from its checkpoints;
+#   2. loads a year of 5-minute readings for 1000 cities into an on-disk SQLite
+#      database and times the full recompute.
+# Run from the project root with: python -m scripts.bench_backfill [--cities N] [--days N] [--workers N]
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from functools import partial
+
+import numpy as np
+
+from app import data_processing
+from app.alerting import AlertEngine
+from app.backfill import SQLITE_SCHEMA as BACKFILL_SCHEMA, backfill
+from app.data_processing import add_to_daily_summary, set_daily_summary_sink
+from app.timeseries import SQLITE_SCHEMA
+from scripts.synthetic import CONDITIONS, SUMMARY_SCHEMA, generate_series
+
+START = datetime(2024, 1, 1)
+SLICE_DAYS = 7  # Days generated at a time, which keeps memory flat for a year of data
+
+def create_database(path):
+    connection = sqlite3.connect(path)
+    connection.executescript(SUMMARY_SCHEMA + SQLITE_SCHEMA + BACKFILL_SCHEMA)
+    connection.close()
+    return partial(sqlite3.connect, path, timeout=600)
+
+def load_readings(connect, city_count, days, seed=0):
+    # Synthetic series a week at a time, inserted cycle by cycle as the live pipeline writes them
+    connection = connect()
+    connection.execute("PRAGMA journal_mode = WAL")
+    loaded = 0
+    for first_day in range(0, days, SLICE_DAYS):
+        series = generate_series(city_count, min(SLICE_DAYS, days - first_day),
+                                 start=START + timedelta(days=first_day), seed=seed + first_day)
+        times = [value.strftime('%Y-%m-%d %H:%M:%S') for value in series['times']]
+        temperature = series['temperature']
+        rows = ((city, time_value, temp, temp, temp, CONDITIONS[condition])
+                for time_value, temps, conditions in zip(times, temperature.tolist(), series['condition'].tolist())
+                for city, temp, condition in zip(series['cities'], temps, conditions))
+        connection.executemany("INSERT INTO weather_readings VALUES (?, ?, ?, ?, ?, ?)", rows)
+        connection.commit()
+        loaded += temperature.size
+    connection.close()
+    return loaded
+
+def live_results(connect, rules):
+    # The live path: every reading through DailyAggregate and the AlertEngine, one cycle at a time
+    connection = connect()
+    rows = connection.execute("SELECT city, recorded_at, temperature, weather_condition FROM weather_readings "
+                              "ORDER BY recorded_at, city").fetchall()
+    connection.close()
+    summaries = {}
+    set_daily_summary_sink(lambda summary: summaries.__setitem__((summary['city'], summary['date']), summary))
+    data_processing.daily_weather_data.clear()
+    alerts = []
+    cycle = []
+    for i, (city, recorded_at, temperature, condition) in enumerate(rows):
+        add_to_daily_summary(city, {'temperature': temperature, 'weather_condition': condition, 'date': recorded_at})
+        cycle.append((city, temperature))
+        if i + 1 == len(rows) or rows[i + 1][1] != recorded_at:
+            now = datetime.fromisoformat(recorded_at).timestamp()
+            alerts.extend((alert_city, temp, kind, alert_time) for alert_city, temp, kind, alert_time in
+                          rules.evaluate([reading[0] for reading in cycle], [reading[1] for reading in cycle], now))
+            cycle = []
+    for city, aggregate in data_processing.daily_weather_data.items():
+        summaries[(city, aggregate.day)] = aggregate.summary(city)
+    set_daily_summary_sink(None)
+    return summaries, sorted(alerts)
+
+def verify(tmp_dir, workers):
+    connect = create_database(os.path.join(tmp_dir, 'verify.db'))
+    days = 21
+    load_readings(connect, 40, days, seed=11)
+    end = START + timedelta(days=days)
+    # A hair-trigger rule set so every alert kind fires often
+    make_rules = partial(AlertEngine, high_threshold=30.0, low_threshold=8.0, rate_threshold=1.0,
+                         consecutive=3, hysteresis=1.0, cooldown=1800)
+
+    # Interrupt the first run after two partitions, then resume
+    checkpoint_dir = os.path.join(tmp_dir, 'checkpoints')
+    finished = []
+
+    def interrupt(result):
+        finished.append(result)
+        if len(finished) == 2:
+            raise KeyboardInterrupt
+
+    try:
+        backfill(START, end, connect, make_rules(), dialect='sqlite', partition_days=3, workers=1,
+                 checkpoint_dir=checkpoint_dir, progress=interrupt)
+    except KeyboardInterrupt:
+        pass
+    result = backfill(START, end, connect, make_rules(), dialect='sqlite', partition_days=3, workers=workers,
+                      checkpoint_dir=checkpoint_dir)
+
+    connection = connect()
+    stored = {(city, day): (readings, avg, low, high, variance, dominant)
+              for city, day, readings, avg, low, high, variance, dominant in connection.execute(
+                  "SELECT city, day, readings, avg_temperature, min_temperature, max_temperature, "
+                  "temperature_variance, dominant_condition FROM weather_daily_summary")}
+    stored_alerts = connection.execute("SELECT city, temperature, kind, alert_time FROM weather_alerts").fetchall()
+    connection.close()
+
+    summaries, alerts = live_results(connect, make_rules())
+    expected = {key: (summary['readings'], summary['avg_temperature'], summary['min_temperature'],
+                      summary['max_temperature'], summary['temperature_variance'], summary['dominant_condition'])
+                for key, summary in summaries.items()}
+    mismatched = sum(1 for key, value in expected.items()
+                     if key not in stored or not np.allclose(stored[key][:5], value[:5], atol=0.011)
+                     or stored[key][5] != value[5])
+    expected_alerts = sorted(alerts)
+    print(f"verify: {len(expected)} daily summaries, {mismatched} mismatched; "
+          f"{len(expected_alerts)} live alerts, recomputed alerts identical: "
+          f"{sorted(stored_alerts) == expected_alerts}; resumed {result['resumed_partitions']} of "
+          f"{result['resumed_partitions'] + result['partitions']} partitions")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the backfill/recompute of summaries and alerts.")
+    parser.add_argument('--cities', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--partition-days', type=int, default=7)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--skip-verify', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if not args.skip_verify:
+            verify(tmp_dir, args.workers)
+
+        connect = create_database(os.path.join(tmp_dir, 'weather.db'))
+        start = time.perf_counter()
+        loaded = load_readings(connect, args.cities, args.days)
+        print(f"loaded {loaded} readings ({args.cities} cities x {args.days} days) in "
+              f"{time.perf_counter() - start:.0f}s, database {os.path.getsize(os.path.join(tmp_dir, 'weather.db')) / 1e9:.1f}GB")
+
+        done = []
+        start = time.perf_counter()
+
+        def progress(result):
+            done.append(result)
+            if len(done) % 10 == 0:
+                print(f"  {len(done)} partitions, {time.perf_counter() - start:.0f}s")
+
+        result = backfill(START, START + timedelta(days=args.days), connect, AlertEngine(), dialect='sqlite',
+                          partition_days=args.partition_days, workers=args.workers,
+                          checkpoint_dir=os.path.join(tmp_dir, 'checkpoints'), progress=progress)
+        seconds = time.perf_counter() - start
+        print(f"recomputed {result['readings']} readings into {result['daily_summaries']} daily summaries and "
+              f"{result['alerts']} alerts in {seconds:.0f}s ({result['readings'] / seconds:.0f} readings/s, "
+              f"{args.workers} workers, {result['partitions']} partitions)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# scripts/bench_daily_summary.py
+#
+# Feeds simulated 5-minute readings for many cities over many days through the
+# streaming daily aggregates and reports memory at the end of each day, which
+# should stay flat. The default month for 10k cities takes several minutes.
+# Run from the project root with: python -m scripts.bench_daily_summary [cities] [days]
+
+import resource
+import sys
+import time
+from datetime import date, timedelta
+
+from app import data_processing
+from app.data_processing import add_to_daily_summary, get_daily_summaries, set_daily_summary_sink
+
+TICKS_PER_DAY = 24 * 60 // 5  # One reading every 5 minutes
+CONDITIONS = ['clear sky', 'few clouds', 'haze', 'light rain']
+
+def main():
+    city_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    cities = [f"City{i}" for i in range(city_count)]
+
+    finished = [0]
+    def count_finished(summary):
+        finished[0] += 1
+    set_daily_summary_sink(count_finished)
+    data_processing.daily_weather_data.clear()
+
+    start = time.perf_counter()
+    print(f"{'day':>4} {'finished':>9} {'peak RSS (MB)':>14} {'updates/s':>12}")
+    for day in range(days):
+        day_start = time.perf_counter()
+        stamp = (date(2024, 1, 1) + timedelta(days=day)).isoformat() + ' 00:00:00'
+        for tick in range(TICKS_PER_DAY):
+            condition = CONDITIONS[tick % len(CONDITIONS)]
+            for i, city in enumerate(cities):
+                reading = {'temperature': 20.0 + (i + tick) % 15, 'weather_condition': condition,
+                           'date': stamp}
+                add_to_daily_summary(city, reading)
+        get_daily_summaries(cities[0])
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+        rate = TICKS_PER_DAY * city_count / (time.perf_counter() - day_start)
+        print(f"{day + 1:>4} {finished[0]:>9} {peak_rss:>14.1f} {rate:>12.0f}")
+    print(f"Total time: {time.perf_counter() - start:.1f}s for {days * TICKS_PER_DAY * city_count} readings")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# scripts/bench_database.py
+#
+# Compares per-row commits against the batched WriteBuffer using SQLite as a
+# local stand-in for MySQL. Run from the project root with:
+# python -m scripts.bench_database
+
+import os
+import sqlite3
+import tempfile
+import time
+
+from app.database import WriteBuffer
+
+ROW_COUNTS = [1000, 10000]
+
+SCHEMA = """
+CREATE TABLE weather_summary (city TEXT, date TEXT, avg_temperature REAL, max_temperature REAL,
+                              min_temperature REAL, weather_condition TEXT);
+CREATE TABLE weather_alerts (city TEXT, temperature REAL, alert_time TEXT, kind TEXT);
+"""
+
+def connect(path):
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.executescript(SCHEMA)
+    return connection
+
+def make_rows(count):
+    return [(f"City{i}", '2024-10-20 12:00:00', 30.0, 31.0, 29.0, 'clear sky') for i in range(count)]
+
+def run_per_row(path, rows):
+    connection = connect(path)
+    start = time.perf_counter()
+    for row in rows:
+        cursor = connection.cursor()
+        cursor.execute("INSERT INTO weather_summary VALUES (?, ?, ?, ?, ?, ?)", row)
+        connection.commit()
+        cursor.close()
+    elapsed = time.perf_counter() - start
+    connection.close()
+    return elapsed
+
+def run_buffered(path, rows):
+    buffer = WriteBuffer(lambda: connect(path), max_rows=len(rows) + 1, flush_interval=0,
+                         paramstyle='qmark')
+    start = time.perf_counter()
+    for row in rows:
+        buffer.add_summary(*row)
+    buffer.flush()
+    elapsed = time.perf_counter() - start
+    stats = buffer.stats()
+    buffer.close()
+    return elapsed, stats
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'rows':>8} {'per-row (s)':>12} {'buffered (s)':>13} {'rows/s':>12} {'flush (ms)':>11}")
+        for count in ROW_COUNTS:
+            rows = make_rows(count)
+            per_row = run_per_row(os.path.join(tmp_dir, f"per_row_{count}.db"), rows)
+            buffered, stats = run_buffered(os.path.join(tmp_dir, f"buffered_{count}.db"), rows)
+            print(f"{count:>8} {per_row:>12.3f} {buffered:>13.3f} {stats['rows_per_second']:>12.0f} "
+                  f"{stats['last_flush_ms']:>11.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# scripts/bench_fetch.py
+#
+# Compares cycle time and HTTP call count of sequential, concurrent and batched
+# (group endpoint) fetching against a local stub server.
+# Run from the project root with: python -m scripts.bench_fetch
+
+import os
+import tempfile
+import time
+
+from app.api_client import fetch_weather_data, fetch_all_weather_data, fetch_all_weather_data_batched
+from scripts.stub_server import start_stub_server
+
+CITY_COUNTS = [10, 100, 1000]
+LATENCY = 0.02  # Simulated API round-trip in seconds
+MAX_WORKERS = 32
+
+def run_sequential(cities, base_url):
+    start = time.perf_counter()
+    for city in cities:
+        fetch_weather_data(city, 'stub', base_url=base_url)
+    return time.perf_counter() - start
+
+def run_concurrent(cities, base_url):
+    start = time.perf_counter()
+    for _ in fetch_all_weather_data(cities, 'stub', max_workers=MAX_WORKERS, base_url=base_url):
+        pass
+    return time.perf_counter() - start
+
+def run_batched(cities, base_url, cache_path):
+    start = time.perf_counter()
+    for _ in fetch_all_weather_data_batched(cities, 'stub', cache_path, max_workers=MAX_WORKERS,
+                                            base_url=base_url):
+        pass
+    return time.perf_counter() - start
+
+def main():
+    server, base_url = start_stub_server(latency=LATENCY)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            print(f"{'cities':>8} {'sequential (s)':>15} {'concurrent (s)':>15} {'calls':>7} "
+                  f"{'batched (s)':>12} {'calls':>7}")
+            for count in CITY_COUNTS:
+                cities = [f"City{i}" for i in range(count)]
+                cache_path = os.path.join(tmp_dir, f"city_ids_{count}.json")
+
+                # Sequential runs get slow quickly; only time them for small counts
+                sequential = run_sequential(cities, base_url) if count <= 100 else float('nan')
+
+                server.request_count = 0
+                concurrent = run_concurrent(cities, base_url)
+                concurrent_calls = server.request_count
+
+                # Warm the ID cache first, then measure a steady-state batched cycle
+                run_batched(cities, base_url, cache_path)
+                server.request_count = 0
+                batched = run_batched(cities, base_url, cache_path)
+                batched_calls = server.request_count
+
+                print(f"{count:>8} {sequential:>15.3f} {concurrent:>15.3f} {concurrent_calls:>7} "
+                      f"{batched:>12.3f} {batched_calls:>7}")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
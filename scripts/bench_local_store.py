@@ -0,0 +1,99 @@
+# scripts/bench_local_store.py
+#
+# Compares ingest rate and range-scan speed of the embedded LocalStore (columnar
+# memmap segments) with the SQL write path, using SQLite as a stand-in for MySQL.
+# Run from the project root with: python -m scripts.bench_local_store [rows]
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.database import WriteBuffer
+from app.local_store import LocalStore
+
+CITY_COUNT = 1000
+BATCH_ROWS = 1000  # Rows per flush, about one cycle for 1000 cities
+
+SUMMARY_SCHEMA = """
+CREATE TABLE weather_summary (city TEXT, date TEXT, avg_temperature REAL, max_temperature REAL,
+                              min_temperature REAL, weather_condition TEXT);
+CREATE INDEX idx_summary_date ON weather_summary (date);
+CREATE TABLE weather_alerts (city TEXT, temperature REAL, alert_time TEXT, kind TEXT);
+"""
+
+def make_batches(row_count, start):
+    batches = []
+    for first in range(0, row_count, BATCH_ROWS):
+        batch = []
+        for n in range(first, min(row_count, first + BATCH_ROWS)):
+            stamp = start + timedelta(minutes=5 * (n // CITY_COUNT))
+            batch.append((f"City{n % CITY_COUNT}", stamp.strftime('%Y-%m-%d %H:%M:%S'),
+                          25 + n % 13, 27 + n % 13, 23 + n % 13, 'clear sky'))
+        batches.append(batch)
+    return batches
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    start = datetime(2024, 1, 1)
+    batches = make_batches(row_count, start)
+    end = start + timedelta(minutes=5 * (row_count // CITY_COUNT))
+    window = (end - timedelta(hours=6), end)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Ingest into the embedded store
+        store = LocalStore(os.path.join(tmp_dir, 'store'))
+        begin = time.perf_counter()
+        for batch in batches:
+            store.append(batch)
+        local_ingest = row_count / (time.perf_counter() - begin)
+
+        # Ingest through the batched SQL path
+        path = os.path.join(tmp_dir, 'sql.db')
+        def connect():
+            connection = sqlite3.connect(path, check_same_thread=False)
+            connection.executescript(SUMMARY_SCHEMA)
+            return connection
+        buffer = WriteBuffer(connect, max_rows=BATCH_ROWS + 1, flush_interval=0, paramstyle='qmark')
+        begin = time.perf_counter()
+        for batch in batches:
+            for row in batch:
+                buffer.add_summary(*row)
+            buffer.flush()
+        sql_ingest = row_count / (time.perf_counter() - begin)
+        connection = buffer.connection
+
+        # Scan the last six hours for all cities
+        begin = time.perf_counter()
+        local_rows = sum(len(columns['timestamp']) for columns in store.scan(*window))
+        local_scan = (time.perf_counter() - begin) * 1000
+
+        begin = time.perf_counter()
+        sql_rows = len(connection.execute(
+            "SELECT city, date, avg_temperature FROM weather_summary WHERE date >= ? AND date < ?",
+            tuple(t.strftime('%Y-%m-%d %H:%M:%S') for t in window)).fetchall())
+        sql_scan = (time.perf_counter() - begin) * 1000
+
+        # Full scan of every reading (e.g. recomputing aggregates)
+        begin = time.perf_counter()
+        local_mean = sum(float(columns['temperature'].sum()) for columns in store.scan()) / row_count
+        local_full = (time.perf_counter() - begin) * 1000
+
+        begin = time.perf_counter()
+        sql_mean = connection.execute("SELECT AVG(avg_temperature) FROM weather_summary").fetchone()[0]
+        sql_full = (time.perf_counter() - begin) * 1000
+
+        assert local_rows == sql_rows and abs(local_mean - sql_mean) < 1e-3
+        buffer.close()
+        store.close()
+
+    print(f"{row_count} readings, {CITY_COUNT} cities")
+    print(f"{'':>22} {'local store':>12} {'SQL path':>10}")
+    print(f"{'ingest (rows/s)':>22} {local_ingest:>12,.0f} {sql_ingest:>10,.0f}")
+    print(f"{'6h range scan (ms)':>22} {local_scan:>12.2f} {sql_scan:>10.2f}")
+    print(f"{'full scan (ms)':>22} {local_full:>12.2f} {sql_full:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# scripts/bench_merge.py
+#
+# Throughput of multi-source ingestion: the ReadingMerger on its own, the
+# streaming NDJSON and CSV file sources, and the parallel fan-out plus merge of
+# two overlapping station feeds end to end. Also checks that a file source's
+# memory stays flat as the file grows.
+# Run from the project root with: python -m scripts.bench_merge [cities] [days]
+
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from app.sources import FileSource, Reading, ReadingMerger, merge_sources
+from scripts.synthetic import CONDITIONS, generate_series
+
+CHUNK_SIZE = 1000
+
+def write_feeds(series, tmp_dir):
+    # Station A reports every city; station B half of them, 30 seconds later, so half of B collides with A
+    cities = series['cities']
+    ndjson_path = os.path.join(tmp_dir, 'station_a.ndjson')
+    csv_path = os.path.join(tmp_dir, 'station_b.csv')
+    with open(ndjson_path, 'w') as ndjson_file, open(csv_path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['city', 'timestamp', 'temperature', 'condition'])
+        for time_value, temps, conditions in zip(series['times'], series['temperature'].tolist(),
+                                                 series['condition'].tolist()):
+            timestamp = int(time_value.timestamp())
+            for city, temp, condition in zip(cities, temps, conditions):
+                ndjson_file.write(json.dumps({'city': city, 'timestamp': timestamp, 'temperature': temp,
+                                              'condition': CONDITIONS[condition]}) + '\n')
+            writer.writerows((city, timestamp + 30, temp + 0.1, CONDITIONS[condition])
+                             for city, temp, condition in zip(cities[::2], temps[::2], conditions[::2]))
+    return ndjson_path, csv_path
+
+def make_chunks(series):
+    # The same two feeds as in-memory chunks, interleaved as the fan-out would deliver them
+    cities = series['cities']
+    chunks = []
+    for time_value, temps, conditions in zip(series['times'], series['temperature'].tolist(),
+                                             series['condition'].tolist()):
+        timestamp = time_value.timestamp()
+        a = [Reading(city, timestamp, temp, temp, temp, CONDITIONS[condition], 'station_a')
+             for city, temp, condition in zip(cities, temps, conditions)]
+        b = [Reading(city, timestamp + 30, temp, temp, temp, CONDITIONS[condition], 'station_b')
+             for city, temp, condition in zip(cities[::2], temps[::2], conditions[::2])]
+        chunks.extend(a[i:i + CHUNK_SIZE] for i in range(0, len(a), CHUNK_SIZE))
+        chunks.extend(b[i:i + CHUNK_SIZE] for i in range(0, len(b), CHUNK_SIZE))
+    return chunks
+
+def stream_peak(path, name, limit=None):
+    # Peak traced memory while streaming a file source (optionally stopping after `limit` rows)
+    tracemalloc.start()
+    rows = 0
+    for chunk in FileSource(path, name).chunks(CHUNK_SIZE):
+        rows += len(chunk)
+        if limit is not None and rows >= limit:
+            break
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rows, peak
+
+def main():
+    city_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    series = generate_series(city_count, days=days, seed=7)
+    priorities = {'station_a': 1, 'station_b': 2}
+
+    chunks = make_chunks(series)
+    rows = sum(len(chunk) for chunk in chunks)
+    merger = ReadingMerger(priorities)
+    start = time.perf_counter()
+    emitted = sum(len(merger.add(chunk)) for chunk in chunks) + len(merger.flush())
+    seconds = time.perf_counter() - start
+    print(f"{'stage':<28} {'rows':>9} {'rows/s':>11} {'output':>9}")
+    print(f"{'merge (in memory)':<28} {rows:>9} {rows / seconds:>11.0f} {emitted:>9}")
+    del chunks
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ndjson_path, csv_path = write_feeds(series, tmp_dir)
+        for label, path in (('NDJSON source', ndjson_path), ('CSV source', csv_path)):
+            start = time.perf_counter()
+            rows = sum(len(chunk) for chunk in FileSource(path, label).chunks(CHUNK_SIZE))
+            print(f"{label:<28} {rows:>9} {rows / (time.perf_counter() - start):>11.0f}")
+
+        merger = ReadingMerger(priorities)
+        sources = [FileSource(ndjson_path, 'station_a'), FileSource(csv_path, 'station_b')]
+        start = time.perf_counter()
+        emitted = sum(len(chunk) for chunk in merge_sources(sources, merger=merger, chunk_size=CHUNK_SIZE))
+        seconds = time.perf_counter() - start
+        stats = merger.stats()
+        print(f"{'fan-out + merge (files)':<28} {stats['readings']:>9} {stats['readings'] / seconds:>11.0f} "
+              f"{emitted:>9}")
+        print(f"\nmerge stats: {stats}")
+
+        # Memory of a streaming file source does not grow with the number of rows read
+        print(f"\n{'rows streamed':>14} {'peak memory':>12}")
+        total_rows = city_count * len(series['times'])
+        for limit in (total_rows // 10, None):
+            streamed, peak = stream_peak(ndjson_path, 'station_a', limit)
+            print(f"{streamed:>14} {peak / 1024:>10.0f}KB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# scripts/bench_metrics.py
+#
+# Measures the per-call overhead of the @timed instrumentation by processing the
+# same payload with metrics disabled and enabled.
+# Run from the project root with: python -m scripts.bench_metrics [calls]
+
+import sys
+import time
+
+from app import metrics
+from app.data_processing import process_weather_data
+from scripts.stub_server import make_weather_payload
+
+def time_calls(payload, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        process_weather_data(payload)
+    return time.perf_counter() - start
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    payload = make_weather_payload('Delhi')
+    time_calls(payload, 1000)  # Warm up
+
+    metrics.set_enabled(False)
+    disabled = time_calls(payload, calls)
+    metrics.set_enabled(True)
+    enabled = time_calls(payload, calls)
+
+    print(f"Calls: {calls}")
+    print(f"Metrics disabled: {disabled / calls * 1e6:.2f} us/call")
+    print(f"Metrics enabled:  {enabled / calls * 1e6:.2f} us/call")
+    print(f"Overhead:         {(enabled - disabled) / calls * 1e6:.2f} us/call")
+    print(metrics.render_prometheus())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# scripts/bench_processing.py
+#
+# Compares the per-dict process_weather_data path against the columnar
+# process_weather_batch path. Run from the project root with:
+# python -m scripts.bench_processing
+
+import time
+
+from app.data_processing import process_weather_data, process_weather_batch
+from config import TEMP_THRESHOLD
+from scripts.stub_server import make_weather_payload
+
+BATCH_SIZES = [10000, 100000]
+
+def run_per_dict(payloads):
+    start = time.perf_counter()
+    processed = [process_weather_data(payload) for payload in payloads]
+    alerts = sum(1 for row in processed if row['temperature'] > TEMP_THRESHOLD)
+    return time.perf_counter() - start, alerts
+
+def run_batch(payloads):
+    start = time.perf_counter()
+    batch = process_weather_batch(payloads, threshold=TEMP_THRESHOLD)
+    alerts = int(batch['above_threshold'].sum())
+    return time.perf_counter() - start, alerts
+
+def main():
+    print(f"{'readings':>9} {'per-dict (s)':>13} {'batch (s)':>10} {'speedup':>8}")
+    for size in BATCH_SIZES:
+        payloads = [make_weather_payload(f"City{i}") for i in range(size)]
+        per_dict, per_dict_alerts = run_per_dict(payloads)
+        batch, batch_alerts = run_batch(payloads)
+        assert per_dict_alerts == batch_alerts
+        print(f"{size:>9} {per_dict:>13.3f} {batch:>10.3f} {per_dict / batch:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# scripts/bench_render_offload.py
+#
+# Shows that the monitoring loop's cycle time no longer depends on render cost:
+# runs back-to-back ingest cycles over a synthetic series, rendering inline with
+# TrendRenderer or in the background with RenderWorker, at increasing render cost
+# (trends plot only; plus SVG export and per-city small multiples; plus the HTML
+# report). Background requests that arrive mid-render are coalesced.
+# Run from the project root with: python -m scripts.bench_render_offload [cities] [cycles]
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from app import data_processing
+from app.data_processing import add_to_daily_summary, get_daily_summaries
+from app.reporting import RenderWorker, render_outputs
+from app.visualization import TrendRenderer
+from scripts.synthetic import CONDITIONS, generate_series
+
+HISTORY_DAYS = 2
+
+def make_cycles(series):
+    cities = series['cities']
+    for time_value, temps, conditions in zip(series['times'], series['temperature'].tolist(),
+                                             series['condition'].tolist()):
+        reading_date = time_value.strftime('%Y-%m-%d %H:%M:%S')
+        yield [{'city': city, 'date': reading_date, 'avg_temperature': temp, 'temperature': temp,
+                'weather_condition': CONDITIONS[condition], 'dominant_condition': CONDITIONS[condition]}
+               for city, temp, condition in zip(cities, temps, conditions)]
+
+def run(cycles, history, background, tmp_dir, formats=(), small_multiples=False, report=False):
+    data_processing.daily_weather_data.clear()
+    filename = os.path.join(tmp_dir, 'trends.png')
+    small_multiples_file = os.path.join(tmp_dir, 'cities.png') if small_multiples else None
+    report_file = os.path.join(tmp_dir, 'report.html') if report else None
+    if background:
+        renderer = RenderWorker(filename, formats=formats, small_multiples_file=small_multiples_file,
+                                report_file=report_file)
+    else:
+        renderer = TrendRenderer(filename, formats=formats)
+    # Render the history once first, so every timed cycle appends to a warm plot
+    renderer.update(history)
+    if background:
+        renderer.render()
+    else:
+        render_outputs(renderer, (), small_multiples_file, report_file)
+
+    durations = []
+    for readings in cycles:
+        start = time.perf_counter()
+        summaries = []
+        for reading in readings:
+            add_to_daily_summary(reading['city'], reading)
+            summaries.append(get_daily_summaries(reading['city']))
+        renderer.update(readings)
+        if background:
+            renderer.render(summaries)
+        else:
+            render_outputs(renderer, summaries, small_multiples_file, report_file)
+        durations.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    stats = None
+    if background:
+        renderer.close()
+        stats = renderer.stats()
+    drain = time.perf_counter() - start
+    return np.array(durations) * 1000, drain, stats
+
+def main():
+    city_count = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    cycle_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    series = generate_series(city_count, days=HISTORY_DAYS + 1, seed=5)
+    all_cycles = list(make_cycles(series))
+    history_ticks = len(all_cycles) - cycle_count
+    history = [reading for readings in all_cycles[:history_ticks] for reading in readings]
+    cycles = all_cycles[history_ticks:]
+    print(f"{city_count} cities, {len(history)} readings of history, {cycle_count} back-to-back cycles")
+
+    scenarios = [
+        ("plot", {}),
+        ("plot+svg+multiples", {'formats': ('svg',), 'small_multiples': True}),
+        ("plot+svg+multiples+html", {'formats': ('svg',), 'small_multiples': True, 'report': True}),
+    ]
+    print(f"{'render work':<24} {'mode':<11} {'cycle p50':>10} {'cycle p95':>10} {'drain':>8} {'renders':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for label, options in scenarios:
+            for mode, background in (('inline', False), ('background', True)):
+                durations, drain, stats = run(cycles, history, background, tmp_dir, **options)
+                renders = f"{stats['renders']}/{stats['applied']}" if stats else f"{cycle_count}/{cycle_count}"
+                print(f"{label:<24} {mode:<11} {np.percentile(durations, 50):>8.2f}ms "
+                      f"{np.percentile(durations, 95):>8.2f}ms {drain * 1000:>6.0f}ms {renders:>8}")
+
+if __name__ == "__main__":
+    main()
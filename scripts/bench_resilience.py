@@ -0,0 +1,88 @@
+# scripts/bench_resilience.py
+#
+# Fault-injection runs against the stub server: compares plain fetching with the
+# ResilientClient (retries, rate limiting, circuit breaker, stale fallback) at
+# 10-50% error rates, under 429 throttling, and through a full outage.
+# Run from the project root with: python -m scripts.bench_resilience [cities]
+
+import contextlib
+import io
+import sys
+import time
+
+from app.api_client import fetch_all_weather_data
+from app.resilience import ResilientClient
+from scripts.stub_server import start_stub_server, stub_city_names
+
+ERROR_RATES = [0.0, 0.1, 0.2, 0.3, 0.5]
+CYCLES = 3
+LATENCY = 0.01
+MAX_WORKERS = 10
+
+def make_client():
+    # A generous rate limit, so the table shows the effect of the faults rather than of pacing
+    return ResilientClient(rate=500, burst=MAX_WORKERS, max_retries=3, backoff_base=0.05, backoff_cap=1.0,
+                           failure_threshold=20, reset_timeout=5)
+
+def run_cycles(cities, base_url, client, cycles=CYCLES):
+    fresh = stale = 0
+    start = time.perf_counter()
+    for _ in range(cycles):
+        if client is not None:
+            client.start_cycle(30)
+        for _, data in fetch_all_weather_data(cities, 'stub', MAX_WORKERS, timeout=2, base_url=base_url,
+                                              client=client):
+            if data and data.get('stale'):
+                stale += 1
+            elif data:
+                fresh += 1
+    elapsed = time.perf_counter() - start
+    total = len(cities) * cycles
+    return {'fresh': fresh / total, 'complete': (fresh + stale) / total, 'cities_per_second': total / elapsed}
+
+def print_row(label, server, requests_before, result, client=None):
+    stats = client.stats() if client is not None else {}
+    print(f"{label:<24} {result['fresh']:>7.1%} {result['complete']:>9.1%} {result['cities_per_second']:>9.0f} "
+          f"{server.request_count - requests_before:>9} {stats.get('retries', 0):>8} "
+          f"{stats.get('short_circuited', 0):>8}")
+
+def main():
+    city_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    cities = stub_city_names(city_count)
+    print(f"{'scenario':<24} {'fresh':>7} {'complete':>9} {'cities/s':>9} {'requests':>9} {'retries':>8} "
+          f"{'refused':>8}")
+
+    # Failed cities are printed by the client; keep the table readable
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        rows = []
+        for error_rate in ERROR_RATES:
+            for label, client in (('plain', None), ('resilient', make_client())):
+                server, base_url = start_stub_server(LATENCY, error_rate=error_rate, city_count=city_count, seed=1)
+                before = server.request_count
+                result = run_cycles(cities, base_url, client)
+                rows.append((f"{error_rate:.0%} errors, {label}", server, before, result, client))
+                server.shutdown()
+
+        # Throttling: 20% of requests get 429 with a short Retry-After
+        for label, client in (('plain', None), ('resilient', make_client())):
+            server, base_url = start_stub_server(LATENCY, throttle_rate=0.2, retry_after=0.1,
+                                                 city_count=city_count, seed=1)
+            before = server.request_count
+            rows.append((f"20% throttled, {label}", server, before, run_cycles(cities, base_url, client), client))
+            server.shutdown()
+
+        # Outage: one healthy cycle, then every request fails; the breaker trips and stale values are served
+        client = make_client()
+        server, base_url = start_stub_server(LATENCY, city_count=city_count, seed=1)
+        run_cycles(cities, base_url, client, cycles=1)
+        server.error_rate = 1.0
+        before = server.request_count
+        rows.append(("outage, resilient", server, before, run_cycles(cities, base_url, client), client))
+        server.shutdown()
+
+    for row in rows:
+        print_row(*row)
+    print(f"\n({log.getvalue().count(chr(10))} fetch failures logged)")
+
+if __name__ == "__main__":
+    main()
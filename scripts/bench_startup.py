@@ -0,0 +1,50 @@
+# scripts/bench_startup.py
+#
+# Measures cold-start time of the entry point in fresh interpreters: importing
+# scripts.main, a one-shot `fetch` against the local stub server, and for
+# comparison the heavy dependencies the entry point used to import eagerly.
+# Run from the project root with: python -m scripts.bench_startup [repeats]
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from scripts.stub_server import start_stub_server, stub_city_names
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def time_command(args, env, cwd, repeats):
+    # Best of several runs, which filters out noise from the rest of the machine
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], env=env, cwd=cwd, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    server, base_url = start_stub_server(latency=0.0, city_count=10)
+    # The key is set so config skips reading .env, as under cron or a service manager
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT, OPENWEATHER_API_KEY='stub')
+    commands = [
+        ("interpreter only", ['-c', 'pass']),
+        ("old eager imports", ['-c', 'import matplotlib.pyplot, mysql.connector, numpy, requests, dotenv']),
+        ("import scripts.main", ['-c', 'import scripts.main']),
+        ("display config", ['-c', 'import config; config.display_config()']),
+        ("one-shot fetch (10)", ['-m', 'scripts.main', 'fetch', '--base-url', base_url, *stub_city_names(10)]),
+    ]
+    try:
+        # Run in a scratch directory so the caches the fetch writes don't touch the project
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            print(f"{'command':<22} {'seconds':>8}")
+            for label, args in commands:
+                print(f"{label:<22} {time_command(args, env, tmp_dir, repeats):>8.3f}")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+# scripts/bench_suite.py
+#
+# Reproducible benchmark suite for the monitoring pipeline. Runs every stage
+# (fetch, process, daily summary, alerting, database writes, plotting) on its own
+# and end to end against the local stub server, synthetic multi-day series and an
+# in-process database, then writes the results as JSON so runs can be compared
+# across releases. Needs no API key and no MySQL server.
+#
+# Run from the project root with: python -m scripts.bench_suite [--cities N] [--days N]
+#     [--stages fetch,process,...] [--output FILE] [--baseline FILE] [--tolerance 0.15]
+# Exits with status 1 if --baseline is given and any stage's throughput regressed.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from app import data_processing, metrics
+from app.alerting import AlertEngine
+from app.api_client import fetch_all_weather_data, fetch_all_weather_data_batched
+from app.data_processing import (process_weather_data, process_weather_batch, add_to_daily_summary,
+                                 get_daily_summaries, set_daily_summary_sink)
+from app.database import WriteBuffer
+from app.visualization import TrendRenderer
+from scripts.stub_server import start_stub_server, stub_city_names
+from scripts.synthetic import generate_series, iter_payloads, iter_readings, StubDatabase
+
+STAGES = ['fetch', 'process', 'daily_summary', 'alerting', 'database', 'plotting', 'end_to_end']
+
+API_KEY = 'bench'  # The stub server accepts any key
+
+def summarize(durations, ops):
+    """
+    Turns per-sample durations into throughput and latency figures.
+
+    Args:
+        durations (list of float): Seconds taken by each timed sample.
+        ops (int): The number of operations (cities, readings, rows) across all samples.
+
+    Returns:
+        dict: Total seconds, ops, ops per second and p50/p95/max sample latency in milliseconds.
+    """
+    total = float(np.sum(durations))
+    samples = np.asarray(durations) * 1000
+    return {
+        'ops': ops,
+        'seconds': round(total, 4),
+        'ops_per_second': round(ops / total, 1) if total else 0.0,
+        'p50_ms': round(float(np.percentile(samples, 50)), 3),
+        'p95_ms': round(float(np.percentile(samples, 95)), 3),
+        'max_ms': round(float(samples.max()), 3),
+    }
+
+def bench_fetch(args, series, tmp_dir):
+    server, base_url = start_stub_server(args.latency, error_rate=args.error_rate, city_count=args.cities)
+    cities = stub_city_names(args.cities)
+    results = {}
+    try:
+        # Failed cities are printed by the client; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fetched = sum(1 for _, data in fetch_all_weather_data(cities, API_KEY, args.workers, base_url=base_url)
+                          if data)
+            results['fetch'] = summarize([time.perf_counter() - start], len(cities))
+            results['fetch']['completeness'] = round(fetched / len(cities), 4)
+
+            # The first batched run resolves city IDs; time the steady state that follows it
+            cache_path = os.path.join(tmp_dir, 'city_ids.json')
+            list(fetch_all_weather_data_batched(cities, API_KEY, cache_path, max_workers=args.workers,
+                                                base_url=base_url))
+            requests_before = server.request_count
+            start = time.perf_counter()
+            fetched = sum(1 for _, data in fetch_all_weather_data_batched(cities, API_KEY, cache_path,
+                                                                         max_workers=args.workers,
+                                                                         base_url=base_url)
+                          if data)
+            results['fetch_batched'] = summarize([time.perf_counter() - start], len(cities))
+            results['fetch_batched']['completeness'] = round(fetched / len(cities), 4)
+            results['fetch_batched']['requests'] = server.request_count - requests_before
+    finally:
+        server.shutdown()
+    return results
+
+def bench_process(args, series, tmp_dir):
+    durations = []
+    batch_durations = []
+    readings = 0
+    for payloads in iter_payloads(series):
+        start = time.perf_counter()
+        for payload in payloads:
+            process_weather_data(payload)
+        durations.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        process_weather_batch(payloads)
+        batch_durations.append(time.perf_counter() - start)
+        readings += len(payloads)
+        if readings >= args.sample_readings:
+            break
+    return {'process': summarize(durations, readings), 'process_batch': summarize(batch_durations, readings)}
+
+def bench_daily_summary(args, series, tmp_dir):
+    data_processing.daily_weather_data.clear()
+    set_daily_summary_sink(None)
+    durations = []
+    readings = 0
+    for tick_readings in iter_readings(series):
+        start = time.perf_counter()
+        for reading in tick_readings:
+            add_to_daily_summary(reading['city'], reading)
+        durations.append(time.perf_counter() - start)
+        readings += len(tick_readings)
+
+    start = time.perf_counter()
+    summaries = [get_daily_summaries(city) for city in series['cities']]
+    summary_seconds = time.perf_counter() - start
+    data_processing.daily_weather_data.clear()
+    return {'daily_summary': summarize(durations, readings),
+            'daily_summary_read': summarize([summary_seconds], len(summaries))}
+
+def bench_alerting(args, series, tmp_dir):
+    engine = AlertEngine()
+    cities = series['cities']
+    durations = []
+    alerts = 0
+    for stamp, temps in zip(series['times'], series['temperature']):
+        now = stamp.timestamp()
+        start = time.perf_counter()
+        alerts += len(engine.evaluate(cities, temps, now=now))
+        durations.append(time.perf_counter() - start)
+    result = summarize(durations, temps.size * len(durations))
+    result['alerts'] = alerts
+    return {'alerting': result}
+
+def bench_database(args, series, tmp_dir):
+    database = StubDatabase()
+    buffer = WriteBuffer(database.connect, max_rows=len(series['cities']) + 1, flush_interval=0,
+                         paramstyle='qmark', timeseries=True)
+    durations = []
+    rows = 0
+    try:
+        for tick_readings in iter_readings(series):
+            start = time.perf_counter()
+            for r in tick_readings:
+                buffer.add_summary(r['city'], r['date'], r['temperature'], r['max_temperature'],
+                                   r['min_temperature'], r['weather_condition'])
+            buffer.flush()
+            durations.append(time.perf_counter() - start)
+            rows += len(tick_readings)
+            if rows >= args.sample_readings:
+                break
+        buffer.close()
+        return {'database': summarize(durations, rows)}
+    finally:
+        database.close()
+
+def bench_plotting(args, series, tmp_dir):
+    cities = series['cities'][:args.plot_cities]
+    history = [{'city': r['city'], 'date': r['date'], 'avg_temperature': r['temperature'],
+                'dominant_condition': r['weather_condition']}
+               for tick_readings in iter_readings(series) for r in tick_readings[:len(cities)]]
+    renderer = TrendRenderer(filename=os.path.join(tmp_dir, 'trends.png'))
+
+    # Load all but the last few cycles, then time steady-state cycles of one new tick each
+    cycles = 5
+    renderer.update(history[:-cycles * len(cities)])
+    renderer.render()
+    durations = []
+    for cycle in range(cycles, 0, -1):
+        new = history[-cycle * len(cities):len(history) - (cycle - 1) * len(cities)]
+        start = time.perf_counter()
+        renderer.update(new)
+        renderer.render()
+        durations.append(time.perf_counter() - start)
+    result = summarize(durations, cycles)
+    result['points'] = len(history)
+    return {'plotting': result}
+
+def bench_end_to_end(args, series, tmp_dir):
+    server, base_url = start_stub_server(args.latency, error_rate=args.error_rate, city_count=args.cities)
+    cities = stub_city_names(args.cities)
+    database = StubDatabase()
+    buffer = WriteBuffer(database.connect, max_rows=args.cities * 2 + 1, flush_interval=0,
+                         paramstyle='qmark', timeseries=True)
+    engine = AlertEngine()
+    renderer = TrendRenderer(filename=os.path.join(tmp_dir, 'end_to_end.png'), max_legend=0)
+    data_processing.daily_weather_data.clear()
+    set_daily_summary_sink(None)
+
+    durations = []
+    readings = 0
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(args.cycles):
+                start = time.perf_counter()
+                summaries = []
+                alert_cities = []
+                alert_temperatures = []
+                for city, data in fetch_all_weather_data(cities, API_KEY, args.workers, base_url=base_url):
+                    processed = process_weather_data(data) if data else None
+                    if not processed:
+                        continue
+                    add_to_daily_summary(city, processed)
+                    buffer.add_summary(city, processed['date'], processed['temperature'],
+                                       processed['max_temperature'], processed['min_temperature'],
+                                       processed['weather_condition'])
+                    summaries.append({'city': city, 'date': processed['date'],
+                                      'avg_temperature': processed['temperature']})
+                    alert_cities.append(city)
+                    alert_temperatures.append(processed['temperature'])
+                for city, temperature, kind, alert_time in engine.evaluate(alert_cities, alert_temperatures):
+                    buffer.add_alert(city, temperature, alert_time, kind)
+                buffer.flush()
+                renderer.update(summaries)
+                renderer.render()
+                durations.append(time.perf_counter() - start)
+                readings += len(summaries)
+
+                # Readings are keyed by (city, second); never start two cycles in the same second
+                time.sleep(max(0.0, 1.0 - (time.perf_counter() - start)))
+        buffer.close()
+    finally:
+        server.shutdown()
+        database.close()
+        data_processing.daily_weather_data.clear()
+    result = summarize(durations, readings)
+    result['completeness'] = round(readings / (len(cities) * args.cycles), 4)
+    return {'end_to_end': result}
+
+BENCHMARKS = {
+    'fetch': bench_fetch,
+    'process': bench_process,
+    'daily_summary': bench_daily_summary,
+    'alerting': bench_alerting,
+    'database': bench_database,
+    'plotting': bench_plotting,
+    'end_to_end': bench_end_to_end,
+}
+
+def environment():
+    """
+    Describes the code and machine a run was made on.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the throughput change of each stage against a baseline run.
+
+    Returns:
+        list of str: The stages whose throughput dropped by more than `tolerance`.
+    """
+    regressions = []
+    print(f"\n{'stage':<20} {'baseline ops/s':>15} {'current ops/s':>15} {'change':>8}")
+    for stage, result in results['stages'].items():
+        old = baseline.get('stages', {}).get(stage, {}).get('ops_per_second')
+        new = result['ops_per_second']
+        if not old:
+            continue
+        change = new / old - 1
+        flag = ''
+        if change < -tolerance:
+            regressions.append(stage)
+            flag = '  REGRESSION'
+        print(f"{stage:<20} {old:>15.1f} {new:>15.1f} {change:>+8.1%}{flag}")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the weather monitoring pipeline.")
+    parser.add_argument('--cities', type=int, default=1000, help="cities in the stub catalogue and series")
+    parser.add_argument('--days', type=int, default=2, help="days of 5-minute synthetic readings")
+    parser.add_argument('--latency', type=float, default=0.02, help="stub server latency in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of stub requests failing")
+    parser.add_argument('--workers', type=int, default=10, help="concurrent requests while fetching")
+    parser.add_argument('--cycles', type=int, default=3, help="end-to-end cycles to run")
+    parser.add_argument('--plot-cities', type=int, default=50, help="cities drawn in the plotting stage")
+    parser.add_argument('--sample-readings', type=int, default=100000,
+                        help="readings used by the process and database stages")
+    parser.add_argument('--stages', default=','.join(STAGES), help="comma-separated stages to run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None,
+                        help="results file (default: bench_results/bench-<time>.json)")
+    parser.add_argument('--baseline', default=None, help="results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="allowed throughput drop against the baseline")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(stages) - set(BENCHMARKS)
+    if unknown:
+        sys.exit(f"Unknown stages: {', '.join(sorted(unknown))} (choose from {', '.join(STAGES)})")
+
+    series = generate_series(args.cities, args.days, seed=args.seed)
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'stages': {},
+    }
+
+    metrics.set_enabled(False)  # Measure the pipeline itself, not its instrumentation
+    print(f"{'stage':<20} {'ops':>9} {'seconds':>9} {'ops/s':>12} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for stage in stages:
+            for name, result in BENCHMARKS[stage](args, series, tmp_dir).items():
+                results['stages'][name] = result
+                print(f"{name:<20} {result['ops']:>9} {result['seconds']:>9.3f} {result['ops_per_second']:>12.1f} "
+                      f"{result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f}")
+
+    output = args.output or os.path.join('bench_results', f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(f"Throughput regressed beyond {args.tolerance:.0%} in: {', '.join(regressions)}")
+
+if __name__ == "__main__":
+    main()
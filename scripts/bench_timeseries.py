@@ -0,0 +1,73 @@
+# scripts/bench_timeseries.py
+#
+# Loads synthetic 5-minute readings into the time-series tables (SQLite stand-in
+# for MySQL) and times range queries over windows from a day to a year, comparing
+# the resolution-aware query_range with scanning raw readings.
+# Run from the project root with: python -m scripts.bench_timeseries [cities] [days]
+
+import math
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.timeseries import SQLITE_SCHEMA, write_readings, query_range
+
+WINDOWS = [1, 7, 30, 365]  # Days
+QUERIES = 20
+
+def load(connection, city_count, days, start):
+    readings_per_day = 288
+    for day in range(days):
+        rows = []
+        for i in range(city_count):
+            for tick in range(readings_per_day):
+                stamp = start + timedelta(days=day, minutes=5 * tick)
+                temp = 28 + 6 * math.sin(2 * math.pi * tick / readings_per_day + i)
+                rows.append((f"City{i}", stamp.strftime('%Y-%m-%d %H:%M:%S'), temp, temp, temp, 'clear sky'))
+        cursor = connection.cursor()
+        write_readings(cursor, rows, dialect='sqlite')
+        connection.commit()
+        cursor.close()
+
+def time_query(func):
+    begin = time.perf_counter()
+    for _ in range(QUERIES):
+        rows = func()
+    return (time.perf_counter() - begin) / QUERIES * 1000, len(rows)
+
+def main():
+    city_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    start = datetime(2023, 1, 1)
+    end = start + timedelta(days=days)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        connection = sqlite3.connect(os.path.join(tmp_dir, 'timeseries.db'))
+        connection.executescript(SQLITE_SCHEMA)
+
+        begin = time.perf_counter()
+        load(connection, city_count, days, start)
+        elapsed = time.perf_counter() - begin
+        total = city_count * days * 288
+        print(f"Loaded {total} readings for {city_count} cities in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+        print(f"{'window':>7} {'points':>7} {'rollup (ms)':>12} {'raw scan (ms)':>14}")
+        for window in WINDOWS:
+            if window > days:
+                continue
+            window_start = end - timedelta(days=window)
+            rollup_ms, points = time_query(lambda: query_range(connection, 'City1', window_start, end,
+                                                               dialect='sqlite', retention={}))
+            raw_ms, _ = time_query(lambda: connection.execute(
+                "SELECT recorded_at, temperature FROM weather_readings "
+                "WHERE city = ? AND recorded_at >= ? AND recorded_at < ?",
+                ('City1', window_start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S'))
+            ).fetchall())
+            print(f"{window:>6}d {points:>7} {rollup_ms:>12.2f} {raw_ms:>14.2f}")
+        connection.close()
+
+if __name__ == "__main__":
+    main()
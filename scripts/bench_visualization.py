@@ -0,0 +1,44 @@
+# scripts/bench_visualization.py
+#
+# Measures per-cycle render time of the incremental TrendRenderer as history grows.
+# Run from the project root with: python -m scripts.bench_visualization
+
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.visualization import TrendRenderer
+
+HISTORY_SIZES = [1000, 100000, 1000000]
+
+def make_summaries(count, start):
+    return [{'city': 'Delhi',
+             'date': (start + timedelta(minutes=5 * i)).strftime('%Y-%m-%d %H:%M:%S'),
+             'avg_temperature': 30 + (i % 288) / 30.0}
+            for i in range(count)]
+
+def main():
+    start = datetime(2020, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'points':>9} {'renderer (ms)':>14} {'skipped (ms)':>13}")
+        for size in HISTORY_SIZES:
+            history = make_summaries(size + 1, start)
+            renderer = TrendRenderer(filename=os.path.join(tmp_dir, 'trends.png'), history_days=None)
+            renderer.update(history[:-1])
+            renderer.render()
+
+            # A steady-state cycle: one new point appended, then re-rendered
+            begin = time.perf_counter()
+            renderer.update(history[-1:])
+            renderer.render()
+            rendered = (time.perf_counter() - begin) * 1000
+
+            # A cycle with no new data
+            begin = time.perf_counter()
+            renderer.render()
+            skipped = (time.perf_counter() - begin) * 1000
+            print(f"{size:>9} {rendered:>14.1f} {skipped:>13.3f}")
+
+if __name__ == "__main__":
+    main()
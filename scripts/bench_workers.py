@@ -0,0 +1,40 @@
+# scripts/bench_workers.py
+#
+# Measures end-to-end throughput (fetch, process, alert check, aggregate) in
+# cities per second for 1 to 8 sharded worker processes against a local stub
+# server. Run from the project root with: python -m scripts.bench_workers [cities]
+
+import sys
+import time
+
+from app.workers import HashRing, run_sharded
+from scripts.stub_server import start_stub_server
+
+WORKER_COUNTS = [1, 2, 4, 8]
+LATENCY = 0.02  # Simulated API round-trip in seconds
+THREADS_PER_WORKER = 8
+
+def main():
+    city_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    cities = [f"City{i}" for i in range(city_count)]
+    server, base_url = start_stub_server(latency=LATENCY)
+    try:
+        print(f"{'workers':>8} {'largest shard':>14} {'seconds':>8} {'cities/s':>9}")
+        for worker_count in WORKER_COUNTS:
+            received = [0]
+            def count_batch(batch):
+                received[0] += len(batch['city'])
+
+            start = time.perf_counter()
+            run_sharded(cities, 'stub', count_batch, worker_count, interval=0, cycles=1,
+                        max_workers=THREADS_PER_WORKER, base_url=base_url)
+            elapsed = time.perf_counter() - start
+
+            largest = max(len(shard) for shard in HashRing(worker_count).partition(cities))
+            assert received[0] == city_count, f"only {received[0]} of {city_count} cities aggregated"
+            print(f"{worker_count:>8} {largest:>14} {elapsed:>8.2f} {city_count / elapsed:>9.0f}")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
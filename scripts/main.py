@@ -1,48 +1,302 @@
 # scripts/main.py
+#
+# Command-line entry point. Run from the project root with:
+#     python -m scripts.main [run]                 monitor continuously (the default)
+#     python -m scripts.main fetch [CITY ...]      fetch and print the current weather once
+#     python -m scripts.main ingest [FILE ...]     merge station feeds (and --api readings) into storage
+#     python -m scripts.main backfill --start DAY  recompute daily summaries and alerts from raw readings
+#     python -m scripts.main summarize [CITY ...]  print daily summaries of stored readings
+#     python -m scripts.main plot [CITY ...]       plot stored temperature trends to a PNG file
+#
+# Heavy dependencies (matplotlib, NumPy, the MySQL driver) are imported only by the
+# commands that use them, and no connection is opened until a command needs one.
 
-from app.api_client import fetch_weather_data
-from app.data_processing import process_weather_data, add_to_daily_summary, get_daily_summaries
-from app.database import create_connection, insert_weather_summary, close_connection
-from app.alerting import check_temperature_alert
-from app.visualization import plot_temperature_trends
-from config import API_KEY, CITIES, SLEEP_INTERVAL
+from app import metrics
+from config import (API_KEY, CITIES, SLEEP_INTERVAL, MAX_CONCURRENT_REQUESTS, REQUEST_TIMEOUT,
+                    USE_GROUP_ENDPOINT, GROUP_CHUNK_SIZE, CITY_ID_CACHE_FILE,
+                    DB_POOL_SIZE, DB_BATCH_SIZE, DB_FLUSH_INTERVAL, DB_MAX_BUFFERED_ROWS,
+                    CITY_TEMP_THRESHOLDS, ALERT_STATE_FILE, PLOT_FILENAME, PLOT_KEEP_FILES,
+                    PLOT_IN_BACKGROUND, PLOT_EXPORT_FORMATS, PLOT_SMALL_MULTIPLES_FILE, PLOT_HISTORY_DAYS,
+                    REPORT_HTML_FILE, CACHE_TTL, CACHE_MAX_ENTRIES, RESPONSE_CACHE_FILE,
+                    ADAPTIVE_SCHEDULING, MIN_POLL_INTERVAL, MAX_POLL_INTERVAL, REQUEST_RATE_BUDGET,
+                    WORKER_PROCESSES, TIMESERIES_ENABLED, RAW_RETENTION_DAYS, HOURLY_RETENTION_DAYS,
+                    STORAGE_BACKEND, LOCAL_STORE_FALLBACK, LOCAL_STORE_DIR, LOCAL_STORE_MAX_REPLAY_ATTEMPTS,
+                    METRICS_ENABLED, METRICS_PORT, METRICS_SNAPSHOT_FILE, METRICS_SNAPSHOT_INTERVAL,
+                    SLOW_CYCLE_PROFILE_THRESHOLD, API_RATE_LIMIT, API_RATE_BURST, FETCH_MAX_RETRIES,
+                    RETRY_BACKOFF_BASE, RETRY_BACKOFF_CAP, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT,
+                    FETCH_CYCLE_DEADLINE, FILE_SOURCES, SOURCE_PRIORITIES, MERGE_RESOLUTION, MERGE_WINDOW, STATE_DIR, STATE_SNAPSHOT_INTERVAL, STATE_WAL_FSYNC,
+                    BACKFILL_PARTITION_DAYS, BACKFILL_WORKERS, BACKFILL_CHECKPOINT_DIR)
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from functools import partial
+import argparse
+import json
 import time
 import logging
 
 # Set up logging configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Set up the connection to MySQL
-connection = create_connection()
+# Whether readings are stored in MySQL (otherwise only in the embedded store)
+use_mysql = STORAGE_BACKEND == 'mysql'
 
-def main():
+# Pipeline components, created on first use by the setup functions below
+response_cache = None  # Skips unchanged readings (restored from disk)
+resilient_client = None  # Rate limits and retries API calls, serving stale readings on failure
+local_store = None  # Embedded store, used on its own or as a fallback while MySQL is down
+pool = None  # MySQL connection pool
+write_buffer = None  # Batches database writes
+alert_engine = None  # Alert streaks and cooldowns (restored from the last run)
+alert_writer = None  # Hands alerts to the write buffer in the background
+trend_renderer = None  # Keeps the temperature trends plot up to date across cycles (in the background)
+state_snapshots = None  # Snapshots and logs in-memory state for a warm restart
+
+# Monotonic time of the last retention pass over the time-series tables
+last_pruned = None
+
+def setup_fetching():
+    """
+    Creates the response cache and the API reliability layer, unless already created.
+    """
+    global response_cache, resilient_client
+    if response_cache is not None:
+        return
+    from app.api_client import ResponseCache
+    from app.resilience import ResilientClient
+
+    response_cache = ResponseCache(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, path=RESPONSE_CACHE_FILE)
+    resilient_client = ResilientClient(API_RATE_LIMIT / 60, API_RATE_BURST, max_retries=FETCH_MAX_RETRIES,
+                                       backoff_base=RETRY_BACKOFF_BASE, backoff_cap=RETRY_BACKOFF_CAP,
+                                       failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                                       reset_timeout=CIRCUIT_RESET_TIMEOUT)
+
+def setup_storage():
+    """
+    Opens the embedded store and the MySQL connection pool and creates the write buffer,
+    unless already created.
+    """
+    global local_store, pool, write_buffer
+    if write_buffer is not None:
+        return
+    from app.database import create_connection_pool, get_pooled_connection, WriteBuffer, set_fallback_store
+    from app.local_store import LocalStore
+
+    local_store = (LocalStore(LOCAL_STORE_DIR, max_replay_attempts=LOCAL_STORE_MAX_REPLAY_ATTEMPTS)
+                   if not use_mysql or LOCAL_STORE_FALLBACK else None)
+    set_fallback_store(local_store)
+    pool = create_connection_pool(pool_size=DB_POOL_SIZE) if use_mysql else None
+    write_buffer = WriteBuffer(partial(get_pooled_connection, pool) if use_mysql else None, max_rows=DB_BATCH_SIZE,
+                               flush_interval=DB_FLUSH_INTERVAL, timeseries=TIMESERIES_ENABLED,
+                               local_store=local_store, max_buffered_rows=DB_MAX_BUFFERED_ROWS)
+
+def setup_pipeline():
+    """
+    Creates every component the monitoring loop uses, unless already created.
+    """
+    global alert_engine, alert_writer, trend_renderer, state_snapshots
+    setup_fetching()
+    setup_storage()
+    if alert_engine is not None:
+        return
+    from app.alerting import AlertEngine, AlertWriter
+    from app.data_processing import set_daily_summary_sink
+
+    alert_engine = AlertEngine(high_thresholds=CITY_TEMP_THRESHOLDS)
+    recovered = None
+    if STATE_DIR:
+        from app.state import StateSnapshots
+
+        # Restore the partial day's aggregates and alert streaks (before the sink is set,
+        # so days finished during replay were already logged by the previous run)
+        state_snapshots = StateSnapshots(STATE_DIR, interval=STATE_SNAPSHOT_INTERVAL, fsync=STATE_WAL_FSYNC)
+        recovered = state_snapshots.recover(alert_engine)
+        if recovered:
+            logging.info(f"Recovered in-memory state: {recovered}")
+    if recovered is None:
+        alert_engine.load_state(ALERT_STATE_FILE)
+    alert_writer = AlertWriter(write_buffer.add_alert)
+    if PLOT_IN_BACKGROUND:
+        from app.reporting import RenderWorker
+
+        trend_renderer = RenderWorker(filename=PLOT_FILENAME, keep=PLOT_KEEP_FILES, formats=PLOT_EXPORT_FORMATS,
+                                      small_multiples_file=PLOT_SMALL_MULTIPLES_FILE, report_file=REPORT_HTML_FILE,
+                                      history_days=PLOT_HISTORY_DAYS)
+    else:
+        from app.visualization import TrendRenderer
+
+        trend_renderer = TrendRenderer(filename=PLOT_FILENAME, keep=PLOT_KEEP_FILES, formats=PLOT_EXPORT_FORMATS,
+                                       history_days=PLOT_HISTORY_DAYS)
+    set_daily_summary_sink(log_finished_day)
+
+def shutdown():
+    """
+    Writes out queued alerts and buffered rows and closes the stores that were opened.
+    """
+    if state_snapshots is not None:
+        state_snapshots.close(alert_engine)  # Take a final snapshot so the next start replays nothing
+    if alert_writer is not None:
+        alert_writer.close()  # Hand any queued alerts to the write buffer
+    if PLOT_IN_BACKGROUND and trend_renderer is not None:
+        trend_renderer.close()  # Wait for the final render
+    if write_buffer is not None:
+        write_buffer.close()  # Flush remaining rows and close the database connection
+    if local_store is not None:
+        local_store.close()
+
+def make_fetcher(base_url=None, city_id_cache=CITY_ID_CACHE_FILE):
+    """
+    Returns the function that fetches a list of cities, batched through the group
+    endpoint or one request per city depending on USE_GROUP_ENDPOINT.
+
+    Args:
+        base_url (str, optional): The base URL of the weather API (e.g. a local stub server).
+        city_id_cache (str): The on-disk cache of city IDs used by the group endpoint.
+    """
+    from app.api_client import fetch_all_weather_data, fetch_all_weather_data_batched
+
+    options = {'base_url': base_url} if base_url else {}
+    if USE_GROUP_ENDPOINT:
+        return partial(fetch_all_weather_data_batched, api_key=API_KEY, cache_path=city_id_cache,
+                       chunk_size=GROUP_CHUNK_SIZE, max_workers=MAX_CONCURRENT_REQUESTS,
+                       timeout=REQUEST_TIMEOUT, client=resilient_client, **options)
+    return partial(fetch_all_weather_data, api_key=API_KEY, max_workers=MAX_CONCURRENT_REQUESTS,
+                   timeout=REQUEST_TIMEOUT, client=resilient_client, **options)
+
+def make_worker_fetch(shard):
+    """
+    Builds a worker process's fetching pipeline: the same response cache, API
+    reliability layer and fetcher as the single-process loop, one per shard.
+
+    Each shard keeps its own cache files and an equal share of the API rate limit,
+    so workers never overwrite each other's files or together exceed the limit.
+
+    Args:
+        shard (int): The shard number of the worker.
+
+    Returns:
+        callable: Fetches a list of cities and returns the payloads whose
+                  observation time advanced since the last cycle.
     """
-    Main function to fetch weather data for configured cities, process it, 
+    global response_cache, resilient_client
+    from app.api_client import ResponseCache, fetch_with_cache
+    from app.resilience import ResilientClient
+
+    response_cache = ResponseCache(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES,
+                                   path=f"{RESPONSE_CACHE_FILE}.shard{shard}" if RESPONSE_CACHE_FILE else None)
+    resilient_client = ResilientClient(API_RATE_LIMIT / 60 / WORKER_PROCESSES, API_RATE_BURST,
+                                       max_retries=FETCH_MAX_RETRIES, backoff_base=RETRY_BACKOFF_BASE,
+                                       backoff_cap=RETRY_BACKOFF_CAP, failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                                       reset_timeout=CIRCUIT_RESET_TIMEOUT)
+    fetch = make_fetcher(city_id_cache=f"{CITY_ID_CACHE_FILE}.shard{shard}")
+
+    def fetch_new(cities):
+        resilient_client.start_cycle(FETCH_CYCLE_DEADLINE)
+        payloads = [data for city, data in fetch_with_cache(cities, response_cache, fetch)
+                    if data and response_cache.is_new_reading(city, data)]
+        response_cache.save()
+        return payloads
+    return fetch_new
+
+def prune_old_readings():
+    """
+    Drops raw readings and hourly rollups past their retention windows, at most once a day.
+    """
+    global last_pruned
+    if not use_mysql or not TIMESERIES_ENABLED or (last_pruned is not None and time.monotonic() - last_pruned < 86400):
+        return
+    from mysql.connector import Error
+    from app.database import get_pooled_connection
+    from app.timeseries import prune_retention
+
+    connection = get_pooled_connection(pool)
+    if connection is None:
+        return
+    try:
+        result = prune_retention(connection, raw_days=RAW_RETENTION_DAYS, hourly_days=HOURLY_RETENTION_DAYS)
+        logging.info(f"Pruned expired time-series data: {result}")
+        last_pruned = time.monotonic()
+    except Error as e:
+        print(f"Error pruning time-series data: {e}")
+    finally:
+        connection.close()
+
+def render_plots(daily_summaries):
+    """
+    Re-renders the trends plot, small multiples and HTML report with the readings
+    passed to `trend_renderer.update`. In the background (PLOT_IN_BACKGROUND) this
+    only hands the readings and the cycle's daily summaries to the render process.
+
+    Args:
+        daily_summaries (list of dict): The cycle's daily summaries, for the HTML report.
+    """
+    if PLOT_IN_BACKGROUND:
+        trend_renderer.render(daily_summaries)
+        logging.debug("Render stats: %s", trend_renderer.stats())
+        return
+
+    from app import data_processing
+    from app.reporting import render_outputs
+
+    if REPORT_HTML_FILE:
+        daily_summaries = [aggregate.summary(city) for city, aggregate in data_processing.daily_weather_data.items()
+                           if aggregate.count]
+    plot_file = render_outputs(trend_renderer, daily_summaries, PLOT_SMALL_MULTIPLES_FILE, REPORT_HTML_FILE)
+    if plot_file:
+        logging.info(f"Temperature trends plot saved as '{plot_file}'.")
+
+def log_finished_day(summary):
+    """
+    Logs the final summary of a city's day once its readings roll over to the next day.
+    """
+    logging.info(f"Finished daily summary for {summary['city']}: {summary}")
+
+def main(cities=CITIES, refresh=()):
+    """
+    Main function to fetch weather data for configured cities, process it,
     store it in the database, check for temperature alerts, and plot trends.
+
+    Args:
+        cities (list of str): The cities to fetch in this cycle.
+        refresh (set of str): Cities fetched even if the response cache holds them.
+
+    Returns:
+        dict: The latest temperature for each city with a new reading this cycle.
     """
+    from app.api_client import fetch_with_cache
+    from app.data_processing import process_weather_data, add_to_daily_summary, get_daily_summaries
+
+    setup_pipeline()
     weather_summaries = []  # List to hold summaries for plotting
 
     # Dictionary to hold daily summaries for all cities
     daily_summaries_dict = {}
 
-    # Iterate through each city to fetch and process weather data
-    for city in CITIES:
-        logging.info(f"Fetching weather data for {city}...")
-        data = fetch_weather_data(city, API_KEY)  # Fetch weather data using the API key
-        
-        if data:
+    # Latest reading per city, evaluated for alerts in one pass after fetching
+    alert_cities = []
+    alert_temperatures = []
+    readings = {}
+    wal_readings = []
+
+    # Fetch weather data for all cities concurrently and process each result as it arrives
+    logging.info(f"Fetching weather data for {len(cities)} cities...")
+    resilient_client.start_cycle(FETCH_CYCLE_DEADLINE)  # Retries never run past this cycle's deadline
+    fetch = make_fetcher()
+
+    for city, data in fetch_with_cache(cities, response_cache, fetch, refresh):
+        # Skip cities whose observation time has not advanced since the last cycle
+        # (this includes stale fallbacks, which repeat the last reading)
+        if data and response_cache.is_new_reading(city, data):
             processed_data = process_weather_data(data)  # Process the fetched weather data
-            
+
             if processed_data:
-                # Log processed data for debugging
-                logging.info(f"Processed data for {city}: {processed_data}")
+                # Log processed data for debugging (formatted only when DEBUG is enabled)
+                logging.debug("Processed data for %s: %s", city, processed_data)
 
                 # Add processed data to the daily summary for the city
                 add_to_daily_summary(processed_data['city'], processed_data)
 
-                # Insert the processed data into the database
-                insert_weather_summary(
-                    connection,
+                # Buffer the processed data for the batched database write
+                write_buffer.add_summary(
                     processed_data['city'],
                     processed_data['date'],  # Insert the correctly formatted date
                     processed_data['temperature'],
@@ -53,31 +307,398 @@ def main():
 
                 # Collect processed data for plotting
                 weather_summaries.append({
+                    'city': processed_data['city'],
                     'date': processed_data['date'],
-                    'avg_temperature': processed_data['temperature']  # Use the processed temperature
+                    'avg_temperature': processed_data['temperature'],  # Use the processed temperature
+                    'dominant_condition': processed_data['weather_condition']
                 })
 
-                # Check for temperature alerts based on current temperature
-                check_temperature_alert(connection, processed_data['city'], processed_data['temperature'])
+                # Collect the current temperature for the alert check
+                alert_cities.append(processed_data['city'])
+                alert_temperatures.append(processed_data['temperature'])
+                readings[city] = processed_data['temperature']
+                wal_readings.append((processed_data['city'], processed_data['date'], processed_data['temperature'],
+                                     processed_data['weather_condition']))
 
                 # Collect daily summaries for this city
                 daily_summary = get_daily_summaries(processed_data['city'])
                 if daily_summary:
                     daily_summaries_dict[processed_data['city']] = daily_summary
 
+    # Log the cycle's readings first, so a restart can replay them exactly
+    now = time.time()
+    if state_snapshots is not None:
+        state_snapshots.log_cycle(wal_readings, now)
+
+    # Check the whole cycle's readings for temperature alerts and queue any that fire
+    for city, temperature, kind, alert_time in alert_engine.evaluate(alert_cities, alert_temperatures, now=now):
+        print(f"ALERT ({kind}): Temperature in {city} is {temperature}°C")
+        alert_writer.submit(city, temperature, alert_time, kind)
+    if state_snapshots is not None:
+        state_snapshots.maybe_snapshot(alert_engine)
+    else:
+        alert_engine.save_state(ALERT_STATE_FILE)
+    response_cache.save()
+    logging.info(f"Response cache stats: {response_cache.stats()}")
+    logging.info(f"API client stats: {resilient_client.stats()}")
+
+    # Write this cycle's summaries and alerts in a single transaction
+    write_buffer.flush()
+    logging.info(f"Database write stats: {write_buffer.stats()}")
+
     # Log the daily summaries collected for all cities
     for city, summary in daily_summaries_dict.items():
-        logging.info(f"Daily summary for {city}: {summary}")
+        logging.debug("Daily summary for %s: %s", city, summary)
 
-    # Plot temperature trends after fetching data for all cities
-    plot_temperature_trends(weather_summaries)
+    # Append this cycle's readings to the trends plot and re-render it
+    trend_renderer.update(weather_summaries)
+    render_plots(list(daily_summaries_dict.values()))
 
-if __name__ == "__main__":
+    prune_old_readings()
+    return readings
+
+def run_cycle(cities, refresh=()):
+    """
+    Runs `main` for the given cities, recording the cycle's duration and any overrun
+    of SLEEP_INTERVAL, and profiling it when slow-cycle profiling is configured.
+
+    Args:
+        cities (list of str): The cities to fetch in this cycle.
+        refresh (set of str): Cities fetched even if the response cache holds them.
+
+    Returns:
+        dict: The latest temperature for each city with a new reading this cycle.
+    """
+    profiler = (metrics.CycleProfiler(SLOW_CYCLE_PROFILE_THRESHOLD)
+                if SLOW_CYCLE_PROFILE_THRESHOLD else nullcontext())
+    start = time.perf_counter()
+    with profiler:
+        readings = main(cities, refresh)
+    metrics.record_cycle(time.perf_counter() - start, SLEEP_INTERVAL)
+    return readings
+
+def handle_worker_batch(batch):
+    """
+    Aggregates one result batch from a sharded worker process: updates daily
+    summaries, writes readings and alerts to the database and updates the plot.
+
+    Args:
+        batch (dict): The columns produced by `process_weather_batch`, plus the
+                      'alerts' the worker's alert engine triggered, the time it
+                      evaluated them at ('evaluated_at') and its 'alert_state'.
+    """
+    from app.data_processing import add_to_daily_summary, get_daily_summaries
+
+    conditions = batch['conditions']
+    weather_summaries = []
+    wal_readings = []
+    for city, temp, min_temp, max_temp, code in zip(batch['city'], batch['temperature'].tolist(),
+                                                    batch['min_temperature'].tolist(),
+                                                    batch['max_temperature'].tolist(),
+                                                    batch['condition_code'].tolist()):
+        condition = conditions.get(code)
+        add_to_daily_summary(city, {'temperature': temp, 'weather_condition': condition, 'date': batch['date']})
+        write_buffer.add_summary(city, batch['date'], temp, max_temp, min_temp, condition)
+        weather_summaries.append({'city': city, 'date': batch['date'], 'avg_temperature': temp,
+                                  'dominant_condition': condition})
+        wal_readings.append((city, batch['date'], temp, condition))
+
+    # Alerts are evaluated by the workers; their state is kept here so snapshots and restarts include it
+    alert_engine.import_state(batch['alert_state'])
+    if state_snapshots is not None:
+        state_snapshots.log_cycle(wal_readings, batch['evaluated_at'])
+        state_snapshots.maybe_snapshot(alert_engine)
+    else:
+        alert_engine.save_state(ALERT_STATE_FILE)
+
+    for city, temperature, kind, alert_time in batch['alerts']:
+        print(f"ALERT ({kind}): Temperature in {city} is {temperature}°C")
+        alert_writer.submit(city, temperature, alert_time, kind)
+
+    write_buffer.flush()
+    trend_renderer.update(weather_summaries)
+    render_plots([get_daily_summaries(city) for city in batch['city']] if REPORT_HTML_FILE else [])
+
+def run_loop(args):
+    """
+    Monitors the configured cities until interrupted (the `run` command).
+    """
+    # Expose per-stage latency metrics
+    metrics.set_enabled(METRICS_ENABLED)
+    if METRICS_ENABLED and METRICS_PORT:
+        try:
+            metrics.start_http_server(METRICS_PORT)
+            logging.info(f"Serving metrics on http://127.0.0.1:{METRICS_PORT}/metrics")
+        except OSError as e:
+            # Another instance (or service) holds the port; monitoring runs without the endpoint
+            logging.warning(f"Not serving metrics on port {METRICS_PORT}: {e}")
+    if METRICS_ENABLED and METRICS_SNAPSHOT_FILE:
+        metrics.start_json_snapshots(METRICS_SNAPSHOT_FILE, METRICS_SNAPSHOT_INTERVAL)
+
+    setup_pipeline()
     try:
-        while True:
-            main()  # Execute the main function
-            time.sleep(SLEEP_INTERVAL)  # Wait for the specified interval before the next update
+        if WORKER_PROCESSES > 1:
+            from app.workers import run_sharded
+
+            if ADAPTIVE_SCHEDULING:
+                logging.warning("Adaptive scheduling is off with worker processes; "
+                                f"every city is polled every {SLEEP_INTERVAL} seconds")
+            # Fetch, process and check alerts in worker processes; write and plot here
+            run_sharded(CITIES, API_KEY, handle_worker_batch, WORKER_PROCESSES, SLEEP_INTERVAL,
+                        max_workers=MAX_CONCURRENT_REQUESTS, timeout=REQUEST_TIMEOUT, rules=alert_engine,
+                        make_fetch=make_worker_fetch)
+        else:
+            from app.scheduler import AdaptiveScheduler
+
+            # Give each city its own polling schedule within the request rate budget
+            scheduler = AdaptiveScheduler(CITIES, base_interval=SLEEP_INTERVAL, min_interval=MIN_POLL_INTERVAL,
+                                          max_interval=MAX_POLL_INTERVAL, rate_budget=REQUEST_RATE_BUDGET,
+                                          adaptive=ADAPTIVE_SCHEDULING,
+                                          cities_per_request=GROUP_CHUNK_SIZE if USE_GROUP_ENDPOINT else 1)
+            while True:
+                due_cities = scheduler.due()
+                if due_cities:
+                    # Cities on the fast schedule (below SLEEP_INTERVAL) skip the response cache, whose
+                    # TTL would otherwise hand them the same cached payload until it expires
+                    fast = min(SLEEP_INTERVAL, CACHE_TTL)
+                    refresh = {city for city in due_cities if scheduler.intervals[city] < fast}
+                    readings = run_cycle(due_cities, refresh)  # Execute the main function for the cities that are due
+                    for city in due_cities:
+                        scheduler.record(city, readings.get(city))
+                # Sleep until the next city is due (never a fixed interval, so timing doesn't drift)
+                time.sleep(max(0.0, scheduler.next_wakeup() - time.monotonic()))
     except KeyboardInterrupt:
         logging.info("Stopping weather monitoring...")  # Gracefully handle script termination
     finally:
-        close_connection(connection)  # Close the database connection
+        shutdown()
+
+def fetch_once(args):
+    """
+    Fetches and prints the current weather for the given cities once (the `fetch`
+    command). Only the API client is loaded unless `--store` asks for the readings
+    to be written to the database as well.
+    """
+    from app.api_client import fetch_with_cache
+    from app.data_processing import process_weather_data
+
+    setup_fetching()
+    if args.store:
+        setup_storage()
+    resilient_client.start_cycle(FETCH_CYCLE_DEADLINE)
+
+    try:
+        for city, data in fetch_with_cache(args.cities or CITIES, response_cache, make_fetcher(args.base_url)):
+            processed_data = process_weather_data(data) if data else None
+            if not processed_data:
+                print(f"{city}: no data")
+                continue
+            processed_data['stale'] = bool(data.get('stale'))
+            if args.json:
+                print(json.dumps(processed_data))
+            else:
+                print(f"{city}: {processed_data['temperature']}°C, {processed_data['weather_condition']}"
+                      f"{' (stale)' if processed_data['stale'] else ''}")
+            if args.store and response_cache.is_new_reading(city, data):
+                write_buffer.add_summary(city, processed_data['date'], processed_data['temperature'],
+                                         processed_data['max_temperature'], processed_data['min_temperature'],
+                                         processed_data['weather_condition'])
+        response_cache.save()
+    finally:
+        shutdown()
+
+def ingest(args):
+    """
+    Reads the configured station feeds, the given files and (with `--api`) the
+    current API readings in parallel, merges them with duplicates resolved by
+    source priority and writes the result to the database, or prints it as NDJSON
+    with `--print` (the `ingest` command). Re-ingesting a file is safe: with
+    TIMESERIES_ENABLED, readings already stored for a (city, recorded_at) are
+    skipped along with their summaries and rollups.
+    """
+    import os
+    from app.sources import FileSource, OpenWeatherMapSource, ReadingMerger, merge_sources
+
+    sources = [FileSource(feed['pattern'], feed['name'], feed.get('priority', SOURCE_PRIORITIES.get(feed['name'], 0)),
+                          feed.get('columns')) for feed in FILE_SOURCES]
+    for path in args.files:
+        name = os.path.splitext(os.path.basename(path))[0]
+        sources.append(FileSource(path, name, SOURCE_PRIORITIES.get(name, 0)))
+    if args.api:
+        setup_fetching()
+        resilient_client.start_cycle(FETCH_CYCLE_DEADLINE)
+        sources.append(OpenWeatherMapSource(CITIES, make_fetcher(), priority=SOURCE_PRIORITIES.get('openweathermap', 0)))
+    if not sources:
+        print("No sources to ingest: pass files, --api or configure FILE_SOURCES.")
+        return
+
+    if not args.print:
+        setup_storage()
+    merger = ReadingMerger(SOURCE_PRIORITIES, resolution=MERGE_RESOLUTION, window=MERGE_WINDOW)
+    try:
+        for readings in merge_sources(sources, merger=merger):
+            for reading in readings:
+                reading_date = datetime.fromtimestamp(reading.timestamp).strftime('%Y-%m-%d %H:%M:%S')
+                if args.print:
+                    print(json.dumps(dict(reading._asdict(), date=reading_date)))
+                else:
+                    write_buffer.add_summary(reading.city, reading_date, reading.temperature, reading.max_temperature,
+                                             reading.min_temperature, reading.condition)
+    finally:
+        if not args.print:
+            shutdown()
+    logging.info(f"Merge stats: {merger.stats()}")
+
+def run_backfill(args):
+    """
+    Recomputes the daily summaries and alerts of a date range from the raw readings
+    in MySQL, or from archived files with `--files`, in parallel over date
+    partitions (the `backfill` command). Rerunning an interrupted backfill with
+    the same arguments resumes it.
+    """
+    from app.alerting import AlertEngine
+    from app.backfill import backfill
+    from app.database import create_connection, close_connection
+
+    start = datetime.strptime(args.start, '%Y-%m-%d')
+    end = datetime.strptime(args.end, '%Y-%m-%d') if args.end else datetime.now()
+    connection = create_connection()
+    if connection is None:
+        return
+    close_connection(connection)
+
+    def progress(result):
+        logging.info(f"Recomputed partition from {result['start']}: {result['readings']} readings, "
+                     f"{result['daily_summaries']} daily summaries")
+
+    try:
+        stats = backfill(start, end, create_connection, AlertEngine(high_thresholds=CITY_TEMP_THRESHOLDS),
+                         files=args.files, partition_days=args.partition_days, workers=args.workers,
+                         checkpoint_dir=BACKFILL_CHECKPOINT_DIR, progress=progress)
+    except ConnectionError as e:
+        print(f"Error during backfill: {e}; rerun to resume from the checkpoints")
+        return
+    print(f"Recomputed {stats['readings']} readings into {stats['daily_summaries']} daily summaries and "
+          f"{stats['alerts']} alerts in {stats['seconds']}s ({stats['partitions']} partitions, "
+          f"{stats['resumed_partitions']} resumed)")
+
+def load_history(cities, days, max_points):
+    """
+    Reads the last `days` days of stored readings for each city, from the MySQL
+    time-series tables (at the finest resolution that fits `max_points`) or from
+    the embedded store when STORAGE_BACKEND is 'local'.
+
+    Returns:
+        dict: City name to a list of rows with 'time', 'avg_temperature',
+              'min_temperature', 'max_temperature' and 'readings', oldest first.
+    """
+    end = datetime.now()
+    start = end - timedelta(days=days)
+    if use_mysql:
+        from app.database import create_connection, close_connection
+        from app.timeseries import query_range
+
+        connection = create_connection()
+        if connection is None:
+            return {}
+        try:
+            retention = {'raw': RAW_RETENTION_DAYS, 'hourly': HOURLY_RETENTION_DAYS}
+            return {city: query_range(connection, city, start, end, max_points, retention) for city in cities}
+        finally:
+            close_connection(connection)
+
+    from app.local_store import LocalStore
+
+    store = LocalStore(LOCAL_STORE_DIR)
+    try:
+        history = {}
+        for city in cities:
+            history[city] = [
+                {'time': datetime.fromtimestamp(timestamp), 'avg_temperature': temp, 'min_temperature': min_temp,
+                 'max_temperature': max_temp, 'readings': 1}
+                for columns in store.scan(start, end, city)
+                for timestamp, temp, min_temp, max_temp in zip(columns['timestamp'].tolist(),
+                                                                columns['temperature'].tolist(),
+                                                                columns['min_temperature'].tolist(),
+                                                                columns['max_temperature'].tolist())
+            ]
+        return history
+    finally:
+        store.close()
+
+def summarize(args):
+    """
+    Prints per-day average, minimum and maximum temperatures of stored readings (the `summarize` command).
+    """
+    for city, rows in load_history(args.cities or CITIES, args.days, max_points=args.days).items():
+        days = {}
+        for row in rows:
+            day = str(row['time'])[:10]
+            count, total, low, high = days.get(day, (0, 0.0, float('inf'), float('-inf')))
+            days[day] = (count + row['readings'], total + row['avg_temperature'] * row['readings'],
+                         min(low, row['min_temperature']), max(high, row['max_temperature']))
+        if not days:
+            print(f"{city}: no readings in the last {args.days} days")
+            continue
+        for day, (count, total, low, high) in sorted(days.items()):
+            print(f"{city} {day}: avg {total / count:.2f}°C, min {low:.2f}°C, max {high:.2f}°C ({count} readings)")
+
+def plot(args):
+    """
+    Plots the stored temperature history of the given cities to a PNG file (the `plot` command).
+    """
+    from app.visualization import TrendRenderer
+
+    history = load_history(args.cities or CITIES, args.days, max_points=1000)
+    renderer = TrendRenderer(filename=args.output, history_days=None)  # The query already limits the days
+    renderer.update([{'city': city, 'date': str(row['time']), 'avg_temperature': row['avg_temperature']}
+                     for city, rows in history.items() for row in rows])
+    plot_file = renderer.render()
+    print(f"Temperature trends plot saved as '{plot_file}'." if plot_file else "No readings to plot.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Real-time weather monitoring.")
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('run', help="monitor the configured cities continuously (the default)")
+
+    fetch = commands.add_parser('fetch', help="fetch and print the current weather once")
+    fetch.add_argument('cities', nargs='*', help="cities to fetch (default: the configured cities)")
+    fetch.add_argument('--json', action='store_true', help="print one JSON object per city")
+    fetch.add_argument('--store', action='store_true', help="also write the readings to the database")
+    fetch.add_argument('--base-url', default=None, help="weather API base URL, e.g. of a local stub server")
+
+    ingest_command = commands.add_parser('ingest', help="merge station feeds and API readings into storage")
+    ingest_command.add_argument('files', nargs='*', help="NDJSON or CSV files (or glob patterns) to ingest, "
+                                                         "named after the file for SOURCE_PRIORITIES")
+    ingest_command.add_argument('--api', action='store_true', help="also fetch the configured cities from the API")
+    ingest_command.add_argument('--print', action='store_true', help="print merged readings as NDJSON instead")
+
+    backfill_command = commands.add_parser('backfill', help="recompute daily summaries and alerts from raw readings")
+    backfill_command.add_argument('--start', required=True, help="first day to recompute (YYYY-MM-DD)")
+    backfill_command.add_argument('--end', default=None, help="day to stop before (YYYY-MM-DD, default: now)")
+    backfill_command.add_argument('--files', default=None, help="glob pattern of archived NDJSON or CSV files "
+                                                                 "to read instead of the database")
+    backfill_command.add_argument('--workers', type=int, default=BACKFILL_WORKERS, help="worker processes")
+    backfill_command.add_argument('--partition-days', type=int, default=BACKFILL_PARTITION_DAYS,
+                                  help="days recomputed per task")
+
+    for name, help_text in (('summarize', "print daily summaries of stored readings"),
+                            ('plot', "plot stored temperature trends to a PNG file")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('cities', nargs='*', help="cities to include (default: the configured cities)")
+        command.add_argument('--days', type=int, default=7, help="days of history to include")
+        if name == 'plot':
+            command.add_argument('--output', default=PLOT_FILENAME, help="PNG file to write")
+    return parser.parse_args(argv)
+
+COMMANDS = {'run': run_loop, 'fetch': fetch_once, 'ingest': ingest, 'backfill': run_backfill, 'summarize': summarize,
+            'plot': plot}
+
+def cli(argv=None):
+    """
+    Runs the command given on the command line (`run` if none is given).
+    """
+    args = parse_args(argv)
+    COMMANDS[args.command or 'run'](args)
+
+if __name__ == "__main__":
+    cli()
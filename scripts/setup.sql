@@ -1,25 +1,80 @@
--- Create the weather_db database
-CREATE DATABASE IF NOT EXISTS weather_db;
+-- Create the weather_monitoring database
+CREATE DATABASE IF NOT EXISTS weather_monitoring;
 
--- Use the weather_db database
-USE weather_db;
+-- Use the weather_monitoring database
+USE weather_monitoring;
 
--- Create a table to store daily weather summaries
+-- Create a table to store weather summaries (one row per processed reading)
 CREATE TABLE IF NOT EXISTS weather_summary (
     id INT AUTO_INCREMENT PRIMARY KEY,
     city VARCHAR(100),
-    date DATE,
-    avg_temp FLOAT,
-    max_temp FLOAT,
-    min_temp FLOAT,
-    dominant_condition VARCHAR(100),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    date DATETIME,
+    avg_temperature FLOAT,
+    max_temperature FLOAT,
+    min_temperature FLOAT,
+    weather_condition VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_summary_city_date (city, date)  -- Serves "latest summaries for a city" queries
 );
 
 -- Create a table to store weather alerts
+-- (databases created before the kind column: ALTER TABLE weather_alerts ADD COLUMN kind VARCHAR(10) NOT NULL DEFAULT 'high';)
 CREATE TABLE IF NOT EXISTS weather_alerts (
     id INT AUTO_INCREMENT PRIMARY KEY,
     city VARCHAR(100),
-    alert_message TEXT,
-    alert_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    temperature FLOAT,
+    alert_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    kind VARCHAR(10) NOT NULL DEFAULT 'high',  -- The rule that fired: 'high', 'low' or 'rate'
+    KEY idx_alerts_city_time (city, alert_time)
+);
+
+-- Create a table to store raw readings, keyed by (city, time) for index range scans.
+-- Partitioned by month (pYYYYMM) so expired months can be dropped instantly;
+-- app.timeseries.prune_retention adds upcoming months by splitting pmax.
+CREATE TABLE IF NOT EXISTS weather_readings (
+    city VARCHAR(100) NOT NULL,
+    recorded_at DATETIME NOT NULL,
+    temperature FLOAT,
+    max_temperature FLOAT,
+    min_temperature FLOAT,
+    weather_condition VARCHAR(100),
+    PRIMARY KEY (city, recorded_at),
+    KEY idx_readings_recorded_at (recorded_at)
+)
+PARTITION BY RANGE (TO_DAYS(recorded_at)) (
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- Create hourly and daily rollups, maintained incrementally as readings are inserted
+CREATE TABLE IF NOT EXISTS weather_hourly (
+    city VARCHAR(100) NOT NULL,
+    hour DATETIME NOT NULL,
+    readings INT NOT NULL,
+    temperature_sum DOUBLE NOT NULL,
+    min_temperature FLOAT,
+    max_temperature FLOAT,
+    PRIMARY KEY (city, hour)
+);
+
+CREATE TABLE IF NOT EXISTS weather_daily (
+    city VARCHAR(100) NOT NULL,
+    day DATE NOT NULL,
+    readings INT NOT NULL,
+    temperature_sum DOUBLE NOT NULL,
+    min_temperature FLOAT,
+    max_temperature FLOAT,
+    PRIMARY KEY (city, day)
+);
+
+-- Create a table of daily summaries recomputed from raw readings (see app.backfill)
+CREATE TABLE IF NOT EXISTS weather_daily_summary (
+    city VARCHAR(100) NOT NULL,
+    day DATE NOT NULL,
+    readings INT NOT NULL,
+    avg_temperature FLOAT,
+    min_temperature FLOAT,
+    max_temperature FLOAT,
+    temperature_variance FLOAT,
+    dominant_condition VARCHAR(100),
+    PRIMARY KEY (city, day)
 );
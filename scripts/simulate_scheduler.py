@@ -0,0 +1,113 @@
+# scripts/simulate_scheduler.py
+#
+# Runs the AdaptiveScheduler against a simulated clock and synthetic temperature
+# curves, and checks that it stays within the request rate budget while
+# detecting threshold crossings sooner than a fixed polling interval.
+# Run from the project root with: python -m scripts.simulate_scheduler [cities] [hours]
+
+import math
+import random
+import sys
+
+from app.scheduler import AdaptiveScheduler
+from config import TEMP_THRESHOLD, SLEEP_INTERVAL
+
+RATE_BUDGET = 2.0  # City fetches per simulated second
+TRUE_STEP = 10  # Resolution (seconds) used to find when each city really crosses the threshold
+
+class SimulatedClock:
+    """
+    Clock that only advances when the simulation moves it.
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_temperature_curves(city_count, rng):
+    # Daily sine curves; a third of the cities peak just above the threshold
+    curves = {}
+    for i in range(city_count):
+        base = TEMP_THRESHOLD - 4 if i % 3 == 0 else rng.uniform(15, 28)
+        amplitude = rng.uniform(3, 6)
+        phase = rng.uniform(0, 2 * math.pi)
+        curves[f"City{i}"] = (base, amplitude, phase)
+    return curves
+
+def temperature(curve, t):
+    base, amplitude, phase = curve
+    return base + amplitude * math.sin(2 * math.pi * t / 86400 + phase)
+
+def first_crossings(curves, duration):
+    # Start of every interval during which each city is above the threshold
+    crossings = {}
+    for city, curve in curves.items():
+        above = False
+        for t in range(0, int(duration), TRUE_STEP):
+            now_above = temperature(curve, t) > TEMP_THRESHOLD
+            if now_above and not above:
+                crossings.setdefault(city, []).append(t)
+            above = now_above
+    return crossings
+
+def simulate(curves, duration, adaptive):
+    clock = SimulatedClock()
+    scheduler = AdaptiveScheduler(list(curves), base_interval=SLEEP_INTERVAL, rate_budget=RATE_BUDGET,
+                                  adaptive=adaptive, clock=clock, rng=random.Random(1))
+    fetch_times = []
+    detections = {}  # city -> times at which a fetch saw the city above the threshold
+    while clock.now < duration:
+        for city in scheduler.due():
+            temp = temperature(curves[city], clock.now)
+            if temp > TEMP_THRESHOLD:
+                detections.setdefault(city, []).append(clock.now)
+            fetch_times.append(clock.now)
+            scheduler.record(city, temp)
+        clock.now = scheduler.next_wakeup()
+    return fetch_times, detections, scheduler
+
+def alert_latencies(crossings, detections):
+    latencies = []
+    for city, starts in crossings.items():
+        seen = detections.get(city, [])
+        for start in starts:
+            later = [t for t in seen if t >= start]
+            if later:
+                latencies.append(later[0] - start)
+    return latencies
+
+def peak_rate(fetch_times, window=60):
+    # Highest number of fetches in any sliding window, per second
+    peak, left = 0, 0
+    for right, t in enumerate(fetch_times):
+        while fetch_times[left] <= t - window:
+            left += 1
+        peak = max(peak, right - left + 1)
+    return peak / window
+
+def main():
+    city_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    hours = float(sys.argv[2]) if len(sys.argv) > 2 else 24
+    duration = hours * 3600
+    curves = make_temperature_curves(city_count, random.Random(0))
+    crossings = first_crossings(curves, duration)
+
+    print(f"{city_count} cities over {hours:g} simulated hours, budget {RATE_BUDGET} fetches/s")
+    print(f"{'mode':>9} {'fetches':>8} {'avg/s':>7} {'peak/s':>7} {'mean alert latency (s)':>23} "
+          f"{'max lag (s)':>12}")
+    for adaptive in (False, True):
+        fetch_times, detections, scheduler = simulate(curves, duration, adaptive)
+        latencies = alert_latencies(crossings, detections)
+        average = len(fetch_times) / duration
+        peak = peak_rate(fetch_times)
+        mean_latency = sum(latencies) / len(latencies) if latencies else float('nan')
+        print(f"{'adaptive' if adaptive else 'fixed':>9} {len(fetch_times):>8} {average:>7.2f} {peak:>7.2f} "
+              f"{mean_latency:>23.1f} {scheduler.max_lag:>12.1f}")
+
+        # The token bucket allows one minute of burst on top of the sustained budget
+        assert len(fetch_times) <= RATE_BUDGET * (duration + 60), "sustained fetch rate exceeded the budget"
+        assert peak <= RATE_BUDGET * 2, "fetch rate over a one-minute window exceeded the burst allowance"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# scripts/stub_server.py
+#
+# Local stand-in for the OpenWeatherMap API used by the benchmarks. Run it on its own
+# from the project root with:
+# python -m scripts.stub_server [--latency S] [--error-rate R] [--throttle-rate R] [--cities N]
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+def city_id_for(city):
+    """
+    Returns the stable numeric ID the stub server assigns to a city name.
+    """
+    return zlib.crc32(city.encode()) % 10_000_000
+
+def stub_city_names(count):
+    """
+    Returns the names of the `count` cities in the stub server's catalogue.
+    """
+    return [f"City{i}" for i in range(count)]
+
+def make_weather_payload(city, temp=None, dt=None):
+    """
+    Builds a realistic OpenWeatherMap `/data/2.5/weather` payload for a city.
+    Values are derived from the city name so repeated calls are deterministic.
+
+    Args:
+        city (str): The name of the city.
+        temp (float, optional): The temperature to report instead of the derived one.
+        dt (int, optional): The observation time as a Unix timestamp; defaults to the
+                            current time rounded down to OpenWeatherMap's 10-minute updates.
+
+    Returns:
+        dict: The weather payload in the same shape as the real API response.
+    """
+    seed = zlib.crc32(city.encode())
+    if temp is None:
+        temp = 20 + (seed % 2000) / 100.0  # 20.00 - 39.99 °C
+    return {
+        'id': city_id_for(city),
+        'name': city,
+        'dt': int(time.time()) // 600 * 600 if dt is None else dt,
+        'weather': [{'id': 800, 'main': 'Clear', 'description': 'clear sky', 'icon': '01d'}],
+        'main': {
+            'temp': temp,
+            'feels_like': temp + 1.5,
+            'temp_min': temp - 1.25,
+            'temp_max': temp + 1.25,
+            'pressure': 1010,
+            'humidity': 40 + seed % 50,
+        },
+        'wind': {'speed': 3.6, 'deg': 270},
+        'cod': 200,
+    }
+
+class StubWeatherHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving `/data/2.5/weather?q={city}` and
+    `/data/2.5/group?id={id,...}` with stub payloads.
+
+    A fraction `error_rate` of requests fails with 503, and a fraction
+    `throttle_rate` is refused with 429 and a `Retry-After` header, as the real
+    API does under load. When the server has a city catalogue, unknown cities get 404.
+    """
+    protocol_version = "HTTP/1.1"  # Keep connections alive between requests
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        with self.server.lock:
+            self.server.request_count += 1
+            roll = self.server.rng.random()
+            failed = roll < self.server.error_rate
+            throttled = not failed and roll < self.server.error_rate + self.server.throttle_rate
+
+        # Simulate the round-trip latency of the real API
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if failed:
+            with self.server.lock:
+                self.server.error_count += 1
+            self._send_json(503, {'cod': 503, 'message': 'service unavailable'})
+        elif throttled:
+            with self.server.lock:
+                self.server.error_count += 1
+            self._send_json(429, {'cod': 429, 'message': 'rate limit exceeded'},
+                            {'Retry-After': str(self.server.retry_after)})
+        elif url.path == '/data/2.5/weather' and 'q' in query:
+            city = query['q'][0]
+            if self.server.known_cities is not None and city not in self.server.known_cities:
+                self._send_json(404, {'cod': '404', 'message': 'city not found'})
+                return
+            self.server.cities_by_id[city_id_for(city)] = city  # Remember names for group lookups
+            self._send_json(200, make_weather_payload(city))
+        elif url.path == '/data/2.5/group' and 'id' in query:
+            ids = [int(city_id) for city_id in query['id'][0].split(',')]
+            payloads = [make_weather_payload(self.server.cities_by_id[city_id])
+                        for city_id in ids if city_id in self.server.cities_by_id]
+            self._send_json(200, {'cnt': len(payloads), 'list': payloads})
+        else:
+            self._send_json(404, {'cod': '404', 'message': 'city not found'})
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output quiet
+
+def start_stub_server(latency=0.05, host='127.0.0.1', port=0, error_rate=0.0, city_count=None, seed=0,
+                      throttle_rate=0.0, retry_after=1):
+    """
+    Starts the stub weather server in a background thread.
+
+    Args:
+        latency (float): Artificial delay added to each response, in seconds.
+        host (str): The interface to bind to.
+        port (int): The port to bind to (0 picks a free port).
+        error_rate (float): The fraction of requests that fail with 503.
+        city_count (int, optional): Serve only the cities of `stub_city_names(city_count)`
+                                    and answer 404 for others (any name is served if None).
+        seed (int): Seed for the error injection, so runs are reproducible.
+        throttle_rate (float): The fraction of requests refused with 429.
+        retry_after (float): The `Retry-After` seconds sent with 429 responses.
+
+    Returns:
+        tuple: (server, base_url) where base_url can be passed to the API client.
+    """
+    server = ThreadingHTTPServer((host, port), StubWeatherHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.error_rate = error_rate
+    server.throttle_rate = throttle_rate
+    server.retry_after = retry_after
+    server.rng = random.Random(seed)
+    server.request_count = 0
+    server.error_count = 0
+    server.known_cities = None
+    server.cities_by_id = {}
+    if city_count is not None:
+        server.known_cities = set(stub_city_names(city_count))
+        server.cities_by_id = {city_id_for(city): city for city in server.known_cities}
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}/data/2.5"
+    return server, base_url
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve stub OpenWeatherMap responses.")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds added to each response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests failing with 503")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="fraction of requests refused with 429")
+    parser.add_argument('--cities', type=int, default=None, help="serve only City0..City{N-1}")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.latency, port=args.port, error_rate=args.error_rate,
+                                         city_count=args.cities, throttle_rate=args.throttle_rate)
+    print(f"Stub weather server listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
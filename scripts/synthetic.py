@@ -0,0 +1,140 @@
+# scripts/synthetic.py
+#
+# Synthetic load for the benchmarks: multi-day temperature series for many cities,
+# the API payloads and processed readings built from them, and an in-process
+# SQLite database standing in for MySQL.
+
+import itertools
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.timeseries import SQLITE_SCHEMA
+from scripts.stub_server import make_weather_payload, stub_city_names
+
+CONDITIONS = ['clear sky', 'few clouds', 'scattered clouds', 'haze', 'light rain', 'thunderstorm']
+
+SUMMARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS weather_summary (city TEXT, date TEXT, avg_temperature REAL, max_temperature REAL,
+                                            min_temperature REAL, weather_condition TEXT);
+CREATE TABLE IF NOT EXISTS weather_alerts (city TEXT, temperature REAL, alert_time TEXT, kind TEXT);
+"""
+
+def generate_series(city_count, days, interval=300, start=datetime(2024, 6, 1), seed=0):
+    """
+    Generates realistic temperature series: a per-city climate, a daily cycle
+    peaking mid-afternoon, slowly wandering weather (an AR(1) process) and
+    occasional multi-hour heat spikes that push cities over alert thresholds.
+
+    Args:
+        city_count (int): The number of cities.
+        days (int): The number of days to cover.
+        interval (int): Seconds between readings.
+        start (datetime): The time of the first reading.
+        seed (int): Random seed, so the same arguments always give the same series.
+
+    Returns:
+        dict: 'cities' (list of str), 'times' (list of datetime), 'temperature'
+              (float array shaped (times, cities)) and 'condition' (int array of
+              indexes into CONDITIONS, same shape).
+    """
+    rng = np.random.default_rng(seed)
+    ticks = days * 86400 // interval
+    seconds = np.arange(ticks) * interval
+
+    climate = rng.uniform(5, 32, city_count)
+    amplitude = rng.uniform(3, 8, city_count)
+    hour = (seconds % 86400) / 3600.0
+    diurnal = np.sin((hour - 9) / 24 * 2 * np.pi)[:, None] * amplitude
+
+    # AR(1) weather drift: each step keeps most of the previous anomaly
+    weather = np.empty((ticks, city_count))
+    anomaly = np.zeros(city_count)
+    shocks = rng.normal(0, 0.15, (ticks, city_count))
+    for tick in range(ticks):
+        anomaly = 0.995 * anomaly + shocks[tick]
+        weather[tick] = anomaly
+
+    # Heat spikes of a few hours in roughly one city-day in twenty
+    spikes = np.zeros((ticks, city_count))
+    spike_count = max(1, city_count * days // 20)
+    spike_starts = rng.integers(0, ticks, spike_count)
+    spike_cities = rng.integers(0, city_count, spike_count)
+    spike_length = max(1, 3 * 3600 // interval)
+    for first, city in zip(spike_starts, spike_cities):
+        spikes[first:first + spike_length, city] += rng.uniform(6, 12)
+
+    temperature = np.round(climate + diurnal + weather + spikes, 2)
+    condition = np.clip((weather / 1.5 + 2).astype(int), 0, len(CONDITIONS) - 1)
+    return {
+        'cities': stub_city_names(city_count),
+        'times': [start + timedelta(seconds=int(offset)) for offset in seconds],
+        'temperature': temperature,
+        'condition': condition,
+    }
+
+def iter_payloads(series):
+    """
+    Yields the OpenWeatherMap payloads for each tick of a series.
+
+    Yields:
+        list of dict: One payload per city for each reading time, oldest first.
+    """
+    cities = series['cities']
+    for time, temps, conditions in zip(series['times'], series['temperature'].tolist(),
+                                       series['condition'].tolist()):
+        dt = int(time.timestamp())
+        payloads = []
+        for city, temp, condition in zip(cities, temps, conditions):
+            payload = make_weather_payload(city, temp=temp, dt=dt)
+            payload['weather'][0]['description'] = CONDITIONS[condition]
+            payloads.append(payload)
+        yield payloads
+
+def iter_readings(series):
+    """
+    Yields processed readings (the dicts `process_weather_data` returns) for each
+    tick of a series, dated with the series time rather than the current time.
+
+    Yields:
+        list of dict: One reading per city for each reading time, oldest first.
+    """
+    cities = series['cities']
+    for time, temps, conditions in zip(series['times'], series['temperature'].tolist(),
+                                       series['condition'].tolist()):
+        date = time.strftime('%Y-%m-%d %H:%M:%S')
+        yield [{'city': city, 'temperature': temp, 'min_temperature': temp - 1.0,
+                'max_temperature': temp + 1.0, 'weather_condition': CONDITIONS[condition], 'date': date}
+               for city, temp, condition in zip(cities, temps, conditions)]
+
+class StubDatabase:
+    """
+    In-process SQLite database with the MySQL schema, standing in for the MySQL
+    server. Every connection opened with `connect` shares the same in-memory
+    database, so it can be handed to `WriteBuffer` like a connection pool.
+    """
+    _names = itertools.count()
+
+    def __init__(self):
+        self.uri = f"file:weather_bench_{next(self._names)}?mode=memory&cache=shared"
+        self._anchor = self.connect()  # The shared database lives while one connection is open
+        self._anchor.executescript(SUMMARY_SCHEMA + SQLITE_SCHEMA)
+
+    def connect(self):
+        """
+        Opens a new connection to the shared database.
+        """
+        return sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+
+    def count(self, table):
+        """
+        Returns the number of rows in a table.
+        """
+        return self._anchor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def close(self):
+        """
+        Closes the anchor connection, discarding the database.
+        """
+        self._anchor.close()
@@ -0,0 +1,31 @@
+# tests/conftest.py
+#
+# Shared fixtures: an on-disk SQLite database standing in for MySQL, with the
+# tables the pipeline writes to.
+
+import sqlite3
+from functools import partial
+
+import pytest
+
+from app.backfill import SQLITE_SCHEMA as BACKFILL_SCHEMA
+from app.timeseries import SQLITE_SCHEMA
+from scripts.synthetic import SUMMARY_SCHEMA
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    Returns a `connect` callable for a fresh SQLite database with the weather tables.
+    """
+    path = str(tmp_path / 'weather.db')
+    connection = sqlite3.connect(path)
+    connection.executescript(SUMMARY_SCHEMA + SQLITE_SCHEMA + BACKFILL_SCHEMA)
+    connection.close()
+    return partial(sqlite3.connect, path)
+
+def fetch_rows(connect, query):
+    connection = connect()
+    try:
+        return connection.execute(query).fetchall()
+    finally:
+        connection.close()
@@ -0,0 +1,54 @@
+# tests/test_alerting.py
+#
+# Alert rules of app.alerting.AlertEngine: streaks, the hysteresis band,
+# cooldowns and per-city overrides.
+# Run from the project root with: python -m pytest
+
+from app.alerting import AlertEngine
+
+def make_engine(**options):
+    rules = dict(high_threshold=35.0, low_threshold=0.0, rate_threshold=100.0, consecutive=2, hysteresis=1.0,
+                 cooldown=0)
+    rules.update(options)
+    return AlertEngine(**rules)
+
+def run(engine, temperatures, city='Delhi', start=0):
+    # One reading per cycle, an hour apart; returns the kinds fired per cycle
+    return [[kind for _, _, kind, _ in engine.evaluate([city], [temp], now=start + i * 3600)]
+            for i, temp in enumerate(temperatures)]
+
+def test_high_alert_needs_consecutive_breaches():
+    assert run(make_engine(), [36, 34, 36, 36, 37]) == [[], [], [], ['high'], ['high']]
+
+def test_low_alert_needs_consecutive_breaches():
+    assert run(make_engine(), [-1, -2, 1.5, -1]) == [[], ['low'], [], []]
+
+def test_readings_inside_the_band_hold_the_streak_but_never_fire():
+    # 34.5 and 34.2 are below the threshold but within the 1-degree band: no alerts, streak kept
+    assert run(make_engine(), [36, 36, 34.5, 34.2, 36]) == [[], ['high'], [], [], ['high']]
+    # Leaving the band resets the streak
+    assert run(make_engine(), [36, 36, 33.9, 36, 36]) == [[], ['high'], [], [], ['high']]
+    assert run(make_engine(), [36, 33.9, 36]) == [[], [], []]
+
+def test_cooldown_limits_alerts_per_city_and_kind():
+    engine = make_engine(cooldown=3 * 3600)
+    assert run(engine, [36, 36, 36, 36, 36, 36]) == [[], ['high'], [], [], ['high'], []]
+
+def test_per_city_overrides():
+    engine = make_engine(high_thresholds={'Chennai': 40.0}, low_thresholds={'Chennai': 20.0})
+    fired = [engine.evaluate(['Delhi', 'Chennai'], [38, 38], now=hour * 3600) for hour in range(2)]
+    assert [(city, kind) for city, _, kind, _ in fired[1]] == [('Delhi', 'high')]
+
+    engine = make_engine(low_thresholds={'Chennai': 20.0})
+    run(engine, [15], city='Chennai')
+    assert run(engine, [15], city='Chennai', start=3600) == [['low']]
+
+def test_state_round_trip_keeps_streaks_and_cooldowns():
+    engine = make_engine(cooldown=10 * 3600)
+    run(engine, [36, 36])
+    restored = make_engine(cooldown=10 * 3600)
+    restored.import_state(engine.export_state())
+    assert run(restored, [36], start=2 * 3600) == [[]]  # Still cooling down
+    restored = make_engine()
+    restored.import_state(engine.export_state())
+    assert run(restored, [36], start=2 * 3600) == [['high']]  # Streak carried over
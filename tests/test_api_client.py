@@ -0,0 +1,97 @@
+# tests/test_api_client.py
+#
+# Batched fetching through the group endpoint with app.api_client, against the local stub server,
+# and the response cache in front of it.
+# Run from the project root with: python -m pytest
+
+import json
+import time
+
+import pytest
+
+from app.api_client import ResponseCache, fetch_all_weather_data_batched, fetch_with_cache, load_city_ids
+from scripts.stub_server import city_id_for, start_stub_server
+
+@pytest.fixture
+def stub():
+    server, base_url = start_stub_server(latency=0)
+    yield server, base_url
+    server.shutdown()
+
+def test_ids_missing_from_group_responses_are_resolved_again(stub, tmp_path):
+    server, base_url = stub
+    cache_path = str(tmp_path / 'city_ids.json')
+    with open(cache_path, 'w') as f:
+        json.dump({'City0': 12345, 'City1': city_id_for('City1')}, f)  # City0's ID is out of date
+
+    def fetch():
+        return dict(fetch_all_weather_data_batched(['City0', 'City1'], 'stub', cache_path, base_url=base_url))
+
+    # The stub knows no IDs yet, so the group response comes back empty and both IDs are dropped
+    assert fetch() == {'City0': None, 'City1': None}
+    assert load_city_ids(cache_path) == {}
+
+    # Both are resolved by name, then fetched through the group endpoint
+    assert all(data['name'] == city for city, data in fetch().items())
+    assert load_city_ids(cache_path) == {'City0': city_id_for('City0'), 'City1': city_id_for('City1')}
+    requests = server.request_count
+    assert all(data['name'] == city for city, data in fetch().items())
+    assert server.request_count == requests + 1  # One group request
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    return now
+
+def payload(city, dt=100):
+    return {'name': city, 'dt': dt}
+
+def test_cached_payloads_expire_after_the_ttl(clock):
+    cache = ResponseCache(ttl=60)
+    cache.put('Delhi', payload('Delhi'))
+    clock[0] += 59
+    assert cache.get('Delhi') == payload('Delhi')
+    clock[0] += 2
+    assert cache.get('Delhi') is None
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'unchanged': 0, 'entries': 0}  # The expired entry is dropped
+
+def test_least_recently_used_payload_is_evicted(clock):
+    cache = ResponseCache(max_entries=2)
+    cache.put('Delhi', payload('Delhi'))
+    cache.put('Mumbai', payload('Mumbai'))
+    cache.get('Delhi')  # Mumbai is now the least recently used
+    cache.put('Pune', payload('Pune'))
+    assert list(cache.entries) == ['Delhi', 'Pune']
+    assert cache.get('Mumbai') is None
+
+def test_unchanged_observation_time_is_not_a_new_reading():
+    cache = ResponseCache()
+    assert cache.is_new_reading('Delhi', payload('Delhi', dt=100))
+    assert not cache.is_new_reading('Delhi', payload('Delhi', dt=100))
+    assert not cache.is_new_reading('Delhi', payload('Delhi', dt=90))  # Older than the last reading
+    assert cache.is_new_reading('Delhi', payload('Delhi', dt=200))
+    assert cache.is_new_reading('Mumbai', payload('Mumbai', dt=100))  # Tracked per city
+    assert cache.is_new_reading('Delhi', {'name': 'Delhi'})  # No observation time
+    assert cache.stats()['unchanged'] == 2
+
+def test_fetch_with_cache_only_fetches_uncached_and_refreshed_cities(clock):
+    cache = ResponseCache(ttl=60)
+    fetched = []
+
+    def fetch(cities):
+        fetched.append(list(cities))
+        return [(city, None if city == 'Pune' else payload(city)) for city in cities]
+
+    cities = ['Delhi', 'Mumbai', 'Pune']
+    assert dict(fetch_with_cache(cities, cache, fetch)) == {
+        'Delhi': payload('Delhi'), 'Mumbai': payload('Mumbai'), 'Pune': None}
+    assert dict(fetch_with_cache(cities, cache, fetch, refresh={'Mumbai'}))['Mumbai'] == payload('Mumbai')
+    assert fetched == [cities, ['Mumbai', 'Pune']]  # Failed fetches are never cached
+    assert cache.stats() == {'hits': 1, 'misses': 4, 'unchanged': 0, 'entries': 2}
+
+def test_stale_fallbacks_are_not_cached(clock):
+    cache = ResponseCache()
+    stale = {**payload('Delhi'), 'stale': True}
+    assert list(fetch_with_cache(['Delhi'], cache, lambda cities: [('Delhi', stale)])) == [('Delhi', stale)]
+    assert cache.get('Delhi') is None
@@ -0,0 +1,62 @@
+# tests/test_backfill.py
+#
+# Recomputing summaries and alerts from archived files with app.backfill.
+# Run from the project root with: python -m pytest
+
+import json
+from datetime import datetime
+
+import pytest
+
+from app.alerting import AlertEngine
+from app.backfill import backfill
+from conftest import fetch_rows
+
+START = datetime(2024, 6, 1)
+END = datetime(2024, 6, 3)
+
+def write_archive(path, city, temperatures):
+    # One reading every 5 minutes from START
+    start = START.timestamp()
+    path.write_text(''.join(json.dumps({'city': city, 'timestamp': start + i * 300, 'temperature': temp,
+                                        'condition': 'clear'}) + '\n'
+                            for i, temp in enumerate(temperatures)))
+
+def test_backfill_replaces_only_the_archived_cities_alerts(database, tmp_path):
+    connection = database()
+    connection.executemany("INSERT INTO weather_alerts (city, temperature, alert_time, kind) VALUES (?, ?, ?, ?)",
+                           [('Delhi', 50.0, '2024-06-01 09:00:00', 'high'),  # Stale, recomputed away
+                            ('Mumbai', 41.0, '2024-06-01 10:00:00', 'high')])  # Not in the archive
+    connection.commit()
+    connection.close()
+    write_archive(tmp_path / 'delhi.ndjson', 'Delhi', [30.0] * 5 + [45.0] * 5)
+
+    result = backfill(START, END, database, AlertEngine(high_threshold=40.0, consecutive=3), dialect='sqlite',
+                      files=str(tmp_path / '*.ndjson'), partition_days=1, checkpoint_dir=str(tmp_path / 'checkpoints'))
+
+    alerts = fetch_rows(database, "SELECT city, alert_time, kind FROM weather_alerts ORDER BY city, alert_time")
+    assert result['alerts'] == len([alert for alert in alerts if alert[0] == 'Delhi']) > 0
+    assert ('Delhi', '2024-06-01 09:00:00', 'high') not in alerts
+    assert ('Mumbai', '2024-06-01 10:00:00', 'high') in alerts
+
+def test_backfill_reports_a_failed_connection(tmp_path):
+    write_archive(tmp_path / 'delhi.ndjson', 'Delhi', [30.0] * 5)
+    with pytest.raises(ConnectionError, match='Could not connect'):
+        backfill(START, END, lambda: None, AlertEngine(), dialect='sqlite', files=str(tmp_path / '*.ndjson'),
+                 partition_days=1, checkpoint_dir=str(tmp_path / 'checkpoints'))
+
+def test_backfill_matches_the_live_engine_inside_the_hysteresis_band(database, tmp_path):
+    temperatures = [36.0, 36.0, 34.5, 34.2, 36.0, 33.0, 36.0, 36.0]
+    write_archive(tmp_path / 'delhi.ndjson', 'Delhi', temperatures)
+    make_rules = lambda: AlertEngine(high_threshold=35.0, consecutive=2, hysteresis=1.0, cooldown=0,
+                                     rate_threshold=100.0)
+
+    backfill(START, END, database, make_rules(), dialect='sqlite', files=str(tmp_path / '*.ndjson'),
+             partition_days=1, checkpoint_dir=str(tmp_path / 'checkpoints'))
+
+    live = make_rules()
+    expected = [alert for i, temp in enumerate(temperatures)
+                for alert in live.evaluate(['Delhi'], [temp], now=START.timestamp() + i * 300)]
+    stored = fetch_rows(database, "SELECT city, temperature, kind, alert_time FROM weather_alerts ORDER BY alert_time")
+    assert stored == expected
+    assert [temperature for _, temperature, _, _ in stored] == [36.0, 36.0, 36.0]
@@ -0,0 +1,37 @@
+# tests/test_data_processing.py
+#
+# Run from the project root with: python -m pytest
+
+from app.data_processing import process_weather_batch
+
+def make_payload(name, temp=20.0, city_id=1, condition_id=800):
+    return {'name': name, 'id': city_id, 'main': {'temp': temp, 'temp_min': 10.0, 'temp_max': 35.0},
+            'weather': [{'id': condition_id, 'description': 'clear sky'}]}
+
+def test_batch_extracts_columns():
+    batch = process_weather_batch([make_payload('Delhi', 30.123), make_payload('Mumbai', 28.0, city_id=2)],
+                                  threshold=29.0, timestamp='2024-06-01 12:00:00')
+    assert batch['city'] == ['Delhi', 'Mumbai']
+    assert batch['temperature'].tolist() == [30.12, 28.0]
+    assert batch['above_threshold'].tolist() == [True, False]
+    assert batch['conditions'] == {800: 'clear sky'}
+    assert batch['date'] == '2024-06-01 12:00:00'
+
+def test_batch_drops_malformed_payloads():
+    payloads = [
+        make_payload('Delhi'),
+        make_payload('Text', temp='n/a'),  # ValueError when building the float column
+        make_payload('Overflow', condition_id=10 ** 6),  # Does not fit the int16 condition column
+        make_payload('Flag', temp=True),
+        {'name': 'Missing'},
+    ]
+    batch = process_weather_batch(payloads)
+    assert batch['city'] == ['Delhi']
+    assert len(batch['temperature']) == 1
+
+def test_batch_drops_a_numeric_string_or_boolean_on_its_own():
+    # Each is the only bad payload, so nothing forces a conversion error
+    for bad in (make_payload('Text', temp='31'), make_payload('Flag', temp=True),
+                make_payload('Id', city_id='7'), make_payload('Code', condition_id=True)):
+        batch = process_weather_batch([make_payload('Delhi'), bad])
+        assert batch['city'] == ['Delhi'], bad['name']
@@ -0,0 +1,178 @@
+# tests/test_database.py
+#
+# WriteBuffer against an on-disk SQLite database.
+# Run from the project root with: python -m pytest
+
+import time
+
+import pytest
+
+from app.database import WriteBuffer, get_pooled_connection
+from app.local_store import LocalStore
+from app.timeseries import KEY_QUERY_CHUNK, new_readings, write_readings
+from conftest import fetch_rows
+
+def make_buffer(connect, **options):
+    return WriteBuffer(connect, flush_interval=0, paramstyle='qmark', timeseries=True, **options)
+
+def test_duplicate_readings_do_not_poison_the_batch(database, tmp_path):
+    store = LocalStore(str(tmp_path / 'store'))
+    buffer = make_buffer(database, local_store=store)
+    buffer.add_summary('Delhi', '2024-06-01 12:00:00', 30.0, 31.0, 29.0, 'clear sky')
+    buffer.add_summary('Delhi', '2024-06-01 12:00:00', 30.0, 31.0, 29.0, 'clear sky')  # Same (city, time)
+    buffer.add_summary('Mumbai', '2024-06-01 12:00:00', 28.0, 29.0, 27.0, 'haze')
+    assert buffer.flush() == 2
+
+    # A reading stored by an earlier flush is skipped too
+    buffer.add_summary('Mumbai', '2024-06-01 12:00:00', 28.0, 29.0, 27.0, 'haze')
+    buffer.add_summary('Mumbai', '2024-06-01 12:10:00', 29.0, 30.0, 28.0, 'haze')
+    buffer.close()
+
+    assert store.pending_rows() == 0
+    stats = buffer.stats()
+    assert (stats['rows_written'], stats['rows_skipped'], stats['rows_spilled']) == (3, 2, 0)
+    store.close()
+    assert fetch_rows(database, "SELECT city, recorded_at FROM weather_readings ORDER BY city, recorded_at") == [
+        ('Delhi', '2024-06-01 12:00:00'), ('Mumbai', '2024-06-01 12:00:00'), ('Mumbai', '2024-06-01 12:10:00')]
+    assert len(fetch_rows(database, "SELECT * FROM weather_summary")) == 3
+    # Rollups count each reading once
+    assert fetch_rows(database, "SELECT city, readings, temperature_sum FROM weather_daily ORDER BY city") == [
+        ('Delhi', 1, 30.0), ('Mumbai', 2, 57.0)]
+    assert fetch_rows(database, "SELECT city, readings FROM weather_hourly ORDER BY city") == [
+        ('Delhi', 1), ('Mumbai', 2)]
+
+def test_new_readings_only_looks_up_the_batch_cities(database):
+    connection = database()
+    cursor = connection.cursor()
+    stored = [(f'City {i}', '2024-06-01 12:00:00', 30.0, 31.0, 29.0, 'clear sky') for i in range(KEY_QUERY_CHUNK + 10)]
+    write_readings(cursor, stored, 'sqlite')
+
+    fetched = []
+    class CountingCursor:
+        def execute(self, query, params):
+            cursor.execute(query, params)
+        def fetchall(self):
+            rows = cursor.fetchall()
+            fetched.extend(rows)
+            return rows
+
+    # Two of the stored cities, each with a stored and a new reading; other cities' keys are not fetched
+    batch = [(city, time, 30.0, 31.0, 29.0, 'clear sky') for city in ('City 0', f'City {KEY_QUERY_CHUNK + 5}')
+             for time in ('2024-06-01 12:00:00', '2024-06-01 12:10:00')]
+    assert new_readings(CountingCursor(), batch, 'sqlite') == [batch[1], batch[3]]
+    assert sorted(fetched) == [('City 0', '2024-06-01 12:00:00'), (f'City {KEY_QUERY_CHUNK + 5}', '2024-06-01 12:00:00')]
+    connection.close()
+
+def test_rejected_rows_do_not_hold_back_valid_ones(database):
+    connection = database()
+    connection.execute("CREATE TABLE strict_summary (city TEXT NOT NULL, date TEXT, avg_temperature REAL, "
+                       "max_temperature REAL, min_temperature REAL, weather_condition TEXT)")
+    connection.close()
+    buffer = WriteBuffer(database, flush_interval=0, paramstyle='qmark')
+    buffer.summary_query = buffer.summary_query.replace('weather_summary', 'strict_summary')
+    buffer.add_summary(None, '2024-06-01 12:00:00', 30.0, 31.0, 29.0, 'clear sky')  # Violates NOT NULL
+    buffer.add_summary('Mumbai', '2024-06-01 12:00:00', 28.0, 29.0, 27.0, 'haze')
+    buffer.add_alert('Mumbai', 28.0, '2024-06-01 12:00:00', 'rate')
+    assert buffer.flush() == 2
+    assert buffer.stats()['rows_rejected'] == 1
+    assert fetch_rows(database, "SELECT city FROM strict_summary") == [('Mumbai',)]
+    assert fetch_rows(database, "SELECT city, kind FROM weather_alerts") == [('Mumbai', 'rate')]
+
+def test_buffer_is_capped_without_a_local_store():
+    buffer = WriteBuffer(lambda: None, max_rows=1000, flush_interval=0, paramstyle='qmark', max_buffered_rows=5)
+    for minute in range(8):
+        buffer.add_summary('Delhi', f'2024-06-01 12:{minute:02d}:00', 30.0, 31.0, 29.0, 'clear sky')
+    buffer.add_alert('Delhi', 30.0, '2024-06-01 12:07:00', 'high')
+    assert buffer.flush() == 0  # No database: the rows stay buffered, the oldest readings are dropped
+    assert buffer.stats()['rows_dropped'] == 4
+    assert [row[1] for row in buffer.summaries] == [f'2024-06-01 12:{minute:02d}:00' for minute in range(4, 8)]
+    assert len(buffer.alerts) == 1
+
+class FlakyConnect:
+    """
+    Hands out SQLite connections, the first `failures` of them already closed,
+    so every statement on them fails like a connection the server dropped.
+    """
+
+    def __init__(self, connect, failures):
+        self.connect = connect
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        connection = self.connect()
+        if self.calls <= self.failures:
+            connection.close()
+        return connection
+
+def test_flush_writes_buffered_rows_in_one_batch(database):
+    buffer = make_buffer(database, max_rows=3)
+    buffer.add_summary('Delhi', '2024-06-01 12:00:00', 30.0, 31.0, 29.0, 'clear sky')
+    buffer.add_alert('Delhi', 30.0, '2024-06-01 12:00:00', 'high')
+    assert fetch_rows(database, "SELECT COUNT(*) FROM weather_summary") == [(0,)]
+    buffer.add_summary('Mumbai', '2024-06-01 12:00:00', 28.0, 29.0, 27.0, 'haze')  # Reaches max_rows
+    assert fetch_rows(database, "SELECT COUNT(*) FROM weather_summary") == [(2,)]
+    assert fetch_rows(database, "SELECT COUNT(*) FROM weather_alerts") == [(1,)]
+    assert buffer.flush() == 0  # Nothing left to write
+    stats = buffer.stats()
+    assert stats['rows_written'] == 3 and stats['flushes'] == 1
+    buffer.close()
+
+def test_timer_flushes_in_the_background(database):
+    buffer = WriteBuffer(lambda: database(check_same_thread=False), flush_interval=0.05, paramstyle='qmark')
+    buffer.add_summary('Delhi', '2024-06-01 12:00:00', 30.0, 31.0, 29.0, 'clear sky')
+    deadline = time.monotonic() + 5
+    while buffer.stats()['flushes'] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    buffer.close()
+    assert fetch_rows(database, "SELECT COUNT(*) FROM weather_summary") == [(1,)]
+
+def test_flush_reconnects_after_a_dropped_connection(database):
+    connect = FlakyConnect(database, failures=1)
+    buffer = make_buffer(connect)
+    buffer.add_summary('Delhi', '2024-06-01 12:00:00', 30.0, 31.0, 29.0, 'clear sky')
+    assert buffer.flush() == 1
+    assert connect.calls == 2  # The dropped connection was replaced and the flush retried
+    assert fetch_rows(database, "SELECT city FROM weather_readings") == [('Delhi',)]
+    buffer.close()
+
+def test_failed_retry_spills_and_replays_later(database, tmp_path):
+    store = LocalStore(str(tmp_path / 'store'))
+    connect = FlakyConnect(database, failures=2)
+    buffer = make_buffer(connect, local_store=store)
+    buffer.add_summary('Delhi', '2024-06-01 12:00:00', 30.0, 31.0, 29.0, 'clear sky')
+    buffer.add_alert('Delhi', 30.0, '2024-06-01 12:00:00', 'rate')
+    assert buffer.flush() == 0  # Both attempts fail: the rows are spilled, not written
+    stats = buffer.stats()
+    assert (stats['rows_written'], stats['rows_spilled']) == (0, 2)
+    assert store.pending_rows() == 2
+    assert fetch_rows(database, "SELECT COUNT(*) FROM weather_summary") == [(0,)]
+
+    # The next successful flush replays the spilled rows after its own
+    buffer.add_summary('Delhi', '2024-06-01 12:05:00', 31.0, 32.0, 30.0, 'clear sky')
+    buffer.close()
+    assert store.pending_rows() == 0
+    store.close()
+    assert fetch_rows(database, "SELECT recorded_at FROM weather_readings ORDER BY recorded_at") == [
+        ('2024-06-01 12:00:00',), ('2024-06-01 12:05:00',)]
+    assert fetch_rows(database, "SELECT kind FROM weather_alerts") == [('rate',)]
+
+def test_failed_retry_keeps_rows_without_a_local_store(database):
+    connect = FlakyConnect(database, failures=2)
+    buffer = make_buffer(connect)
+    buffer.add_summary('Delhi', '2024-06-01 12:00:00', 30.0, 31.0, 29.0, 'clear sky')
+    assert buffer.flush() == 0
+    assert len(buffer.summaries) == 1  # Kept for the next flush
+    assert buffer.flush() == 1
+    assert fetch_rows(database, "SELECT COUNT(*) FROM weather_summary") == [(1,)]
+    buffer.close()
+
+def test_pooled_connection_errors_return_none():
+    Error = pytest.importorskip('mysql.connector').Error
+
+    class DeadPool:
+        def get_connection(self):
+            raise Error("pool exhausted")
+
+    assert get_pooled_connection(DeadPool()) is None
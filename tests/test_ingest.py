@@ -0,0 +1,52 @@
+# tests/test_ingest.py
+#
+# The `ingest` command writing merged station feeds to SQLite.
+# Run from the project root with: python -m pytest
+
+import argparse
+import json
+from datetime import datetime
+
+import pytest
+
+from app.database import WriteBuffer
+from conftest import fetch_rows
+from scripts import main
+
+@pytest.fixture
+def storage(database, monkeypatch):
+    # Each ingest run gets a fresh write buffer on the test database, as a new process would
+    def setup_storage():
+        monkeypatch.setattr(main, 'write_buffer', WriteBuffer(database, flush_interval=0, paramstyle='qmark',
+                                                              timeseries=True))
+
+    monkeypatch.setattr(main, 'setup_storage', setup_storage)
+    monkeypatch.setattr(main, 'write_buffer', None)
+    monkeypatch.setattr(main, 'local_store', None)
+    monkeypatch.setattr(main, 'FILE_SOURCES', [])
+    return database
+
+def ingest(*files):
+    main.ingest(argparse.Namespace(files=[str(path) for path in files], api=False, print=False))
+
+def test_reingesting_a_file_stores_each_reading_once(storage, tmp_path):
+    feed = tmp_path / 'stations.ndjson'
+    start = datetime(2024, 6, 1, 12).timestamp()
+    lines = [{'city': city, 'timestamp': start + minute * 60, 'temperature': 30.0 + minute, 'condition': 'haze'}
+             for minute in (0, 5, 10) for city in ('Delhi', 'Mumbai')]
+    feed.write_text(''.join(json.dumps(line) + '\n' for line in lines + lines[:2]))  # Repeats within the file too
+
+    ingest(feed)
+    ingest(feed)  # Same file again
+
+    assert len(fetch_rows(storage, "SELECT * FROM weather_readings")) == 6
+    assert len(fetch_rows(storage, "SELECT * FROM weather_summary")) == 6
+    assert fetch_rows(storage, "SELECT city, readings FROM weather_daily ORDER BY city") == [
+        ('Delhi', 3), ('Mumbai', 3)]
+
+    # A later feed with one new reading adds just that reading
+    lines.append({'city': 'Delhi', 'timestamp': start + 900, 'temperature': 33.0, 'condition': 'haze'})
+    feed.write_text(''.join(json.dumps(line) + '\n' for line in lines))
+    ingest(feed)
+    assert fetch_rows(storage, "SELECT city, readings FROM weather_daily ORDER BY city") == [
+        ('Delhi', 4), ('Mumbai', 3)]
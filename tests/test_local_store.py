@@ -0,0 +1,92 @@
+# tests/test_local_store.py
+#
+# Run from the project root with: python -m pytest
+
+import sqlite3
+
+import pytest
+
+from app.database import WriteBuffer
+from app.local_store import LocalStore
+from conftest import fetch_rows
+
+def test_spilled_alerts_keep_their_kind(database, tmp_path):
+    store = LocalStore(str(tmp_path / 'store'))
+    buffer = WriteBuffer(lambda: None, flush_interval=0, paramstyle='qmark', local_store=store)
+    buffer.add_alert('Delhi', 41.0, '2024-06-01 12:00:00', 'high')
+    buffer.add_alert('Shimla', 2.5, '2024-06-01 12:00:00', 'low')
+    buffer.add_alert('Pune', 30.0, '2024-06-01 12:05:00', 'rate')
+    buffer.flush()  # No connection: spilled to the local store
+    assert store.pending_rows() == 3
+
+    buffer.connect = database
+    buffer.add_summary('Delhi', '2024-06-01 12:05:00', 41.5, 42.0, 40.0, 'clear sky')
+    buffer.close()  # Writes the new row, then replays the spilled alerts
+    store.close()
+    assert sorted(fetch_rows(database, "SELECT city, kind FROM weather_alerts")) == [
+        ('Delhi', 'high'), ('Pune', 'rate'), ('Shimla', 'low')]
+
+def spill(store, summaries, alerts=()):
+    buffer = WriteBuffer(None, flush_interval=0, paramstyle='qmark', local_store=store)
+    for row in summaries:
+        buffer.add_summary(*row)
+    for row in alerts:
+        buffer.add_alert(*row)
+    buffer.close()
+
+def replay(store, connect, timeseries=True):
+    buffer = WriteBuffer(connect, flush_interval=0, paramstyle='qmark', timeseries=timeseries)
+    connection = connect()
+    try:
+        return store.replay(connection, buffer.summary_query, buffer.alert_query, timeseries, 'sqlite')
+    finally:
+        connection.close()
+
+SUMMARIES = [('Delhi', f'2024-06-01 12:{minute:02d}:00', 30.0 + minute / 5, 31.0, 29.0, 'clear sky')
+             for minute in range(0, 30, 5)]
+ALERTS = [('Delhi', 45.0, '2024-06-01 12:25:00', 'high'), ('Delhi', 45.0, '2024-06-01 12:25:00', 'rate')]
+
+def test_replay_is_idempotent(database, tmp_path):
+    for timeseries in (True, False):
+        connection = database()
+        connection.executescript("DELETE FROM weather_summary; DELETE FROM weather_alerts; "
+                                 "DELETE FROM weather_readings; DELETE FROM weather_daily;")
+        connection.close()
+        store = LocalStore(str(tmp_path / f'store-{timeseries}'), segment_rows=4)
+        spill(store, SUMMARIES, ALERTS)
+        assert replay(store, database, timeseries) == len(SUMMARIES) + len(ALERTS)
+
+        # A crash after MySQL committed but before the progress was recorded replays everything again
+        store.metadata.execute("UPDATE segments SET replayed_rows = 0")
+        store.metadata.execute("UPDATE alerts SET replayed = 0")
+        store.metadata.commit()
+        replay(store, database, timeseries)
+        assert store.pending_rows() == 0
+        store.close()
+
+        assert len(fetch_rows(database, "SELECT * FROM weather_summary")) == len(SUMMARIES)
+        assert len(fetch_rows(database, "SELECT * FROM weather_alerts")) == len(ALERTS)
+        if timeseries:
+            assert fetch_rows(database, "SELECT readings FROM weather_daily") == [(len(SUMMARIES),)]
+
+def test_rows_that_keep_failing_are_quarantined(database, tmp_path):
+    connection = database()
+    connection.executescript("DROP TABLE weather_summary; CREATE TABLE weather_summary (city TEXT, date TEXT, "
+                             "avg_temperature REAL CHECK (avg_temperature < 50), max_temperature REAL, "
+                             "min_temperature REAL, weather_condition TEXT);")
+    connection.close()
+    store = LocalStore(str(tmp_path / 'store'), max_replay_attempts=3)
+    bad = ('Delhi', '2024-06-01 12:02:00', 99.0, 99.0, 99.0, 'sensor fault')
+    spill(store, SUMMARIES[:2] + [bad] + SUMMARIES[2:], ALERTS)
+
+    for attempt in range(2):
+        with pytest.raises(sqlite3.IntegrityError):
+            replay(store, database, timeseries=False)
+        assert store.pending_rows() == len(SUMMARIES) + 1 + len(ALERTS)
+    replay(store, database, timeseries=False)
+
+    assert store.pending_rows() == 0
+    assert [(source, row[0], row[2]) for source, row, _, _ in store.quarantined()] == [('reading', 'Delhi', 99.0)]
+    store.close()
+    assert len(fetch_rows(database, "SELECT * FROM weather_summary")) == len(SUMMARIES)
+    assert len(fetch_rows(database, "SELECT * FROM weather_alerts")) == len(ALERTS)
@@ -0,0 +1,102 @@
+# tests/test_metrics.py
+#
+# The app.metrics registry: Prometheus and JSON export, handing metrics between
+# processes with drain/merge, and recording from several threads while exporting.
+# Run from the project root with: python -m pytest
+
+import collections
+import json
+import threading
+
+import pytest
+
+from app import metrics
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setattr(metrics, 'histograms', {})
+    monkeypatch.setattr(metrics, 'counters', collections.defaultdict(float))
+    monkeypatch.setattr(metrics, 'gauges', {})
+    monkeypatch.setattr(metrics, 'enabled', True)
+
+def record():
+    for seconds in (0.002, 0.02, 0.02, 3.0):
+        metrics.observe('fetch_seconds', seconds)
+    metrics.increment('fetch_calls_total', 4)
+    metrics.set_gauge('cycle_last_seconds', 1.5)
+
+def test_prometheus_export():
+    record()
+    assert metrics.render_prometheus().splitlines() == [
+        '# TYPE weather_fetch_calls_total counter',
+        'weather_fetch_calls_total 4.0',
+        '# TYPE weather_cycle_last_seconds gauge',
+        'weather_cycle_last_seconds 1.5',
+        '# TYPE weather_fetch_seconds histogram',
+        'weather_fetch_seconds_bucket{le="0.001"} 0',
+        'weather_fetch_seconds_bucket{le="0.005"} 1',
+        'weather_fetch_seconds_bucket{le="0.01"} 1',
+        'weather_fetch_seconds_bucket{le="0.025"} 3',
+        'weather_fetch_seconds_bucket{le="0.05"} 3',
+        'weather_fetch_seconds_bucket{le="0.1"} 3',
+        'weather_fetch_seconds_bucket{le="0.25"} 3',
+        'weather_fetch_seconds_bucket{le="0.5"} 3',
+        'weather_fetch_seconds_bucket{le="1.0"} 3',
+        'weather_fetch_seconds_bucket{le="2.5"} 3',
+        'weather_fetch_seconds_bucket{le="5.0"} 4',
+        'weather_fetch_seconds_bucket{le="10.0"} 4',
+        'weather_fetch_seconds_bucket{le="30.0"} 4',
+        'weather_fetch_seconds_bucket{le="60.0"} 4',
+        'weather_fetch_seconds_bucket{le="300.0"} 4',
+        'weather_fetch_seconds_bucket{le="+Inf"} 4',
+        'weather_fetch_seconds_sum 3.042',
+        'weather_fetch_seconds_count 4',
+    ]
+
+def test_json_snapshot():
+    record()
+    snapshot = json.loads(json.dumps(metrics.snapshot()))
+    assert snapshot['counters'] == {'fetch_calls_total': 4.0}
+    assert snapshot['gauges'] == {'cycle_last_seconds': 1.5}
+    assert snapshot['histograms'] == {'fetch_seconds': {'count': 4, 'sum': 3.042, 'p50': 0.025, 'p95': 5.0,
+                                                        'p99': 5.0}}
+
+def test_drained_metrics_merge_into_another_registry():
+    record()
+    drained = metrics.drain()
+    assert metrics.snapshot()['histograms']['fetch_seconds']['count'] == 0  # Reset once drained
+    assert metrics.counters == {}
+    assert metrics.drain() == {'counters': {}, 'histograms': {}}
+
+    # As the parent process does with a child's metrics, twice
+    metrics.merge(drained)
+    metrics.merge(drained)
+    snapshot = metrics.snapshot()
+    assert snapshot['counters'] == {'fetch_calls_total': 8.0}
+    assert snapshot['histograms']['fetch_seconds']['count'] == 8
+    assert metrics.histograms['fetch_seconds'].counts[1] == 2
+
+def test_exporting_while_threads_record():
+    stop = threading.Event()
+
+    def work(thread):
+        while not stop.is_set():
+            for stage in range(50):
+                metrics.observe(f"stage_{thread}_{stage}_seconds", 0.01)
+                metrics.increment(f"stage_{thread}_calls_total")
+
+    threads = [threading.Thread(target=work, args=(thread,)) for thread in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(50):
+            metrics.render_prometheus()
+            metrics.snapshot()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    snapshot = metrics.snapshot()
+    assert len(snapshot['histograms']) == 200
+    assert all(values['count'] for values in snapshot['histograms'].values())
@@ -0,0 +1,47 @@
+# tests/test_reporting.py
+#
+# Rendering the trends plot in a background process with app.reporting.RenderWorker.
+# Run from the project root with: python -m pytest
+
+from app import metrics
+from app.reporting import RenderWorker
+
+def test_render_worker_renders_in_a_spawned_process(tmp_path):
+    metrics.histograms.pop('plot_seconds', None)
+    worker = RenderWorker(filename=str(tmp_path / 'trends.png'))
+    assert worker.process._start_method == 'spawn'  # Never a fork of the pipeline's threads and connections
+    worker.update([{'city': 'Delhi', 'date': f"2024-06-01 12:{minute:02d}:00", 'avg_temperature': 30.0 + minute}
+                   for minute in range(5)])
+    worker.render()
+    worker.close()
+
+    assert (tmp_path / 'trends.png').stat().st_size > 0
+    assert worker.stats()['renders'] == 1
+    assert metrics.histograms['plot_seconds'].count == 1  # Timed in the render process, exported here
+
+def test_malformed_record_does_not_stop_later_renders(tmp_path):
+    worker = RenderWorker(filename=str(tmp_path / 'trends.png'))
+    worker.update([{'city': 'Delhi', 'date': '2024-06-01 12:00:00', 'avg_temperature': 30.0},
+                   {'city': 'Mumbai', 'date': '2024-06-01 12:00:00', 'avg_temperature': None},
+                   {'city': 'Pune', 'date': 'not a date', 'avg_temperature': 25.0}])
+    worker.render()
+    worker.update([{'city': 'Delhi', 'date': '2024-06-01 12:05:00', 'avg_temperature': 31.0}])
+    worker.render()
+    worker.close()
+
+    assert worker.process.exitcode == 0
+    assert (tmp_path / 'trends.png').stat().st_size > 0
+    assert worker.stats()['applied'] == 2
+
+def test_dead_render_process_is_logged_once_and_not_queued_to(tmp_path, capsys):
+    worker = RenderWorker(filename=str(tmp_path / 'trends.png'))
+    worker.process.terminate()
+    worker.process.join()
+    for minute in range(3):
+        worker.update([{'city': 'Delhi', 'date': f"2024-06-01 12:{minute:02d}:00", 'avg_temperature': 30.0}])
+        worker.render()
+    worker.close()
+
+    assert capsys.readouterr().out.count("render process exited") == 1
+    assert worker.submitted == 0
+    assert worker.pending == []
@@ -0,0 +1,123 @@
+# tests/test_resilience.py
+#
+# Retries, circuit breaking, cycle deadlines and stale fallbacks of
+# app.resilience.ResilientClient, against the local stub server. Time is
+# simulated, so backoffs never actually sleep.
+# Run from the project root with: python -m pytest
+
+import random
+
+import pytest
+import requests
+
+from app.api_client import fetch_weather_data
+from app.resilience import ResilientClient
+from scripts.stub_server import start_stub_server
+
+class FakeTime:
+    """
+    Clock that advances only when `sleep` is called, recording every sleep.
+    """
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def stub():
+    server, base_url = start_stub_server(latency=0, retry_after=7)
+    yield server, base_url
+    server.shutdown()
+
+def make_client(fake_time, **options):
+    return ResilientClient(1000, 1000, clock=fake_time, sleep=fake_time.sleep, rng=random.Random(0), **options)
+
+def get(client, base_url):
+    return client.get(requests, 'weather', f"{base_url}/weather?q=City0&appid=stub", timeout=1)
+
+def test_429_is_retried_after_the_retry_after_delay(stub):
+    server, base_url = stub
+    server.throttle_rate = 1.0
+    fake_time = FakeTime()
+
+    response = get(make_client(fake_time, max_retries=2), base_url)
+    assert response.status_code == 429
+    assert server.request_count == 3
+    assert fake_time.sleeps == [7.0, 7.0]
+
+def test_5xx_is_retried_with_jittered_backoff_until_it_succeeds(stub):
+    server, base_url = stub
+    server.error_rate = 1.0
+    fake_time = FakeTime()
+
+    def recover(seconds):
+        FakeTime.sleep(fake_time, seconds)
+        server.error_rate = 0.0
+
+    fake_time.sleep = recover
+    client = make_client(fake_time, max_retries=3, backoff_base=0.5)
+    assert get(client, base_url).status_code == 200
+    assert len(fake_time.sleeps) == 1 and 0 <= fake_time.sleeps[0] <= 0.5
+    assert client.stats()['retries'] == 1
+    assert client.stats()['breakers'] == {'weather': 'closed'}
+
+def test_breaker_opens_half_opens_and_closes(stub):
+    server, base_url = stub
+    server.error_rate = 1.0
+    fake_time = FakeTime()
+    client = make_client(fake_time, max_retries=0, failure_threshold=2, reset_timeout=60)
+
+    get(client, base_url)
+    get(client, base_url)
+    assert client.stats()['breakers'] == {'weather': 'open'}
+    assert get(client, base_url) is None  # Refused without calling the API
+    assert server.request_count == 2
+
+    # After the reset timeout a failed trial call re-opens the breaker
+    fake_time.now += 60
+    assert get(client, base_url).status_code == 503
+    assert client.stats()['breakers'] == {'weather': 'open'}
+    assert get(client, base_url) is None
+
+    # A successful trial call closes it
+    fake_time.now += 60
+    server.error_rate = 0.0
+    assert get(client, base_url).status_code == 200
+    assert client.stats()['breakers'] == {'weather': 'closed'}
+    assert client.breakers['weather'].times_opened == 2
+    assert server.request_count == 4
+
+def test_no_retry_starts_past_the_cycle_deadline(stub):
+    server, base_url = stub
+    server.throttle_rate = 1.0
+    fake_time = FakeTime()
+    client = make_client(fake_time, max_retries=3)
+
+    client.start_cycle(5)  # Retry-After (7s) would run past the deadline
+    assert get(client, base_url).status_code == 429
+    assert server.request_count == 1
+    assert fake_time.sleeps == []
+
+    fake_time.now += 5  # No call starts once the deadline is too close for its timeout
+    assert get(client, base_url) is None
+    assert client.stats()['past_deadline'] == 1
+    assert server.request_count == 1
+
+def test_failed_fetch_serves_the_last_known_payload_as_stale(stub):
+    server, base_url = stub
+    fake_time = FakeTime()
+    client = make_client(fake_time, max_retries=1)
+
+    fresh = fetch_weather_data('City0', 'stub', base_url=base_url, client=client)
+    assert fresh['name'] == 'City0' and 'stale' not in fresh
+
+    server.error_rate = 1.0
+    assert fetch_weather_data('City0', 'stub', base_url=base_url, client=client) == dict(fresh, stale=True)
+    assert fetch_weather_data('City1', 'stub', base_url=base_url, client=client) is None  # Never fetched
+    assert client.stats()['stale_served'] == 1
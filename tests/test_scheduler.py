@@ -0,0 +1,37 @@
+# tests/test_scheduler.py
+#
+# Per-city polling with app.scheduler.AdaptiveScheduler and the response cache it works with.
+# Run from the project root with: python -m pytest
+
+import random
+
+from app.api_client import ResponseCache, fetch_with_cache
+from app.scheduler import AdaptiveScheduler
+
+CITIES = [f"City{i}" for i in range(100)]
+
+def make_scheduler(**options):
+    # Every city due at once, a budget of 2 requests and no refill (the clock never moves)
+    return AdaptiveScheduler(CITIES, base_interval=1, rate_budget=1.0, burst=2, clock=lambda: 0.0,
+                             rng=random.Random(0), **options)
+
+def test_token_bucket_counts_requests_not_cities():
+    assert len(make_scheduler().due(now=1)) == 2
+    scheduler = make_scheduler(cities_per_request=20)
+    assert len(scheduler.due(now=1)) == 40  # Two group requests of 20 cities
+    assert scheduler.requests == 2
+
+def test_refreshed_cities_bypass_a_fresh_cache_entry():
+    cache = ResponseCache(ttl=600)
+    cache.put('Delhi', {'name': 'Delhi', 'dt': 1})
+    cache.put('Mumbai', {'name': 'Mumbai', 'dt': 1})
+    fetched = []
+
+    def fetch(cities):
+        fetched.extend(cities)
+        return [(city, {'name': city, 'dt': 2}) for city in cities]
+
+    results = dict(fetch_with_cache(['Delhi', 'Mumbai'], cache, fetch, refresh={'Delhi'}))
+    assert fetched == ['Delhi']
+    assert results == {'Delhi': {'name': 'Delhi', 'dt': 2}, 'Mumbai': {'name': 'Mumbai', 'dt': 1}}
+    assert cache.get('Delhi') == {'name': 'Delhi', 'dt': 2}
@@ -0,0 +1,37 @@
+# tests/test_sources.py
+#
+# Reading station files with app.sources.FileSource and merging sources.
+# Run from the project root with: python -m pytest
+
+import json
+
+from app.sources import FileSource, ReadingMerger, merge_sources
+
+START = 1717200000  # 2024-06-01 00:00 UTC
+
+def write_feed(path, city, hours):
+    path.write_text(''.join(json.dumps({'city': city, 'timestamp': START + hour * 3600, 'temperature': 20.0})
+                            + '\n' for hour in range(hours)))
+
+def test_overlapping_files_of_one_glob_are_merged_in_time_order(tmp_path):
+    # One file per sensor, both covering the same period
+    write_feed(tmp_path / 'sensor_a.ndjson', 'Delhi', 3000)
+    write_feed(tmp_path / 'sensor_b.ndjson', 'Mumbai', 3000)
+    merger = ReadingMerger()
+
+    merged = [reading for chunk in merge_sources([FileSource(str(tmp_path / '*.ndjson'), 'stations')],
+                                                 merger=merger)
+              for reading in chunk]
+
+    assert len(merged) == 6000
+    assert merger.stats()['late'] == 0
+    timestamps = [reading.timestamp for reading in merged]
+    assert timestamps == sorted(timestamps)
+
+def test_malformed_rows_are_skipped_and_counted(tmp_path):
+    write_feed(tmp_path / 'sensor_a.ndjson', 'Delhi', 3)
+    with open(tmp_path / 'sensor_a.ndjson', 'a') as f:
+        f.write('{"city": "Delhi", "timestamp": "soon", "temperature": 20}\nnot json\n')
+    source = FileSource(str(tmp_path / '*.ndjson'), 'stations')
+    assert len(list(source.readings())) == 3
+    assert (source.rows, source.skipped) == (5, 2)
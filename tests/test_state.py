@@ -0,0 +1,119 @@
+# tests/test_state.py
+#
+# Snapshots and the write-ahead log of app.state: round trips, corrupt files
+# and replaying the readings logged after the last snapshot.
+# Run from the project root with: python -m pytest
+
+import threading
+
+import numpy as np
+import pytest
+
+from app import data_processing, state
+from app.alerting import AlertEngine
+from app.state import StateSnapshots, capture_state, read_snapshot, restore_state, write_snapshot
+
+READINGS = [[('Delhi', '2024-06-01 12:00:00', 36.0, 'clear sky'), ('Mumbai', '2024-06-01 12:00:00', 28.0, 'haze')],
+            [('Delhi', '2024-06-01 12:10:00', 37.5, 'clear sky'), ('Mumbai', '2024-06-01 12:10:00', 29.0, 'rain')],
+            [('Delhi', '2024-06-01 12:20:00', 38.0, 'haze'), ('Mumbai', '2024-06-01 12:20:00', 27.5, 'rain')]]
+
+@pytest.fixture(autouse=True)
+def daily_weather_data(monkeypatch):
+    monkeypatch.setattr(data_processing, 'daily_weather_data', {})
+
+def make_engine():
+    return AlertEngine(high_threshold=35.0, consecutive=2, rate_threshold=100.0)
+
+def run_cycle(engine, readings, now, snapshots=None):
+    # As the monitoring loop does: log the cycle, then aggregate and evaluate it
+    if snapshots is not None:
+        snapshots.log_cycle(readings, now)
+    for city, reading_date, temperature, condition in readings:
+        data_processing.add_to_daily_summary(city, {'temperature': temperature, 'weather_condition': condition,
+                                                    'date': reading_date})
+    engine.evaluate([reading[0] for reading in readings], [reading[2] for reading in readings], now=now)
+
+def summaries():
+    return {city: aggregate.summary(city) for city, aggregate in data_processing.daily_weather_data.items()}
+
+def assert_same_engine_state(engine, expected):
+    state, expected = engine.export_state(), expected.export_state()
+    assert state['cities'] == expected['cities']
+    for name in ('high_streaks', 'low_streaks', 'last_temps', 'last_alerts'):
+        assert np.array_equal(state[name], expected[name], equal_nan=True)
+
+def test_snapshot_round_trip(tmp_path):
+    engine = make_engine()
+    for cycle, readings in enumerate(READINGS):
+        run_cycle(engine, readings, now=1000.0 + cycle)
+    expected = summaries()
+
+    path = str(tmp_path / 'state.snapshot')
+    write_snapshot(path, capture_state(engine), sequence=3)
+    data_processing.daily_weather_data.clear()
+    restored = make_engine()
+    arrays, sequence = read_snapshot(path)
+    restore_state(arrays, restored)
+
+    assert sequence == 3
+    assert summaries() == expected
+    assert_same_engine_state(restored, engine)
+
+@pytest.mark.parametrize('damage', ['truncate', 'flip'])
+def test_a_truncated_or_corrupt_snapshot_is_rejected(tmp_path, damage):
+    run_cycle(make_engine(), READINGS[0], now=1000.0)
+    path = tmp_path / 'state.snapshot'
+    write_snapshot(str(path), capture_state(), sequence=1)
+    data = bytearray(path.read_bytes())
+    if damage == 'truncate':
+        data = data[:len(data) // 2]
+    else:
+        data[len(data) // 2] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    assert read_snapshot(str(path)) is None
+
+def test_readings_logged_after_the_last_snapshot_are_replayed(tmp_path):
+    engine = make_engine()
+    snapshots = StateSnapshots(str(tmp_path), fsync=False)
+    run_cycle(engine, READINGS[0], now=1000.0, snapshots=snapshots)
+    snapshots.snapshot(engine, wait=True)
+    for cycle, readings in enumerate(READINGS[1:], 1):
+        run_cycle(engine, readings, now=1000.0 + cycle, snapshots=snapshots)
+    snapshots.wal.close()  # Crash: no final snapshot
+    expected = summaries()
+
+    data_processing.daily_weather_data.clear()
+    restored = make_engine()
+    recovered = StateSnapshots(str(tmp_path), fsync=False).recover(restored)
+
+    assert recovered['snapshot_sequence'] == 1
+    assert recovered['replayed_readings'] == 4
+    assert summaries() == expected
+    assert_same_engine_state(restored, engine)
+
+def test_a_slow_snapshot_write_never_blocks_the_caller(tmp_path, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    written = []
+
+    def slow_write(path, arrays, sequence):
+        started.set()
+        release.wait()
+        written.append(sequence)
+        return 0
+    monkeypatch.setattr(state, 'write_snapshot', slow_write)
+
+    engine = make_engine()
+    snapshots = StateSnapshots(str(tmp_path), fsync=False)
+    run_cycle(engine, READINGS[0], now=1000.0, snapshots=snapshots)
+    snapshots.snapshot(engine)
+    assert started.wait(5)
+    for cycle, readings in enumerate(READINGS[1:], 1):
+        run_cycle(engine, readings, now=1000.0 + cycle, snapshots=snapshots)
+        snapshots.snapshot(engine)  # Returns while the first write is still blocked
+    release.set()
+    snapshots.close(engine)
+
+    # The second snapshot was superseded by the third while it waited behind the first
+    assert written[0] == 1 and written[-1] == 3 and 2 not in written
@@ -0,0 +1,34 @@
+# tests/test_visualization.py
+#
+# The incremental trends plot of app.visualization.TrendRenderer.
+# Run from the project root with: python -m pytest
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.visualization import TrendRenderer
+
+def readings(start, count, city='Delhi'):
+    return [{'city': city, 'date': (start + timedelta(minutes=5 * i)).strftime('%Y-%m-%d %H:%M:%S'),
+             'avg_temperature': 30.0 + i % 7} for i in range(count)]
+
+def test_history_is_bounded_to_the_last_days(tmp_path):
+    renderer = TrendRenderer(filename=str(tmp_path / 'trends.png'), history_days=1)
+    start = datetime(2024, 6, 1)
+    per_day = 288
+    for day in range(30):  # A month of cycles, one day at a time
+        renderer.update(readings(start + timedelta(days=day), per_day))
+    renderer.render()
+
+    series = renderer.series['Delhi']
+    times, temps = series.data()
+    assert len(times) == per_day + 1  # The last day, counted back from the latest reading inclusive
+    assert len(series.times) <= 4 * per_day  # The buffer stopped growing
+    x, _ = renderer.series['Delhi'].line.get_data()
+    assert np.min(x) >= times[0]
+
+def test_history_days_none_keeps_everything(tmp_path):
+    renderer = TrendRenderer(filename=str(tmp_path / 'trends.png'), history_days=None)
+    renderer.update(readings(datetime(2024, 6, 1), 5000))
+    assert len(renderer.series['Delhi'].data()[0]) == 5000
@@ -0,0 +1,106 @@
+# tests/test_workers.py
+#
+# Sharded worker processes (app.workers) against the local stub server.
+# Run from the project root with: python -m pytest
+
+from functools import partial
+import queue
+import threading
+
+import numpy as np
+import pytest
+
+from app import data_processing
+from app.alerting import AlertEngine
+from app.api_client import ResponseCache, fetch_all_weather_data, fetch_with_cache
+from app.state import StateSnapshots
+from app.workers import run_sharded, run_worker, shard_rules
+from scripts.stub_server import start_stub_server
+
+CITIES = [f"City{i}" for i in range(12)]
+
+@pytest.fixture
+def base_url():
+    server, base_url = start_stub_server(latency=0)
+    yield base_url
+    server.shutdown()
+
+def primed_rules():
+    # Every city one reading into a breach of a threshold below any stub temperature
+    rules = AlertEngine(high_threshold=-100.0, consecutive=2, rate_threshold=1000.0,
+                        high_thresholds={'City0': 1000.0})
+    rules.import_state({'cities': CITIES, 'high_streaks': np.ones(len(CITIES), dtype=np.int32),
+                        'low_streaks': np.zeros(len(CITIES), dtype=np.int32),
+                        'last_temps': np.full(len(CITIES), np.nan),
+                        'last_alerts': np.full((len(CITIES), 3), -np.inf)})
+    return rules
+
+def test_shard_rules_keep_the_thresholds_and_only_the_shards_state():
+    engine = shard_rules(primed_rules(), ['City0', 'City5'])
+    assert engine.cities == ['City0', 'City5']
+    assert engine.high_streaks.tolist() == [1, 1]
+    assert engine.high_overrides == {'City0': 1000.0}
+    assert engine.consecutive == 2
+
+def test_workers_alert_with_the_configured_rules_and_restored_state(base_url):
+    batches = []
+    run_sharded(CITIES, 'stub', batches.append, 3, interval=0, cycles=1, base_url=base_url, rules=primed_rules())
+
+    alerted = sorted(city for batch in batches for city, _, kind, _ in batch['alerts'] if kind == 'high')
+    assert alerted == sorted(CITIES[1:])  # City0's own threshold is never reached
+    states = {city: streak for batch in batches
+              for city, streak in zip(batch['alert_state']['cities'], batch['alert_state']['high_streaks'])}
+    assert states == {**dict.fromkeys(CITIES, 2), 'City0': 0}  # City0's streak cleared
+
+def test_a_failed_cycle_is_reported_and_the_worker_carries_on(base_url):
+    class FlakyEngine(AlertEngine):
+        calls = 0
+
+        def evaluate(self, cities, temperatures, now=None):
+            FlakyEngine.calls += 1
+            if FlakyEngine.calls == 1:
+                raise ValueError('bad cycle')
+            return super().evaluate(cities, temperatures, now)
+
+    results = queue.Queue()
+    run_worker(0, CITIES[:3], 'stub', results, threading.Event(), interval=0, cycles=2, base_url=base_url,
+               alert_engine=FlakyEngine())
+
+    assert results.get_nowait() == {'shard': 0, 'error': 'ValueError: bad cycle'}
+    assert len(results.get_nowait()['city']) == 3
+
+def test_a_worker_fetch_pipeline_drops_unchanged_readings(base_url):
+    def make_fetch(shard):
+        cache = ResponseCache(ttl=0)  # Every cycle refetches; the stub repeats the observation time
+        fetch = partial(fetch_all_weather_data, api_key='stub', base_url=base_url)
+        return lambda cities: [data for city, data in fetch_with_cache(cities, cache, fetch)
+                               if data and cache.is_new_reading(city, data)]
+
+    results = queue.Queue()
+    run_worker(0, CITIES[:3], 'stub', results, threading.Event(), interval=0, cycles=2, base_url=base_url,
+               make_fetch=make_fetch)
+
+    assert len(results.get_nowait()['city']) == 3
+    assert len(results.get_nowait()['city']) == 0
+
+def test_replaying_a_worker_batch_restores_its_alert_state(base_url, tmp_path, monkeypatch):
+    monkeypatch.setattr(data_processing, 'daily_weather_data', {})
+    rules = dict(high_threshold=-100.0, consecutive=1, rate_threshold=1000.0)
+    results = queue.Queue()
+    run_worker(0, CITIES[:3], 'stub', results, threading.Event(), interval=0, cycles=1, base_url=base_url,
+               alert_engine=AlertEngine(**rules))
+    batch = results.get_nowait()
+    assert len(batch['alerts']) == 3
+
+    # As handle_worker_batch logs it, then a restart
+    snapshots = StateSnapshots(str(tmp_path), fsync=False)
+    snapshots.log_cycle([(city, batch['date'], temp, None) for city, temp in
+                         zip(batch['city'], batch['temperature'].tolist())], batch['evaluated_at'])
+    snapshots.wal.close()
+    restored = AlertEngine(**rules)
+    StateSnapshots(str(tmp_path), fsync=False).recover(restored)
+
+    state = restored.export_state()
+    assert state['cities'] == batch['alert_state']['cities']
+    for name in ('high_streaks', 'low_streaks', 'last_temps', 'last_alerts'):
+        assert np.array_equal(state[name], batch['alert_state'][name])